@@ -0,0 +1,95 @@
+import numpy as np
+
+import board
+import engine
+import geometry
+import mcts
+import solver
+
+'''
+Agents = headless players for Sperner's Game
+
+Every agent exposes choose_move(colors, maximizer_to_move) and returns a
+(vertex, color code) move, so they can be pitted against each other
+outside of Streamlit.
+'''
+
+
+class RandomAgent:
+    """Plays a uniformly random legal move"""
+
+    def __init__(self, n, seed=None):
+        self.geom = geometry.get_geometry(n)
+        self.rng = np.random.default_rng(seed)
+
+    def choose_move(self, colors, maximizer_to_move):
+        vertices, columns = np.nonzero(engine.legal_moves_mask(colors, self.geom.allowed))
+        if len(vertices) == 0:
+            return None
+        i = int(self.rng.integers(len(vertices)))
+        return int(vertices[i]), int(columns[i]) + 1
+
+
+class GreedyAgent:
+    """Plays the move with the best immediate change in polychrome count (ties broken at random)"""
+
+    def __init__(self, n, seed=None):
+        self.geom = geometry.get_geometry(n)
+        self.rng = np.random.default_rng(seed)
+
+    def choose_move(self, colors, maximizer_to_move):
+        legal = engine.legal_moves_mask(colors, self.geom.allowed)
+        if not legal.any():
+            return None
+        gains = engine.move_gains(colors, self.geom.triangles, self.geom.vertex_triangles)
+        scores = np.where(legal, gains if maximizer_to_move else -gains, np.iinfo(np.int64).min)
+        vertices, columns = np.nonzero(scores == scores.max())
+        i = int(self.rng.integers(len(vertices)))
+        return int(vertices[i]), int(columns[i]) + 1
+
+
+class ExactAgent:
+    """Plays the solver's best move found within a per-move time budget"""
+
+    def __init__(self, n, seed=None, time_budget=1.0, max_table_bytes=solver.DEFAULT_TABLE_BYTES,
+                 tablebase=None):
+        self.solver = solver.Solver(n, max_table_bytes=max_table_bytes, tablebase=tablebase)
+        self.time_budget = time_budget
+        self.fallback = GreedyAgent(n, seed=seed)
+
+    def choose_move(self, colors, maximizer_to_move):
+        result = self.solver.solve(colors, maximizer_to_move, time_budget=self.time_budget)
+        if result.best_move is None:
+            return self.fallback.choose_move(colors, maximizer_to_move)
+        return result.best_move
+
+
+AGENTS = {
+    "random": RandomAgent,
+    "greedy": GreedyAgent,
+    "mcts": mcts.MCTSAgent,
+    "exact": ExactAgent,
+}
+
+
+def make_agent(name, n, seed=None, **options):
+    """Build an agent by name; options are passed to its constructor"""
+    if name not in AGENTS:
+        raise ValueError(f"Unknown agent {name!r}; choose from {', '.join(AGENTS)}")
+    return AGENTS[name](n, seed=seed, **options)
+
+
+def play_game(n, player1, player2, player1_role="Maximizer"):
+    """Play one game between two agents; returns (move list, final polychrome count)"""
+    game = board.SpernerBoard(n, player1_role)
+    players = {board.PLAYERS[0]: player1, board.PLAYERS[1]: player2}
+
+    while not game.is_over():
+        player = players[game.current_player]
+        move = player.choose_move(game.colors.copy(), game.maximizer_to_move)
+        try:
+            game.apply(move)
+        except board.IllegalMove:
+            raise ValueError(f"Illegal move {move} by {type(player).__name__}") from None
+
+    return game.moves(), game.polychrome_count
@@ -0,0 +1,176 @@
+import argparse
+import itertools
+import time
+from collections import namedtuple
+from fractions import Fraction
+
+import numpy as np
+
+import engine
+import geometry
+
+'''
+Analysis = exact distribution of the polychrome count over all legal colorings
+
+The lattice is swept vertex by vertex in row order (a row-by-row transfer
+matrix, one cell at a time). The DP state is the coloring of the frontier:
+the placed vertices that still belong to an unfinished triangle, at most
+n + 2 of them, held densely with one tensor axis per frontier vertex. Each
+state carries a count polynomial: the number of partial colorings per
+polychrome count so far. Coloring a vertex adds an axis and shifts each
+polynomial by the polychrome gain of the triangles it closes; a vertex
+leaves the frontier after its last triangle by summing out its axis. The
+number of colorings exceeds 64 bits quickly, so counts are exact
+multi-limb integers (32-bit limbs held in uint64 for carry room).
+'''
+
+
+LIMB_BITS = 32
+LIMB_MASK = (1 << LIMB_BITS) - 1
+
+Distribution = namedtuple("Distribution", [
+    "n",
+    "counts",   # {polychrome count: number of colorings}
+    "total",    # number of legal colorings
+    "minimum",
+    "maximum",
+    "mean",     # exact, as a Fraction
+])
+
+
+def _options(geom, start_colors):
+    """Color codes each vertex may take, honouring the boundary rule and any fixed colors"""
+    options = []
+    for v in range(geom.num_vertices):
+        if start_colors is not None and start_colors[v] != engine.EMPTY:
+            options.append([int(start_colors[v])])
+        else:
+            options.append([c for c in (1, 2, 3) if geom.allowed[v] & engine.COLOR_BITS[c]])
+    return options
+
+
+def _schedule(geom):
+    """Per vertex (in index order): triangles it completes, and vertices that can then leave the frontier"""
+    triangles = geom.triangles
+    closer = triangles.max(axis=1)
+    # A vertex is needed until the last triangle it belongs to is complete
+    last_use = np.full(geom.num_vertices, -1)
+    np.maximum.at(last_use, triangles.ravel(), np.repeat(closer, 3))
+    last_use = np.maximum(last_use, np.arange(geom.num_vertices))
+
+    completes = [[] for _ in range(geom.num_vertices)]
+    for t, v in enumerate(closer.tolist()):
+        completes[v].append(t)
+    retire = [[] for _ in range(geom.num_vertices)]
+    for u, v in enumerate(last_use.tolist()):
+        retire[v].append(u)
+    return completes, retire
+
+
+def _normalize(limbs):
+    """Propagate carries so every limb is below 2 ** LIMB_BITS"""
+    for i in range(limbs.shape[-1] - 1):
+        limbs[..., i + 1] += limbs[..., i] >> LIMB_BITS
+        limbs[..., i] &= LIMB_MASK
+    return limbs
+
+
+def polychrome_distribution(n, start_colors=None):
+    """Exact distribution of the final polychrome count over every legal completion
+
+    With start_colors, only completions of that partial board are counted.
+    """
+    geom = geometry.get_geometry(n)
+    options = _options(geom, start_colors)
+    completes, retire = _schedule(geom)
+    total_bits = sum(np.log2(len(o)) for o in options)
+    num_limbs = int(total_bits // LIMB_BITS) + 2
+
+    # Dense tensor: one axis per frontier vertex (its option index), then the
+    # polychrome count so far, then the limbs of the number of colorings
+    frontier = []
+    counts = np.zeros((1, num_limbs), dtype=np.uint64)
+    counts[0, 0] = 1
+
+    for v in range(geom.num_vertices):
+        closing = geom.triangles[completes[v]].tolist()
+        involved = sorted({u for tri in closing for u in tri if u != v}, key=frontier.index)
+        axes = [frontier.index(u) for u in involved]
+        # Vertices whose last triangle v closes are summed out as v is placed; they
+        # are always involved, so they only ever appear as fixed indices below
+        retired = set(retire[v])
+        kept = [u for u in frontier if u not in retired]
+        keep_v = v not in retired
+        depth = counts.shape[-2]
+        placed = np.zeros(
+            tuple(len(options[u]) for u in kept) + ((len(options[v]),) if keep_v else ())
+            + (depth + len(closing), num_limbs),
+            dtype=np.uint64,
+        )
+
+        # Only the involved vertices' colors decide the gain, so copy whole slabs per combination
+        for combo in itertools.product(*(range(len(options[u])) for u in involved)):
+            color = {u: options[u][i] for u, i in zip(involved, combo)}
+            source = [slice(None)] * len(frontier)
+            for axis, i in zip(axes, combo):
+                source[axis] = i
+            target = [index for u, index in zip(frontier, source) if u not in retired]
+            for i, code in enumerate(options[v]):
+                color[v] = code
+                gain = sum(
+                    int(engine.COLOR_BITS[color[a]] | engine.COLOR_BITS[color[b]] | engine.COLOR_BITS[color[c]])
+                    == engine.ALL_COLORS
+                    for a, b, c in closing
+                )
+                index = tuple(target) + ((i,) if keep_v else ()) + (slice(gain, gain + depth),)
+                placed[index] += counts[tuple(source)]
+
+        frontier = kept + ([v] if keep_v else [])
+        counts = _normalize(placed) if retired else placed
+
+    limbs = counts.reshape(-1, num_limbs)
+    distribution = {}
+    for value, row in enumerate(limbs.tolist()):
+        ways = sum(limb << (LIMB_BITS * i) for i, limb in enumerate(row))
+        if ways:
+            distribution[value] = ways
+
+    total = sum(distribution.values())
+    return Distribution(
+        n=n,
+        counts=distribution,
+        total=total,
+        minimum=min(distribution),
+        maximum=max(distribution),
+        mean=Fraction(sum(k * w for k, w in distribution.items()), total),
+    )
+
+
+def median(distribution):
+    """Smallest count that at least half of all colorings reach or stay below"""
+    running = 0
+    for value in sorted(distribution.counts):
+        running += distribution.counts[value]
+        if 2 * running >= distribution.total:
+            return value
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Exact polychrome-count distribution over all legal colorings")
+    parser.add_argument("--n", type=int, nargs="+", default=[2, 3, 4, 5, 6, 7, 8])
+    parser.add_argument("--full", action="store_true", help="print the whole distribution")
+    args = parser.parse_args(argv)
+
+    for n in args.n:
+        start = time.perf_counter()
+        dist = polychrome_distribution(n)
+        elapsed = time.perf_counter() - start
+        print(f"n={n}: {dist.total} colorings, min {dist.minimum}, max {dist.maximum}, "
+              f"mean {float(dist.mean):.4f}, median {median(dist)} ({elapsed:.2f}s)")
+        if args.full:
+            for value, ways in dist.counts.items():
+                print(f"    {value:4d}  {ways}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,11 +1,14 @@
 import streamlit as st
-import plotly.graph_objects as go
-import numpy as np
-from streamlit_plotly_events import plotly_events
+import engine
+import geometry
+import render
 import utils
 
 # Page layout
 st.set_page_config(layout="wide")
+metrics = utils.start_run()
+utils.warm_up()
+utils.render_debug_sidebar()
 st.title("The Sperner Game - Maximizer vs Minimizer")
 
 # Add CSS styling
@@ -28,10 +31,13 @@ with st.expander("How to Play:"):
     **Tip:** Click a vertex to color it. Use the buttons above to select your current color.
     """)
 
-# Retrieve n from session state or default to 5
-default_n = st.session_state.get("n", 5)
+# Largest triangulation level offered by the slider
+MAX_N = 30
+
+# Retrieve n from session state, the game being resumed, or default to 5
+default_n = st.session_state.get("n", utils.resumable_n() or 5)
 st.session_state.n = default_n
-n = st.slider("Triangulation level n", 2, 8, value=default_n)
+n = st.slider("Triangulation level n", 2, MAX_N, value=default_n)
 
 # Update session state with the current slider value
 st.session_state.n = n
@@ -40,52 +46,57 @@ top_left = st.columns([2, 8])[0]
 with top_left:
     if st.button("🔄 Reset Game", key="reset_btn", help="Restart the game"):
         utils.reset_game_state(n)
-        st.rerun()
+        utils.rerun("reset")
 
     st.markdown('<div class="reset-button"></div>', unsafe_allow_html=True)
 
 # Reset state if triangulation level changes 
 if "vertex_color_n" in st.session_state and st.session_state.vertex_color_n != n:
     st.session_state.clear()
+    st.query_params.pop("game", None)
     st.session_state.n = n
     st.session_state.vertex_color_n = n
     st.session_state.force_reset = True
-    st.rerun()
+    utils.rerun("size_change")
 
-# Geometry
-points = utils.generate_triangle_coords(n)
-edges = utils.generate_edges(n)
+# Geometry (shared across sessions, cached per n)
+with metrics.span("geometry"):
+    geom = geometry.get_geometry(n)
+points = geom.coords
+metrics.set("vertices", geom.num_vertices)
 
 # Initialize session state
 if (
-    "vertex_colors" not in st.session_state
+    "board" not in st.session_state
     or "vertex_color_n" not in st.session_state
     or st.session_state.vertex_color_n != n
 ):
-    utils.initialize_session_state(n, points)
-
-plot_colors = [color if color else "white" for color in st.session_state.vertex_colors]
-
-# Live Polychrome Count Display
-poly_triangles = utils.update_polychrome_count()
+    with metrics.span("session_init"):
+        utils.initialize_session_state(n, points)
+# A started game's board lives in the shared registry; the session only points at it
+utils.get_shared_game()
+board = utils.get_board()
 
 # Role Selection (before game starts)
 if not st.session_state.get("game_started", False):
     st.markdown("---")
     st.markdown("### Role Selection")
+    opponent_mode = st.radio("Opponent:", list(utils.COMPUTER_SEATS), horizontal=True, key="opponent_mode")
+    computer_player = utils.COMPUTER_SEATS[opponent_mode]
+    creator_seats = utils.CREATOR_SEATS.get(opponent_mode)
     st.markdown("**Player 1**, choose your role to start the game:")
     
     role_col1, role_col2, role_col3 = st.columns([0.3, 0.3, 2.4])
     
     with role_col1:
         if st.button("🔺 Maximizer", key="maximizer_btn", help="Try to maximize polychrome triangles"):
-            utils.set_player_roles("Maximizer")
-            st.rerun()
+            utils.set_player_roles("Maximizer", computer_player, creator_seats)
+            utils.rerun("role_selected")
     
     with role_col2:
         if st.button("🔻 Minimizer", key="minimizer_btn", help="Try to minimize polychrome triangles"):
-            utils.set_player_roles("Minimizer")
-            st.rerun()
+            utils.set_player_roles("Minimizer", computer_player, creator_seats)
+            utils.rerun("role_selected")
     
     with role_col3:
         st.markdown("&nbsp;&nbsp;**Player 2** will automatically be assigned the opposite role.")
@@ -95,193 +106,137 @@ if not st.session_state.get("game_started", False):
     st.markdown("*Select your role above to begin playing*")
     
     # Get hover data with warnings for role selection phase
-    hover_data = utils.create_hover_data_with_warnings(
-        points, 
-        st.session_state.vertex_colors, 
-        st.session_state.allowed_colors, 
-        st.session_state.color_picker
-    )
+    with metrics.span("hover"):
+        hover_data, _ = utils.get_hover_data()
     
-    fig = go.Figure()
-    x, y = zip(*points)
-
-    fig.add_trace(go.Scatter(
-        x=x, y=y,
-        mode='markers',
-        marker=dict(size=16, color=plot_colors, line=dict(color='black', width=1)),
-        text=hover_data,
-        hovertemplate='%{text}<extra></extra>',
-        showlegend=False,
-        name='vertices'
-    ))
-
-    for i, j in edges:
-        xi, yi = points[i]
-        xj, yj = points[j]
-        fig.add_trace(go.Scatter(
-            x=[xi, xj], y=[yi, yj],
-            mode='lines',
-            line=dict(color='grey', width=1),
-            hoverinfo='skip',
-            showlegend=False
-        ))
-    fig.update_layout(
-        height=600,
-        margin=dict(t=20, b=20, l=20, r=20),
-        xaxis=dict(visible=False, scaleanchor='y', scaleratio=1, constrain='domain'),
-        yaxis=dict(visible=False, constrain='domain', autorange='reversed'),
-        plot_bgcolor='rgb(40,40,40)',
-        title=dict(text="Waiting for role selection...", x=0.5, font=dict(color='white'))
-    )
+    with metrics.span("figure"):
+        fig = render.build_board_figure(
+            geom, utils.get_plot_colors(), hover_data, title="Waiting for role selection..."
+        )
+    utils.record_figure_metrics(fig, hover_data)
 
-    st.plotly_chart(fig, use_container_width=True)
-    st.stop()
+    with metrics.span("plotly_chart"):
+        st.plotly_chart(fig, use_container_width=True)
+    utils.stop()
 
 # Game Interface (only shown after role selection)
 st.markdown("---")
 
 # Display current roles
 st.markdown(f"### Current Roles")
-role_icon = "🔺" if st.session_state.player1_role == "Maximizer" else "🔻"
-st.markdown(f"**Player 1**: {role_icon} {st.session_state.player1_role}")
-role_icon = "🔺" if st.session_state.player2_role == "Maximizer" else "🔻"
-st.markdown(f"**Player 2**: {role_icon} {st.session_state.player2_role}")
+computer_player = st.session_state.get("computer_player")
+role_icon = "🔺" if board.player1_role == "Maximizer" else "🔻"
+computer_tag = " (Computer)" if computer_player == "Player 1" else ""
+st.markdown(f"**Player 1**{computer_tag}: {role_icon} {board.player1_role}")
+role_icon = "🔺" if board.player2_role == "Maximizer" else "🔻"
+computer_tag = " (Computer)" if computer_player == "Player 2" else ""
+st.markdown(f"**Player 2**{computer_tag}: {role_icon} {board.player2_role}")
+seats = utils.my_seats()
+if utils.is_spectator():
+    st.markdown("👀 You are watching this game.")
+elif len(seats) == 1:
+    st.markdown(f"You are **{seats[0]}**.")
+game_id = st.session_state.get("game_id")
+if game_id is not None:
+    st.caption(f"Game {game_id}: open this app with ?game={game_id} on another device to join or watch.")
 
 st.markdown("---")
 
-# Centered label
-st.markdown("<div style='text-align:center; font-weight:bold; font-size:1.1rem;'>Choose your color:</div>", unsafe_allow_html=True)
-
-# Center real buttons without using columns
-center, buttons, _ = st.columns([4, 2, 4])
-
-with buttons:
-    b1, b2, b3 = st.columns(3)
-    with b1:
-        if st.button("🔴", key="red_btn"):
-            st.session_state.color_picker = "red"
-            st.rerun()
-    with b2:
-        if st.button("🟢", key="green_btn"):
-            st.session_state.color_picker = "green"
-            st.rerun()
-    with b3:
-        if st.button("🔵", key="blue_btn"):
-            st.session_state.color_picker = "blue"
-            st.rerun()
-
-# Get current player info for display
-current_player_role, role_icon = utils.get_current_player_info()
-
-# Floating player box
-st.markdown(
-    f"""
-    <div class="player-box">
-    {st.session_state.current_player} ({role_icon} {current_player_role})<br>
-    Using Color: <span style='color:{st.session_state.color_picker}'>{st.session_state.color_picker}</span><br>
-    Polychrome Count: <span style= font-weight: bold;'>{st.session_state.polychrome_count}</span>
-    </div>
-    """,
-    unsafe_allow_html=True
-)
-
-# Get hover data with warnings for game phase
-hover_data = utils.create_hover_data_with_warnings(
-    points, 
-    st.session_state.vertex_colors, 
-    st.session_state.allowed_colors, 
-    st.session_state.color_picker
-)
-
-# Plotly chart / visualization of board
-fig = go.Figure()
-x, y = zip(*points)
-fig.add_trace(go.Scatter(
-    x=x, y=y,
-    mode='markers',
-    marker=dict(size=16, color=plot_colors, line=dict(color='black', width=1)),
-    text=hover_data,
-    hovertemplate='%{text}<extra></extra>',
-    showlegend=False,
-    name='vertices'
-))
-for i, j in edges:
-    xi, yi = points[i]
-    xj, yj = points[j]
-    fig.add_trace(go.Scatter(
-        x=[xi, xj], y=[yi, yj],
-        mode='lines',
-        line=dict(color='grey', width=1),
-        hoverinfo='skip',
-        showlegend=False
-    ))
-fig.update_layout(
-    height=600,
-    margin=dict(t=20, b=20, l=20, r=20),
-    xaxis=dict(visible=False, scaleanchor='y', scaleratio=1, constrain='domain'),
-    yaxis=dict(visible=False, constrain='domain', autorange='reversed'),
-    plot_bgcolor='rgb(40,40,40)',
-    hovermode='closest'
-)
-
-# Highlight polychrome triangles only when all vertices are colored (game end)
-if all(color is not None for color in st.session_state.vertex_colors) and poly_triangles:
-    for tri in poly_triangles:
-        triangle_pts = [points[v] for v in tri]
-        
-        # Compute centroid
-        cx = sum(p[0] for p in triangle_pts) / 3
-        cy = sum(p[1] for p in triangle_pts) / 3
-
-        # Sort vertices around the centroid to ensure proper triangle fill
-        triangle_pts.sort(key=lambda p: np.arctan2(p[1] - cy, p[0] - cx))
-
-        x_coords = [p[0] for p in triangle_pts] + [triangle_pts[0][0]]
-        y_coords = [p[1] for p in triangle_pts] + [triangle_pts[0][1]]
-
-        fig.add_trace(go.Scatter(
-            x=x_coords,
-            y=y_coords,
-            fill='toself',
-            fillcolor='rgba(255,255,0, 1)',
-            line=dict(width=1, color='black'),
-            hoverinfo='skip',
-            showlegend=False
-        ))
-
-# Create space for warning
-warning_spot = st.empty()
-
-# Handle plot interactions
-selected = st.session_state.get("last_selected_event", None)
-new_selected = plotly_events(
-    fig,
-    click_event=True,
-    hover_event=False,
-    select_event=False,
-    override_height=600,
-    key="plot"
-)
-
-if new_selected:
-    selected = new_selected
-    st.session_state.last_selected_event = selected
-
-if selected:
-    clicked_trace = selected[0]["curveNumber"]
-    if clicked_trace == 0:
+
+@st.fragment
+def play_area():
+    """Color picker, player box and board; interactions here re-run only this fragment"""
+    metrics, owns_run = utils.ensure_run("play_area")
+    utils.get_shared_game()
+    board = utils.get_board()
+
+    # Centered label
+    st.markdown("<div style='text-align:center; font-weight:bold; font-size:1.1rem;'>Choose your color:</div>", unsafe_allow_html=True)
+
+    # Center real buttons without using columns; the callbacks run before this fragment re-runs
+    center, buttons, _ = st.columns([4, 2, 4])
+
+    with buttons:
+        b1, b2, b3 = st.columns(3)
+        with b1:
+            st.button("🔴", key="red_btn", on_click=utils.pick_color, args=("red",))
+        with b2:
+            st.button("🟢", key="green_btn", on_click=utils.pick_color, args=("green",))
+        with b3:
+            st.button("🔵", key="blue_btn", on_click=utils.pick_color, args=("blue",))
+
+    # A new click is applied before anything is drawn, so the board shown is already up to date
+    click_x = click_y = None
+    success, error_msg = False, ""
+    selected = utils.take_new_click("plot")
+    if selected and selected[0]["curveNumber"] in render.CLICKABLE_TRACES:
         click_x = selected[0]["x"]
         click_y = selected[0]["y"]
-        min_distance = float('inf')
-        closest_vertex = -1
-        for i, (px, py) in enumerate(points):
-            distance = (click_x - px)**2 + (click_y - py)**2
-            if distance < min_distance:
-                min_distance = distance
-                closest_vertex = i
-
-        success, error_msg = utils.handle_vertex_click(closest_vertex, click_x, click_y)
+        closest_vertex = geometry.resolve_click(geom, click_x, click_y)
+
+        # Clicks that miss every vertex are ignored
+        if closest_vertex is not None:
+            with metrics.span("click"):
+                success, error_msg = utils.handle_vertex_click(closest_vertex, click_x, click_y)
+
+    # Computer opponent moves as soon as it is its turn
+    if utils.is_computer_turn():
+        with st.spinner("Computer is thinking..."), metrics.span("computer_move"):
+            utils.play_computer_move()
+
+    # Undo / redo replay the archived move log
+    _, history_buttons, _ = st.columns([4.5, 1.4, 4.1])
+    with history_buttons:
+        h1, h2 = st.columns(2)
+        with h1:
+            st.button("↩️", key="undo_btn", help="Undo", on_click=utils.undo_move, disabled=not utils.can_undo())
+        with h2:
+            st.button("↪️", key="redo_btn", help="Redo", on_click=utils.redo_move, disabled=not utils.can_redo())
+    _, heat_toggle, _ = st.columns([4.3, 1.8, 3.9])
+    with heat_toggle:
+        st.toggle("🔥 Move impact", key="heatmap",
+                  help="Shade each uncolored vertex by how much the picked color would add to the polychrome count")
+
+    # Get current player info for display
+    current_player_role, role_icon = utils.get_current_player_info()
+
+    # Floating player box
+    st.markdown(
+        f"""
+        <div class="player-box">
+        {board.current_player} ({role_icon} {current_player_role})<br>
+        Using Color: <span style='color:{st.session_state.color_picker}'>{st.session_state.color_picker}</span><br>
+        Polychrome Count: <span style= font-weight: bold;'>{board.polychrome_count}</span>
+        </div>
+        """,
+        unsafe_allow_html=True
+    )
 
+    # Perfect-play hint once the endgame table covers the position
+    if not board.is_over():
+        hint = utils.endgame_hint()
+        if hint is not None:
+            value, (vertex, code) = hint
+            st.caption(f"Perfect play from here ends with a polychrome count of {value}; "
+                       f"best move: vertex {vertex} in {engine.COLOR_NAMES[code]}.")
+
+    # Get hover data with warnings for game phase
+    with metrics.span("hover"):
+        hover_data, _ = utils.get_hover_data()
+
+    # Plotly chart / visualization of board
+    # Highlight polychrome triangles only when all vertices are colored (game end)
+    with metrics.span("polychrome"):
+        highlight_xy = utils.get_final_highlight_xy() if board.is_over() else None
+    # Move-impact heat map over the uncolored vertices
+    heat = None
+    if st.session_state.get("heatmap") and not board.is_over():
+        with metrics.span("impact"):
+            heat = utils.get_impact_overlay()
+    with metrics.span("figure"):
+        fig = render.build_board_figure(geom, utils.get_plot_colors(), hover_data, heat=heat, highlight_xy=highlight_xy)
+    utils.record_figure_metrics(fig, hover_data)
+    utils.mark_seen()
 
     if not success and error_msg:  # Only show warning if there's an actual error message
         fig.add_annotation(
@@ -298,13 +253,38 @@ if selected:
             borderwidth=1,
             borderpad=4
         )
-        warning_spot.warning(error_msg)
-        # Clear the event so it doesn't stick around
-        if "last_selected_event" in st.session_state:
-            del st.session_state.last_selected_event
-    elif not success:
-        # Already colored vertex - just clear the event and do nothing
-        if "last_selected_event" in st.session_state:
-            del st.session_state.last_selected_event
-    else:
-        st.rerun()
\ No newline at end of file
+        st.warning(error_msg)
+
+    # Handle plot interactions: the click is picked up at the top of the next fragment run
+    # (imported here so the role selection page never loads the component; warm_up preloads it)
+    from streamlit_plotly_events import plotly_events
+    with metrics.span("plotly_events"):
+        plotly_events(
+            fig,
+            click_event=True,
+            hover_event=False,
+            select_event=False,
+            override_height=600,
+            key=utils.click_key("plot")
+        )
+
+    if owns_run:
+        utils.finish_run()
+
+
+play_area()
+
+
+@st.fragment(run_every=utils.POLL_INTERVAL)
+def watch_game():
+    """Redraw when another session moves in this game; otherwise only a version check"""
+    if utils.remote_changed():
+        utils.ensure_run("watch_game")
+        utils.rerun("remote_move")
+
+
+# Only games another session can change need watching
+if utils.needs_polling():
+    watch_game()
+
+utils.finish_run()
@@ -0,0 +1,273 @@
+import argparse
+import gc
+import json
+import math
+import platform
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+
+import engine
+import geometry
+import hover
+import lattice
+import render
+import simulate
+import solver
+
+'''
+Bench = timing and memory benchmarks across triangulation sizes
+
+Usage:
+    python bench.py --save baseline.json
+    python bench.py --baseline baseline.json --threshold 0.25
+
+Each case is timed on a board of every size (best of several runs) and
+its peak traced allocation is recorded. The output also fits a log-log
+scaling exponent per case. When run against a stored baseline, any case
+whose time or memory grew by more than the threshold is reported as a
+regression and the exit status is 1.
+'''
+
+
+DEFAULT_SIZES = (2, 5, 10, 20, 50, 100, 200, 400)
+DEFAULT_REPEAT = 5
+MIN_RUN_TIME = 0.05  # seconds; fast cases are looped until a run takes at least this long
+DEFAULT_THRESHOLD = 0.25
+# Differences below these are noise, not regressions
+MIN_SECONDS = 20e-6
+MIN_BYTES = 64 * 1024
+METRICS = ("seconds", "peak_bytes")
+
+
+def _final_board(n):
+    """A fully colored board (uniformly random allowed colors), fixed per n"""
+    geom = geometry.get_geometry(n)
+    rng = np.random.default_rng(n)
+    return simulate.random_completions(geom, solver.initial_colors(n), 1, rng)[0]
+
+
+def _setup_generate_triangle_coords(n):
+    return lambda: lattice.generate_triangle_coords(n)
+
+
+def _setup_generate_edges(n):
+    return lambda: lattice.generate_edges(n)
+
+
+def _setup_get_all_triangles(n):
+    return lambda: lattice.get_all_triangles(n)
+
+
+def _setup_assign_allowed_colors(n):
+    return lambda: lattice.assign_allowed_colors(n)
+
+
+def _setup_build_geometry(n):
+    return lambda: geometry._build_geometry(n)
+
+
+def _setup_get_polychrome_triangles(n):
+    names = engine.decode_colors(_final_board(n))
+    triangles = lattice.get_all_triangles(n)
+    return lambda: lattice.get_polychrome_triangles(names, triangles)
+
+
+def _setup_create_hover_data(n):
+    geom = geometry.get_geometry(n)
+    colors = solver.initial_colors(n)
+    return lambda: lattice.create_hover_data_with_warnings(geom.coords, colors, geom.allowed, "red")
+
+
+def _figure_inputs(n):
+    geom = geometry.get_geometry(n)
+    colors = _final_board(n)
+    plot_colors = engine.decode_colors(colors)
+    hover_data = hover.hover_suffixes(geom.allowed, colors, engine.COLOR_CODES["red"])
+    highlight = geom.triangles[engine.polychrome_mask(colors, geom.triangles)]
+    return geom, plot_colors, hover_data, highlight
+
+
+def _setup_get_highlight_xy(n):
+    geom, _, _, highlight = _figure_inputs(n)
+    return lambda: render.get_highlight_xy(geom.coords, highlight)
+
+
+def _setup_build_board_figure(n):
+    geom, plot_colors, hover_data, highlight = _figure_inputs(n)
+    return lambda: render.build_board_figure(geom, plot_colors, hover_data, highlight)
+
+
+def _setup_figure_to_json(n):
+    fig = render.build_board_figure(*_figure_inputs(n))
+    return fig.to_json
+
+
+# Name -> setup(n) returning the zero-argument callable to measure
+CASES = {
+    "generate_triangle_coords": _setup_generate_triangle_coords,
+    "generate_edges": _setup_generate_edges,
+    "get_all_triangles": _setup_get_all_triangles,
+    "assign_allowed_colors": _setup_assign_allowed_colors,
+    "build_geometry": _setup_build_geometry,
+    "get_polychrome_triangles": _setup_get_polychrome_triangles,
+    "create_hover_data_with_warnings": _setup_create_hover_data,
+    "get_highlight_xy": _setup_get_highlight_xy,
+    "build_board_figure": _setup_build_board_figure,
+    "figure_to_json": _setup_figure_to_json,
+}
+
+
+def time_call(fn, repeat=DEFAULT_REPEAT, min_run_time=MIN_RUN_TIME):
+    """Best per-call wall time over `repeat` runs, each looping fn long enough to be measurable"""
+    loops = 1
+    while True:
+        start = time.perf_counter()
+        for _ in range(loops):
+            fn()
+        elapsed = time.perf_counter() - start
+        if elapsed >= min_run_time or loops >= 1 << 20:
+            break
+        loops *= 2 if elapsed == 0 else max(2, math.ceil(min_run_time / elapsed))
+
+    best = elapsed / loops
+    for _ in range(repeat - 1):
+        start = time.perf_counter()
+        for _ in range(loops):
+            fn()
+        best = min(best, (time.perf_counter() - start) / loops)
+    return best
+
+
+def peak_memory(fn):
+    """Peak bytes traced by tracemalloc during one call"""
+    gc.collect()
+    tracemalloc.start()
+    try:
+        fn()
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def scaling_exponent(sizes, values):
+    """Slope of log(value) against log(vertex count), i.e. value ~ V ** slope"""
+    points = [
+        (math.log((n + 1) * (n + 2) // 2), math.log(v))
+        for n, v in zip(sizes, values) if v > 0
+    ]
+    if len(points) < 2:
+        return None
+    x, y = np.array(points).T
+    return float(np.polyfit(x, y, 1)[0])
+
+
+def run_suite(sizes=DEFAULT_SIZES, cases=None, repeat=DEFAULT_REPEAT, log=None):
+    """Measure every case at every size; returns a JSON-serialisable report"""
+    cases = list(cases or CASES)
+    results = {}
+    for name in cases:
+        results[name] = {}
+        for n in sizes:
+            fn = CASES[name](n)
+            results[name][str(n)] = {
+                "seconds": time_call(fn, repeat),
+                "peak_bytes": peak_memory(fn),
+            }
+            if log:
+                log(f"{name:32s} n={n:<4d} {format_seconds(results[name][str(n)]['seconds']):>10s}"
+                    f" {format_bytes(results[name][str(n)]['peak_bytes']):>10s}")
+
+    scaling = {
+        name: {
+            metric: scaling_exponent(sizes, [results[name][str(n)][metric] for n in sizes])
+            for metric in METRICS
+        }
+        for name in cases
+    }
+    return {
+        "meta": {
+            "python": sys.version.split()[0],
+            "numpy": np.__version__,
+            "platform": platform.platform(),
+            "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "sizes": list(sizes),
+            "repeat": repeat,
+        },
+        "results": results,
+        "scaling": scaling,
+    }
+
+
+def compare(report, baseline, threshold=DEFAULT_THRESHOLD):
+    """(case, n, metric, baseline value, new value) for every measurement worse by more than threshold"""
+    regressions = []
+    floors = {"seconds": MIN_SECONDS, "peak_bytes": MIN_BYTES}
+    for name, by_size in report["results"].items():
+        for n, measured in by_size.items():
+            previous = baseline.get("results", {}).get(name, {}).get(n)
+            if previous is None:
+                continue
+            for metric in METRICS:
+                old, new = previous[metric], measured[metric]
+                if new - old > floors[metric] and new > old * (1 + threshold):
+                    regressions.append((name, int(n), metric, old, new))
+    return regressions
+
+
+def format_seconds(seconds):
+    for unit, scale in (("s", 1), ("ms", 1e-3), ("us", 1e-6)):
+        if seconds >= scale:
+            return f"{seconds / scale:.2f}{unit}"
+    return f"{seconds / 1e-9:.0f}ns"
+
+
+def format_bytes(size):
+    for unit, scale in (("GiB", 2 ** 30), ("MiB", 2 ** 20), ("KiB", 2 ** 10)):
+        if size >= scale:
+            return f"{size / scale:.1f}{unit}"
+    return f"{size}B"
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark board construction and rendering across sizes")
+    parser.add_argument("--sizes", type=int, nargs="+", default=list(DEFAULT_SIZES))
+    parser.add_argument("--cases", nargs="+", choices=list(CASES), default=None)
+    parser.add_argument("--repeat", type=int, default=DEFAULT_REPEAT)
+    parser.add_argument("--save", help="write the report to this JSON file (e.g. a new baseline)")
+    parser.add_argument("--baseline", help="compare against this stored JSON report")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD,
+                        help="relative slowdown or memory growth that counts as a regression")
+    args = parser.parse_args(argv)
+
+    report = run_suite(args.sizes, args.cases, args.repeat, log=print)
+
+    print("\nScaling exponents (value ~ vertices ** k):")
+    for name, exponents in report["scaling"].items():
+        time_k, memory_k = (exponents[m] for m in METRICS)
+        print(f"{name:32s} time {time_k if time_k is not None else float('nan'):5.2f}"
+              f"  memory {memory_k if memory_k is not None else float('nan'):5.2f}")
+
+    if args.save:
+        with open(args.save, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"\nSaved report to {args.save}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        regressions = compare(report, baseline, args.threshold)
+        if regressions:
+            print(f"\n{len(regressions)} regression(s) beyond {args.threshold:.0%}:")
+            for name, n, metric, old, new in regressions:
+                fmt = format_seconds if metric == "seconds" else format_bytes
+                print(f"  {name} n={n} {metric}: {fmt(old)} -> {fmt(new)} ({new / old:.2f}x)")
+            return 1
+        print(f"\nNo regressions beyond {args.threshold:.0%} against {args.baseline}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,151 @@
+import array
+
+import numpy as np
+
+import engine
+import geometry
+
+'''
+Board = headless game state for Sperner's Game
+
+SpernerBoard owns the coloring, whose turn it is, the player roles and the
+running polychrome count, with no dependency on Streamlit or Plotly, so the
+same object drives the app, agents, benchmarks and batch jobs. Moves are
+(vertex, color code) pairs. A board is one byte per vertex, a packed move
+log and a few scalars; everything that depends only on n is the shared,
+read-only geometry.
+'''
+
+
+PLAYERS = ("Player 1", "Player 2")
+ROLES = ("Maximizer", "Minimizer")
+
+
+class IllegalMove(ValueError):
+    """Raised when a move colors an already-colored vertex or uses a disallowed color"""
+
+
+class SpernerBoard:
+    """One game in progress at triangulation level n"""
+    __slots__ = ("geom", "colors", "log", "polychrome_count", "player1_role")
+
+    def __init__(self, n, player1_role=None):
+        self.geom = geometry.get_geometry(n)
+        self.colors = np.zeros(self.geom.num_vertices, dtype=np.int8)
+        self.log = array.array("I")
+        self.polychrome_count = 0
+        self.player1_role = player1_role
+
+        # Pre-color 3 corners (not part of the move log)
+        apex, left_corner, right_corner = self.geom.corners
+        self.colors[apex] = engine.COLOR_CODES["red"]
+        self.colors[left_corner] = engine.COLOR_CODES["blue"]
+        self.colors[right_corner] = engine.COLOR_CODES["green"]
+        self.polychrome_count = engine.count_polychrome(self.colors, self.geom.triangles)
+
+    @classmethod
+    def replay(cls, n, vertices, codes, player1_role=None):
+        """Board after playing the given moves in order (trusted to be legal)"""
+        game = cls(n, player1_role)
+        vertices = np.asarray(vertices, dtype=np.uint32)
+        codes = np.asarray(codes, dtype=np.uint32)
+        game.colors[vertices] = codes
+        game.log.frombytes(encode_move(vertices, codes).astype(np.uint32).tobytes())
+        game.polychrome_count = engine.count_polychrome(game.colors, game.geom.triangles)
+        return game
+
+    @property
+    def n(self):
+        return self.geom.n
+
+    @property
+    def current_player(self):
+        # Player 1 moves first, so the turn follows from the number of moves played
+        return PLAYERS[len(self.log) % 2]
+
+    @property
+    def player2_role(self):
+        if self.player1_role is None:
+            return None
+        return ROLES[1] if self.player1_role == ROLES[0] else ROLES[0]
+
+    @property
+    def current_role(self):
+        return self.player1_role if self.current_player == PLAYERS[0] else self.player2_role
+
+    @property
+    def maximizer_to_move(self):
+        return self.current_role == "Maximizer"
+
+    def set_roles(self, player1_role):
+        """Assign player 1's role; player 2 gets the other one"""
+        if player1_role not in ROLES:
+            raise ValueError(f"Unknown role {player1_role!r}; choose from {', '.join(ROLES)}")
+        self.player1_role = player1_role
+
+    def copy(self):
+        """Independent copy; the shared geometry is not duplicated"""
+        other = SpernerBoard.__new__(SpernerBoard)
+        other.geom = self.geom
+        other.colors = self.colors.copy()
+        other.log = array.array("I", self.log)
+        other.polychrome_count = self.polychrome_count
+        other.player1_role = self.player1_role
+        return other
+
+    def is_empty(self, vertex):
+        return self.colors[vertex] == engine.EMPTY
+
+    def is_legal(self, move):
+        vertex, code = move
+        return bool(self.is_empty(vertex) and engine.color_allowed(self.geom.allowed, vertex, code))
+
+    def legal_moves(self):
+        """All (vertex, color code) moves available now"""
+        vertices, columns = np.nonzero(engine.legal_moves_mask(self.colors, self.geom.allowed))
+        return list(zip(vertices.tolist(), (columns + 1).tolist()))
+
+    def is_over(self):
+        return engine.all_colored(self.colors)
+
+    def moves(self):
+        """The (vertex, color code) moves played so far, in order"""
+        return [decode_move(entry) for entry in self.log]
+
+    def apply(self, move):
+        """Color a vertex, update the polychrome count and pass the turn"""
+        vertex, code = move
+        if not self.is_legal(move):
+            raise IllegalMove(f"Illegal move {(vertex, code)}")
+        self.colors[vertex] = code
+        self.log.append(encode_move(vertex, code))
+        # None of the incident triangles was polychrome while the vertex was empty
+        self.polychrome_count += self._polychrome_at(vertex)
+
+    def undo(self):
+        """Take back the last move and return it (None if there is nothing to undo)"""
+        if not self.log:
+            return None
+        vertex, code = decode_move(self.log.pop())
+        self.polychrome_count -= self._polychrome_at(vertex)
+        self.colors[vertex] = engine.EMPTY
+        return vertex, code
+
+    def polychrome_triangles(self):
+        """(k, 3) vertex indices of the currently polychrome triangles"""
+        return self.geom.triangles[engine.polychrome_mask(self.colors, self.geom.triangles)]
+
+    def _polychrome_at(self, vertex):
+        """Number of polychrome triangles touching a vertex"""
+        incident = self.geom.vertex_triangles[vertex]
+        incident = incident[incident >= 0]
+        return engine.count_polychrome(self.colors, self.geom.triangles[incident])
+
+
+def encode_move(vertex, code):
+    """Pack a move into one move-log entry"""
+    return vertex << 2 | code
+
+
+def decode_move(entry):
+    return entry >> 2, entry & 3
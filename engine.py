@@ -0,0 +1,102 @@
+import numpy as np
+
+'''
+Engine = array-backed board representation for Sperner's Game
+
+Colors are stored as small ints (0 = uncolored), triangles as a (T, 3) index
+array and allowed colors as a per-vertex bitmask, so that board-wide checks
+are single array expressions.
+'''
+
+
+EMPTY = 0
+COLOR_NAMES = (None, "red", "green", "blue")
+COLOR_CODES = {"red": 1, "green": 2, "blue": 3}
+
+# Bit for each color code (index 0 = uncolored contributes no bit)
+COLOR_BITS = np.array([0, 1, 2, 4], dtype=np.uint8)
+ALL_COLORS = 7
+
+
+def encode_colors(vertex_colors):
+    """Convert a list of color names (None = uncolored) to a color code array"""
+    return np.array(
+        [COLOR_CODES[c] if c is not None else EMPTY for c in vertex_colors],
+        dtype=np.int8
+    )
+
+
+def decode_colors(colors):
+    """Convert a color code array back to a list of color names"""
+    return [COLOR_NAMES[c] for c in colors.tolist()]
+
+
+def encode_allowed(allowed_colors, num_vertices):
+    """Convert a dict of allowed color sets to a per-vertex bitmask array"""
+    masks = np.full(num_vertices, ALL_COLORS, dtype=np.uint8)
+    for v, allowed in allowed_colors.items():
+        masks[v] = sum(int(COLOR_BITS[COLOR_CODES[c]]) for c in allowed)
+    return masks
+
+
+def mask_to_names(mask):
+    """Return the sorted color names contained in a bitmask"""
+    return sorted(c for c in COLOR_NAMES[1:] if mask & COLOR_BITS[COLOR_CODES[c]])
+
+
+def triangle_array(triangles):
+    """Convert a list of vertex triples to a (T, 3) index array"""
+    return np.asarray(triangles, dtype=np.int32).reshape(-1, 3)
+
+
+def polychrome_mask(colors, triangles):
+    """Boolean mask over triangles that carry all three colors (colors may be a (B, V) batch)"""
+    bits = COLOR_BITS[colors[..., triangles]]
+    return (bits[..., 0] | bits[..., 1] | bits[..., 2]) == ALL_COLORS
+
+
+def count_polychrome(colors, triangles):
+    """Number of triangles that carry all three colors"""
+    return int(np.count_nonzero(polychrome_mask(colors, triangles)))
+
+
+def move_gains(colors, triangles, vertex_triangles):
+    """(..., V, 3) polychrome triangles completed by coloring each empty vertex with each color
+
+    Column k is color code k + 1; colors may be a single board or a (B, V) batch.
+    Only meaningful for uncolored vertices.
+    """
+    bits = COLOR_BITS[colors[..., triangles]]
+    present = bits[..., 0] | bits[..., 1] | bits[..., 2]
+    # Padding index -1 picks up an appended zero, which never matches a target
+    present = np.concatenate([present, np.zeros(present.shape[:-1] + (1,), dtype=present.dtype)], axis=-1)
+    around = present[..., vertex_triangles]
+    # Coloring with c completes a triangle whose other two vertices hold the other two colors
+    targets = ALL_COLORS ^ COLOR_BITS[1:]
+    return np.count_nonzero(around[..., None] == targets, axis=-2)
+
+
+def color_allowed(allowed_masks, vertex, code):
+    """Check whether a color code is allowed at a vertex by the boundary rules"""
+    return bool(allowed_masks[vertex] & COLOR_BITS[code])
+
+
+def legal_moves_mask(colors, allowed_masks):
+    """(..., V, 3) boolean mask of legal (vertex, color) moves; column k is code k + 1"""
+    return (colors == EMPTY)[..., None] & ((allowed_masks[:, None] & COLOR_BITS[1:]) != 0)
+
+
+def allowed_code_table(allowed_masks):
+    """(V, 3) allowed color codes per vertex, left-packed and zero-padded, plus the (V,) counts"""
+    codes = np.zeros((len(allowed_masks), 3), dtype=np.int8)
+    counts = np.zeros(len(allowed_masks), dtype=np.int64)
+    for code in (1, 2, 3):
+        has = (allowed_masks & COLOR_BITS[code]) != 0
+        codes[has, counts[has]] = code
+        counts += has
+    return codes, counts
+
+
+def all_colored(colors):
+    """Check whether every vertex has been colored"""
+    return bool(np.all(colors != EMPTY))
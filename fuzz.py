@@ -0,0 +1,158 @@
+import argparse
+import sys
+import time
+from collections import namedtuple
+
+import numpy as np
+
+import engine
+import lattice
+
+'''
+Fuzz = Sperner-parity property checker for polychrome counting engines
+
+Sperner's lemma says every legal final coloring has an odd number of
+polychrome triangles, so any counting engine can be checked against it
+without knowing the right answer. Boards are drawn in batches from the
+allowed-color masks of assign_allowed_colors, counted for the whole batch
+in one vectorized pass over get_all_triangles, and every count must be
+odd; a sample of each batch is also recounted with reference_count, a
+plain-Python count of the set of colors at each triangle that shares no
+code with the engines, one board at a time. A new engine is a function
+from a (B, V) color code batch and the (T, 3) triangles to the (B,)
+counts; add it to ENGINES to put it under test.
+
+Usage:
+    python fuzz.py --n 2 5 10 20 --boards 1000000 --engine mask
+'''
+
+
+DEFAULT_BOARDS = 1_000_000
+DEFAULT_REFERENCE_SAMPLE = 16  # boards per batch recounted with the reference
+BATCH_BYTES = 64 * 2 ** 20  # budget for the (B, T, 3) gather of one batch
+
+FuzzReport = namedtuple("FuzzReport", [
+    "n",
+    "engine",
+    "boards",
+    "seconds",          # time spent inside the engine
+    "boards_per_second",
+    "parity_failures",  # boards whose count is even
+    "reference_checked",
+    "reference_failures",
+    "counterexample",   # first failing board (color codes), or None
+])
+
+
+def count_mask(boards, triangles):
+    """Color-bit OR per triangle (engine.polychrome_mask)"""
+    return np.count_nonzero(engine.polychrome_mask(boards, triangles), axis=-1)
+
+
+def count_arithmetic(boards, triangles):
+    """Codes 1, 2, 3 are the only nonzero triple with sum 6 and product 6"""
+    corners = boards[..., triangles].astype(np.int16)
+    total = corners.sum(axis=-1)
+    product = corners.prod(axis=-1)
+    return np.count_nonzero((total == 6) & (product == 6), axis=-1)
+
+
+def reference_count(board, triangle_list):
+    """Triangles whose three colors are all different, counted one by one in plain Python"""
+    colors = board.tolist()
+    return sum(1 for a, b, c in triangle_list if {colors[a], colors[b], colors[c]} == {1, 2, 3})
+
+
+# Name -> counting engine under test
+ENGINES = {
+    "mask": count_mask,
+    "arithmetic": count_arithmetic,
+}
+
+
+def allowed_table(n):
+    """(V, 3) left-packed allowed color codes and (V,) counts from assign_allowed_colors"""
+    num_vertices = (n + 1) * (n + 2) // 2
+    masks = engine.encode_allowed(lattice.assign_allowed_colors(n), num_vertices)
+    return engine.allowed_code_table(masks)
+
+
+def random_boards(codes, counts, batch, rng):
+    """(batch, V) legal final colorings, each vertex uniform over its allowed colors"""
+    choice = (rng.random((batch, len(counts))) * counts).astype(np.int64)
+    return codes[np.arange(len(counts)), choice]
+
+
+def fuzz(n, boards=DEFAULT_BOARDS, engine_name="mask", seed=None,
+         reference_sample=DEFAULT_REFERENCE_SAMPLE, batch_size=None):
+    """Check an engine's counts on random legal boards; returns a FuzzReport"""
+    count = ENGINES[engine_name]
+    rng = np.random.default_rng(seed)
+    codes, counts = allowed_table(n)
+    triangle_list = lattice.get_all_triangles(n)
+    triangles = engine.triangle_array(triangle_list)
+    batch_size = batch_size or max(1, BATCH_BYTES // (3 * len(triangles)))
+
+    seconds = 0.0
+    parity_failures = reference_checked = reference_failures = 0
+    counterexample = None
+    done = 0
+    while done < boards:
+        batch = random_boards(codes, counts, min(batch_size, boards - done), rng)
+        start = time.perf_counter()
+        result = np.asarray(count(batch, triangles))
+        seconds += time.perf_counter() - start
+
+        even = np.flatnonzero(result % 2 == 0)
+        parity_failures += len(even)
+        if len(even) and counterexample is None:
+            counterexample = batch[even[0]].tolist()
+
+        for i in rng.choice(len(batch), min(reference_sample, len(batch)), replace=False).tolist():
+            reference_checked += 1
+            if reference_count(batch[i], triangle_list) != result[i]:
+                reference_failures += 1
+                if counterexample is None:
+                    counterexample = batch[i].tolist()
+        done += len(batch)
+
+    return FuzzReport(
+        n=n,
+        engine=engine_name,
+        boards=done,
+        seconds=seconds,
+        boards_per_second=done / seconds if seconds else float("inf"),
+        parity_failures=parity_failures,
+        reference_checked=reference_checked,
+        reference_failures=reference_failures,
+        counterexample=counterexample,
+    )
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Fuzz polychrome counting engines against Sperner's lemma")
+    parser.add_argument("--n", type=int, nargs="+", default=[2, 5, 10, 20])
+    parser.add_argument("--boards", type=int, default=DEFAULT_BOARDS, help="random boards per n")
+    parser.add_argument("--engine", choices=list(ENGINES), nargs="+", default=list(ENGINES))
+    parser.add_argument("--reference-sample", type=int, default=DEFAULT_REFERENCE_SAMPLE,
+                        help="boards per batch recounted with reference_count")
+    parser.add_argument("--batch-size", type=int, default=None)
+    parser.add_argument("--seed", type=int, default=None)
+    args = parser.parse_args(argv)
+
+    failed = False
+    for name in args.engine:
+        for n in args.n:
+            report = fuzz(n, args.boards, name, args.seed, args.reference_sample, args.batch_size)
+            ok = not report.parity_failures and not report.reference_failures
+            failed |= not ok
+            print(f"{name:12s} n={n:<4d} {report.boards} boards, {report.boards_per_second:,.0f} boards/s, "
+                  f"{report.parity_failures} even, {report.reference_failures}/{report.reference_checked} "
+                  f"reference mismatches  {'ok' if ok else 'FAIL'}")
+            if not ok:
+                print(f"    counterexample: {report.counterexample}")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,160 @@
+import functools
+from collections import namedtuple
+
+import numpy as np
+
+import engine
+
+'''
+Geometry = cached, precomputed lattice arrays for each triangulation level
+
+Everything here is a pure function of n, so one read-only copy per n is
+shared by every session in the process (least recently used levels are
+evicted first).
+'''
+
+
+GEOMETRY_CACHE_SIZE = 16
+
+# Clicks farther than this from every vertex are ignored (neighbours are 1.0 apart)
+CLICK_TOLERANCE = 0.4
+ROW_SPACING = np.sqrt(3) / 2
+
+Geometry = namedtuple("Geometry", [
+    "n",                 # triangulation level
+    "num_vertices",      # (n + 1)(n + 2) / 2
+    "coords",            # (V, 2) float64 vertex positions
+    "rows",              # (V,) lattice row of each vertex
+    "cols",              # (V,) lattice column of each vertex
+    "edges",             # (E, 2) vertex index pairs
+    "triangles",         # (T, 3) vertex index triples
+    "allowed",           # (V,) allowed color bitmask (see engine.COLOR_BITS)
+    "boundary",          # (3, V) membership of the red-blue, red-green and blue-green edges
+    "corners",           # (3,) red apex, blue left corner, green right corner
+    "vertex_triangles",  # (V, 6) incident triangle indices, padded with -1
+    "vertex_neighbors",  # (V, 6) adjacent vertex indices, padded with -1
+    "mirror",            # (V,) vertex permutation of the reflection swapping the blue and green sides
+])
+
+
+def vertex_index(r, c):
+    """Index of the vertex at lattice row r, column c"""
+    return r * (r + 1) // 2 + c
+
+
+def _freeze(array):
+    array.flags.writeable = False
+    return array
+
+
+def _group_padded(keys, values, num_keys, width=6):
+    """Group values by key into a (num_keys, width) array padded with -1"""
+    order = np.argsort(keys, kind="stable")
+    keys, values = keys[order], values[order]
+    starts = np.searchsorted(keys, np.arange(num_keys))
+    slots = np.arange(len(keys)) - starts[keys]
+    grouped = np.full((num_keys, width), -1, dtype=np.int32)
+    grouped[keys, slots] = values
+    return grouped
+
+
+def _build_geometry(n):
+    num_vertices = (n + 1) * (n + 2) // 2
+    rows = np.repeat(np.arange(n + 1, dtype=np.int32), np.arange(1, n + 2))
+    cols = np.arange(num_vertices, dtype=np.int32) - vertex_index(rows, 0)
+
+    # Same layout as lattice.generate_triangle_coords
+    coords = np.column_stack([cols + (n - rows) / 2.0, rows * ROW_SPACING])
+
+    # Vertices above the bottom row each own one upward triangle, and one
+    # downward triangle to their right unless they end their row.
+    # Order matches lattice.get_all_triangles and lattice.generate_edges.
+    r, c = rows[rows < n], cols[rows < n]
+    here, below, below_right = vertex_index(r, c), vertex_index(r + 1, c), vertex_index(r + 1, c + 1)
+    up = np.stack([here, below, below_right], axis=1)
+    down = np.stack([below_right, here, here + 1], axis=1)
+    has_down = c < r
+    triangles = np.stack([up, down], axis=1).reshape(-1, 3)
+    triangles = triangles[np.stack([np.ones_like(has_down), has_down], axis=1).ravel()]
+    edges = np.stack([
+        np.stack([here, below], axis=1),
+        np.stack([here, below_right], axis=1),
+        np.stack([below, below_right], axis=1),
+    ], axis=1).reshape(-1, 2)
+
+    # Sperner's rule: a vertex may use the color of every corner whose
+    # barycentric weight is nonzero at that vertex
+    bits = engine.COLOR_BITS
+    allowed = (
+        np.where(rows < n, bits[engine.COLOR_CODES["red"]], 0)
+        | np.where(cols > 0, bits[engine.COLOR_CODES["green"]], 0)
+        | np.where(rows > cols, bits[engine.COLOR_CODES["blue"]], 0)
+    ).astype(np.uint8)
+    boundary = np.stack([cols == 0, cols == rows, rows == n])
+    corners = np.array([0, num_vertices - n - 1, num_vertices - 1], dtype=np.int32)
+
+    # Reflection through the apex: (r, c) -> (r, r - c)
+    mirror = vertex_index(rows, rows - cols).astype(np.int32)
+
+    vertex_triangles = _group_padded(
+        triangles.ravel(), np.repeat(np.arange(len(triangles), dtype=np.int32), 3), num_vertices
+    )
+    vertex_neighbors = _group_padded(
+        np.concatenate([edges[:, 0], edges[:, 1]]),
+        np.concatenate([edges[:, 1], edges[:, 0]]),
+        num_vertices
+    )
+
+    return Geometry(
+        n=n,
+        num_vertices=num_vertices,
+        coords=_freeze(coords),
+        rows=_freeze(rows),
+        cols=_freeze(cols),
+        edges=_freeze(edges.astype(np.int32)),
+        triangles=_freeze(triangles.astype(np.int32)),
+        allowed=_freeze(allowed),
+        boundary=_freeze(boundary),
+        corners=_freeze(corners),
+        vertex_triangles=_freeze(vertex_triangles),
+        vertex_neighbors=_freeze(vertex_neighbors),
+        mirror=_freeze(mirror),
+    )
+
+
+def resolve_clicks(geom, x, y, tolerance=CLICK_TOLERANCE):
+    """Map click positions to vertex indices by inverting the lattice layout (-1 = no vertex)"""
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+
+    # Nearest lattice row, then nearest column within that row
+    r = np.rint(y / ROW_SPACING).astype(np.int64)
+    c = np.rint(x - (geom.n - r) / 2.0).astype(np.int64)
+    on_board = (r >= 0) & (r <= geom.n) & (c >= 0) & (c <= r)
+
+    vertices = np.where(on_board, vertex_index(r, c), 0)
+    px, py = geom.coords[vertices, 0], geom.coords[vertices, 1]
+    hit = on_board & ((x - px) ** 2 + (y - py) ** 2 <= tolerance ** 2)
+    return np.where(hit, vertices, -1)
+
+
+def resolve_click(geom, x, y, tolerance=CLICK_TOLERANCE):
+    """Vertex index under a single click, or None if the click missed every vertex"""
+    vertex = int(resolve_clicks(geom, x, y, tolerance))
+    return vertex if vertex >= 0 else None
+
+
+@functools.lru_cache(maxsize=GEOMETRY_CACHE_SIZE)
+def get_geometry(n):
+    """Return the shared, read-only geometry for triangulation level n"""
+    return _build_geometry(n)
+
+
+def geometry_cache_info():
+    """Hits, misses and current size of the shared geometry cache"""
+    return get_geometry.cache_info()
+
+
+def clear_geometry_cache():
+    """Drop every cached triangulation level"""
+    get_geometry.cache_clear()
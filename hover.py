@@ -0,0 +1,97 @@
+import functools
+
+import numpy as np
+
+import engine
+import geometry
+
+'''
+Hover = vertex hover text built from a precomputed template table
+
+A vertex's hover text depends only on its allowed-color mask (7 kinds),
+its color (or none) and, while it is uncolored, the selected color. Each
+combination is one template key. The figure gets only the shared template
+string per vertex and adds the "Vertex i" label itself (see
+render.HOVER_TEMPLATE), so a session holds references, not strings, and
+entries are rewritten only for vertices whose key changed.
+'''
+
+
+PICKER_BITS = 2  # color codes 1-3 fit in two bits
+
+
+def template_key(allowed_masks, colors, picker_code):
+    """Per-vertex template key; the picked color only matters for uncolored vertices"""
+    colors = np.asarray(colors).astype(np.uint8)
+    picker = np.where(colors == engine.EMPTY, picker_code, 0).astype(np.uint8)
+    return (allowed_masks.astype(np.uint8) << 4) | (colors << PICKER_BITS) | picker
+
+
+def _template_text(mask, code, picker_code):
+    allowed = engine.mask_to_names(mask)
+    current_color = engine.COLOR_NAMES[picker_code]
+    if code != engine.EMPTY:
+        # Already colored vertex
+        color = engine.COLOR_NAMES[code]
+        return f'<span style="color:{color};">Current: {color}</span>'
+    if current_color not in allowed:
+        # Show warning for invalid color
+        return f'<br><span style="color:red;font-weight:bold;">❌ Cannot use {current_color}!</span><br><span style="color:black;">Allowed: {", ".join(allowed)}</span>'
+    # Show valid move info
+    return f'<br><span style="color:green;font-weight:bold">✓ Can use {current_color}</span><br><span style="color:black;">Allowed: {", ".join(allowed)}</span>'
+
+
+def _build_templates():
+    templates = [None] * (8 << 4)
+    for mask in range(1, 8):
+        for code in range(4):
+            for picker_code in range(1, 4) if code == engine.EMPTY else (0,):
+                key = (mask << 4) | (code << PICKER_BITS) | picker_code
+                templates[key] = _template_text(mask, code, picker_code)
+    return templates
+
+
+# Template key -> hover text after the vertex label
+TEMPLATES = _build_templates()
+
+
+@functools.lru_cache(maxsize=geometry.GEOMETRY_CACHE_SIZE)
+def vertex_labels(num_vertices):
+    """Shared '<b>Vertex i</b>' labels"""
+    return tuple(f'<b>Vertex {i}</b>' for i in range(num_vertices))
+
+
+def hover_texts(allowed_masks, colors, picker_code):
+    """Full list of hover texts for a board, labels included"""
+    labels = vertex_labels(len(allowed_masks))
+    keys = template_key(allowed_masks, colors, picker_code).tolist()
+    return [label + TEMPLATES[key] for label, key in zip(labels, keys)]
+
+
+def hover_suffixes(allowed_masks, colors, picker_code):
+    """Hover text after the vertex label, for figures that add the label themselves"""
+    return [TEMPLATES[key] for key in template_key(allowed_masks, colors, picker_code).tolist()]
+
+
+class HoverCache:
+    """Hover suffixes of one board, refreshed only where a vertex's template key changed"""
+
+    def __init__(self, allowed_masks):
+        self.allowed = allowed_masks
+        self.keys = None
+        self.texts = None
+
+    def update(self, colors, picker_code):
+        """Bring the texts up to date; returns {vertex: new text} for the vertices that changed"""
+        keys = template_key(self.allowed, colors, picker_code)
+        if self.keys is None:
+            self.keys = keys
+            self.texts = [TEMPLATES[key] for key in keys.tolist()]
+            return dict(enumerate(self.texts))
+
+        changed = np.flatnonzero(keys != self.keys)
+        diff = {}
+        for vertex, key in zip(changed.tolist(), keys[changed].tolist()):
+            diff[vertex] = self.texts[vertex] = TEMPLATES[key]
+        self.keys = keys
+        return diff
@@ -0,0 +1,88 @@
+import numpy as np
+
+import engine
+
+'''
+Impact = per-move polychrome deltas behind the move-impact heat map
+
+Coloring an empty vertex never breaks a polychrome triangle, so the change
+in the count from a move is just the number of triangles it completes. The
+(V, 3) table of those gains comes from one vectorized pass over the
+vertex-to-triangle incidence (engine.move_gains). After a move only the
+moved vertex and its neighbours can change, so later updates recompute
+just those rows.
+'''
+
+
+MAX_GAIN = 6  # a vertex belongs to at most six triangles
+
+
+def _text_key(best, best_gain, worst, worst_gain):
+    """Template index of a (best column, gain, worst column, gain) combination"""
+    return ((best * (MAX_GAIN + 1) + best_gain) * 3 + worst) * (MAX_GAIN + 1) + worst_gain
+
+
+def _build_texts():
+    texts = np.empty(3 * (MAX_GAIN + 1) * 3 * (MAX_GAIN + 1), dtype=object)
+    for best in range(3):
+        for worst in range(3):
+            for best_gain in range(MAX_GAIN + 1):
+                for worst_gain in range(MAX_GAIN + 1):
+                    b, w = engine.COLOR_NAMES[best + 1], engine.COLOR_NAMES[worst + 1]
+                    texts[_text_key(best, best_gain, worst, worst_gain)] = (
+                        f'<br><span style="color:{b};">Best: {b} (+{best_gain})</span>'
+                        f'<br><span style="color:{w};">Worst: {w} (+{worst_gain})</span>'
+                    )
+    return texts
+
+
+# Best/worst hover text per template index; the label and delta come from the trace
+TEXTS = _build_texts()
+
+
+class ImpactCache:
+    """Move gains of one board, refreshed only around vertices whose color changed"""
+
+    def __init__(self, geom):
+        self.geom = geom
+        self.colors = None
+        self.gains = None
+        self._legal = (geom.allowed[:, None] & engine.COLOR_BITS[1:]) != 0
+
+    def update(self, colors):
+        """Bring the gains up to date; returns the vertices whose rows were recomputed"""
+        geom = self.geom
+        if self.colors is None:
+            self.colors = colors.copy()
+            self.gains = engine.move_gains(colors, geom.triangles, geom.vertex_triangles).astype(np.int8)
+            return np.arange(geom.num_vertices)
+
+        changed = np.flatnonzero(colors != self.colors)
+        if not len(changed):
+            return changed
+        neighbors = geom.vertex_neighbors[changed]
+        affected = np.union1d(changed, neighbors[neighbors >= 0])
+
+        incident = geom.vertex_triangles[affected]
+        bits = engine.COLOR_BITS[colors[geom.triangles[incident]]]
+        present = np.where(incident >= 0, bits[..., 0] | bits[..., 1] | bits[..., 2], 0)
+        targets = engine.ALL_COLORS ^ engine.COLOR_BITS[1:]
+        self.gains[affected] = np.count_nonzero(present[..., None] == targets, axis=1)
+        self.colors = colors.copy()
+        return affected
+
+    def overlay(self, picker_code, maximizer_to_move):
+        """(vertices, deltas, hover texts) for the uncolored vertices where the picked color is allowed
+
+        Best and worst are among each vertex's allowed colors, from the point
+        of view of the side to move.
+        """
+        vertices = np.flatnonzero((self.colors == engine.EMPTY) & self._legal[:, picker_code - 1])
+        gains = self.gains[vertices]
+        legal = self._legal[vertices]
+        most = np.where(legal, gains, -1).argmax(axis=1)
+        least = np.where(legal, gains, np.iinfo(np.int8).max).argmin(axis=1)
+        best, worst = (most, least) if maximizer_to_move else (least, most)
+        rows = np.arange(len(vertices))
+        keys = _text_key(best, gains[rows, best].astype(np.intp), worst, gains[rows, worst].astype(np.intp))
+        return vertices, gains[:, picker_code - 1], TEXTS[keys].tolist()
@@ -0,0 +1,138 @@
+import json
+import logging
+import logging.handlers
+import os
+import sys
+import time
+from contextlib import contextmanager
+
+'''
+Instrument = timing spans, counters and structured logs for app reruns
+
+Each Streamlit script run gets a RunMetrics that accumulates the wall time
+of named phases and arbitrary counters. When the run ends, the record is
+written as one JSON line to a rotating log file. Everything goes through
+the "sperner" logger hierarchy, so verbosity is set in one place:
+SPERNER_LOG_LEVEL for diagnostics (TRACE adds per-item detail) and
+SPERNER_METRICS_LOG for the metrics file, which is only written when that
+variable (or the metrics_path argument) names one.
+'''
+
+
+LOGGER_NAME = "sperner"
+METRICS_LOGGER_NAME = "sperner.metrics"
+DEFAULT_LOG_LEVEL = "WARNING"
+METRICS_LOG_BYTES = 5 * 2 ** 20
+METRICS_LOG_BACKUPS = 3
+# Below DEBUG: per-item detail such as every polychrome triangle
+TRACE = 5
+logging.addLevelName(TRACE, "TRACE")
+
+logger = logging.getLogger(LOGGER_NAME)
+metrics_logger = logging.getLogger(METRICS_LOGGER_NAME)
+
+
+class JsonLineFormatter(logging.Formatter):
+    """Emit the record's message (a dict) as one JSON line"""
+
+    def format(self, record):
+        return json.dumps(record.msg, separators=(",", ":"), default=str)
+
+
+def configure_logging(level=None, metrics_path=None):
+    """Set up the sperner loggers once per process (later calls are no-ops)"""
+    if getattr(logger, "_configured", False):
+        return
+    logger._configured = True
+
+    level = level or os.environ.get("SPERNER_LOG_LEVEL", DEFAULT_LOG_LEVEL)
+    logger.setLevel(level.upper() if isinstance(level, str) else level)
+    if not logger.handlers:
+        handler = logging.StreamHandler()
+        handler.setFormatter(logging.Formatter("%(asctime)s %(levelname)s %(name)s: %(message)s"))
+        logger.addHandler(handler)
+
+    # Metrics go to a file only on request, at INFO on their own handler whatever the diagnostic level
+    metrics_path = os.environ.get("SPERNER_METRICS_LOG") if metrics_path is None else metrics_path
+    metrics_logger.setLevel(logging.INFO)
+    metrics_logger.propagate = False
+    if metrics_path:
+        handler = logging.handlers.RotatingFileHandler(
+            metrics_path, maxBytes=METRICS_LOG_BYTES, backupCount=METRICS_LOG_BACKUPS
+        )
+        handler.setFormatter(JsonLineFormatter())
+        metrics_logger.addHandler(handler)
+
+
+def deep_size(obj, shared=(), skip=(), _seen=None):
+    """Approximate bytes held by an object graph, not counting objects of the `shared` types
+    or the objects in `skip`
+
+    Arrays count their own buffer only (views of another array count nothing),
+    so read-only data referenced from a shared cache is not charged to the holder.
+    """
+    seen = {id(item) for item in skip} if _seen is None else _seen
+    if id(obj) in seen or isinstance(obj, shared):
+        return 0
+    seen.add(id(obj))
+
+    size = sys.getsizeof(obj)
+    if isinstance(obj, dict):
+        size += sum(deep_size(k, shared, _seen=seen) + deep_size(v, shared, _seen=seen) for k, v in obj.items())
+    elif isinstance(obj, (list, tuple, set, frozenset)):
+        size += sum(deep_size(item, shared, _seen=seen) for item in obj)
+    elif hasattr(obj, "__array_interface__") and not isinstance(obj, type):
+        # ndarray getsizeof already includes an owned buffer
+        pass
+    else:
+        if hasattr(obj, "__dict__"):
+            size += deep_size(vars(obj), shared, _seen=seen)
+        for slot in getattr(type(obj), "__slots__", ()):
+            if hasattr(obj, slot):
+                size += deep_size(getattr(obj, slot), shared, _seen=seen)
+    return size
+
+
+class RunMetrics:
+    """Phase timings and counters for one script run"""
+
+    def __init__(self, run_id=None):
+        self.run_id = run_id
+        self.started = time.time()
+        self._start = time.perf_counter()
+        self.spans = {}
+        self.counters = {}
+        self.finished = False
+
+    @contextmanager
+    def span(self, name):
+        """Time a block; repeated spans with the same name add up"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.spans[name] = self.spans.get(name, 0.0) + time.perf_counter() - start
+
+    def count(self, name, amount=1):
+        self.counters[name] = self.counters.get(name, 0) + amount
+
+    def set(self, name, value):
+        self.counters[name] = value
+
+    def record(self):
+        return {
+            "run_id": self.run_id,
+            "time": self.started,
+            "total": time.perf_counter() - self._start,
+            "spans": dict(self.spans),
+            "counters": dict(self.counters),
+        }
+
+    def finish(self):
+        """Write the run record to the metrics log once and return it"""
+        record = self.record()
+        if not self.finished:
+            self.finished = True
+            metrics_logger.info(record)
+            logger.debug("run %s finished in %.1f ms", self.run_id, record["total"] * 1000)
+        return record
@@ -0,0 +1,138 @@
+import numpy as np
+
+import engine
+import hover
+import instrument
+
+'''
+Lattice = list-based reference construction of the triangulated board
+
+The helpers the app was first written with, under their original names
+and signatures. Vertex coordinates, edges, triangles and the Sperner color
+rules are still built in plain Python lists and dicts; geometry builds the
+same layout as arrays and is what the game uses, and bench times the two
+against each other. get_polychrome_triangles and
+create_hover_data_with_warnings only adapt the old arguments and call the
+engine and hover tables, so they are not an independent check of those
+(fuzz.reference_count is). Nothing here imports a UI package, so tools
+that only need the board load in the time it takes to import NumPy.
+'''
+
+
+logger = instrument.logger.getChild("lattice")
+
+
+def generate_triangle_coords(n_rows):
+    '''Compute vertex positions '''
+    coords = []
+    x_spacing = 1.0
+    y_spacing = np.sqrt(3) / 2
+    for row in range(n_rows + 1):
+        for col in range(row + 1):
+            x = float(col * x_spacing + (n_rows - row) * x_spacing / 2)
+            y = float(row * y_spacing)
+            coords.append((x, y))
+    return coords
+
+
+def generate_edges(n_rows):
+    '''Generate triangle edges'''
+    edges = []
+    idx = lambda r, c: r * (r + 1) // 2 + c
+    for r in range(n_rows):
+        for c in range(r + 1):
+            i = idx(r, c)
+            edges.append((i, idx(r + 1, c)))
+            edges.append((i, idx(r + 1, c + 1)))
+            edges.append((idx(r + 1, c), idx(r + 1, c + 1)))
+    return edges
+
+def assign_allowed_colors(n):
+    '''Apply Sperner's Lemma rules'''
+    allowed = {}
+    total_vertices = (n + 1) * (n + 2) // 2
+
+    apex = 0  # red
+    left_corner = total_vertices - n - 1  # blue
+    right_corner = total_vertices - 1    # green
+
+    for i in range(total_vertices):
+        allowed[i] = {"red", "green", "blue"}  # internal default
+
+    # Red-Blue edge (top to bottom-left)
+    for i in range(1, n):
+        idx = i * (i + 1) // 2  # (row i, col 0)
+        allowed[idx] = {"red", "blue"}
+
+    # Red-Green edge (top to bottom-right)
+    for i in range(1, n):
+        idx = i * (i + 1) // 2 + i  # (row i, col i)
+        allowed[idx] = {"red", "green"}
+
+    # Blue-Green edge (bottom row)
+    base_start = n * (n + 1) // 2
+    for i in range(1, n):  # skip the two corners
+        allowed[base_start + i] = {"blue", "green"}
+
+    # Corners
+    allowed[apex] = {"red"}
+    allowed[left_corner] = {"blue"}
+    allowed[right_corner] = {"green"}
+
+    return allowed
+
+
+def get_all_triangles(n):
+    """Generate all triangles in the triangulation"""
+    triangles = []
+    idx = lambda r, c: r * (r + 1) // 2 + c
+
+    # Generate triangles systematically
+    for r in range(n):
+        for c in range(r + 1):
+            # Upward-pointing triangle: vertex at (r,c) with two vertices below
+            v1 = idx(r, c)
+            v2 = idx(r + 1, c)
+            v3 = idx(r + 1, c + 1)
+            triangles.append((v1, v2, v3))
+            
+            # Downward-pointing triangle: vertex at (r+1, c+1) with two vertices above
+            # This triangle exists if c < r (not at the rightmost position of the row)
+            if c < r:
+                v1 = idx(r + 1, c + 1)  # bottom vertex
+                v2 = idx(r, c)          # top-left vertex  
+                v3 = idx(r, c + 1)      # top-right vertex
+                triangles.append((v1, v2, v3))
+
+    return triangles
+
+
+def _color_codes(vertex_colors):
+    colors = np.asarray(vertex_colors)
+    if colors.dtype.kind not in "iu":  # color names rather than codes
+        colors = engine.encode_colors(vertex_colors)
+    return colors
+
+
+def get_polychrome_triangles(vertex_colors, triangles):
+    """Find triangles that have all three colors (red, green, blue)"""
+    colors = _color_codes(vertex_colors)
+    tri_array = engine.triangle_array(triangles)
+    polychrome = tri_array[engine.polychrome_mask(colors, tri_array)].tolist()
+    logger.debug("%d of %d triangles are polychrome", len(polychrome), len(tri_array))
+    if logger.isEnabledFor(instrument.TRACE):
+        for tri in polychrome:
+            logger.log(instrument.TRACE, "Polychrome triangle: vertices %s -> colors %s", tri, colors[tri].tolist())
+    return [tuple(tri) for tri in polychrome]
+
+
+def create_hover_data_with_warnings(points, vertex_colors, allowed_colors, current_color):
+    """Create hover data that includes warning info for invalid moves
+
+    Takes the allowed colors as the dict of assign_allowed_colors (vertices
+    missing from it allow every color) or as a bitmask array, and the
+    vertex colors as names (None = uncolored) or color codes.
+    """
+    if isinstance(allowed_colors, dict):
+        allowed_colors = engine.encode_allowed(allowed_colors, len(points))
+    return hover.hover_texts(allowed_colors, _color_codes(vertex_colors), engine.COLOR_CODES[current_color])
@@ -0,0 +1,152 @@
+import math
+import time
+
+import numpy as np
+
+import engine
+import geometry
+
+'''
+MCTS = Monte Carlo Tree Search opponent for Sperner's Game
+
+Each search iteration walks the tree with UCT, expands one move and scores
+the new leaf with a batch of random completions evaluated as one array
+expression. The tree is kept between moves so later searches start from
+the statistics gathered earlier.
+'''
+
+
+DEFAULT_TIME_BUDGET = 1.0
+DEFAULT_ROLLOUTS = 64
+EXPLORATION = 1.4
+
+
+class Node:
+    """One position in the search tree; values are polychrome counts"""
+    __slots__ = ("move", "children", "untried", "visits", "total", "maximizer_to_move")
+
+    def __init__(self, move, untried, maximizer_to_move):
+        self.move = move
+        self.children = {}
+        self.untried = untried
+        self.visits = 0
+        self.total = 0.0
+        self.maximizer_to_move = maximizer_to_move
+
+
+class MCTSAgent:
+    """Time- or iteration-budgeted MCTS player that reuses its tree between moves"""
+
+    def __init__(self, n, time_budget=DEFAULT_TIME_BUDGET, iterations=None,
+                 rollouts=DEFAULT_ROLLOUTS, exploration=EXPLORATION, seed=None):
+        self.geom = geometry.get_geometry(n)
+        self.time_budget = time_budget
+        self.iterations = iterations
+        self.rollouts = rollouts
+        self.exploration = exploration
+        self.rng = np.random.default_rng(seed)
+
+        # Allowed color codes per vertex, padded, for vectorized sampling
+        self._allowed_codes, self._allowed_count = engine.allowed_code_table(self.geom.allowed)
+        # Rewards are scaled by the triangle count so UCT sees values in [0, 1]
+        self._scale = float(len(self.geom.triangles))
+
+        self.root = None
+        self.root_colors = None
+
+    def legal_moves(self, colors):
+        """All (vertex, color code) moves available on a board"""
+        vertices, columns = np.nonzero(engine.legal_moves_mask(colors, self.geom.allowed))
+        return list(zip(vertices.tolist(), (columns + 1).tolist()))
+
+    def rollout(self, colors, count=None):
+        """Mean final polychrome count over a batch of random completions of a board"""
+        count = count or self.rollouts
+        empty = np.flatnonzero(colors == engine.EMPTY)
+        if len(empty) == 0:
+            return float(engine.count_polychrome(colors, self.geom.triangles))
+
+        boards = np.broadcast_to(colors, (count, len(colors))).copy()
+        choice = (self.rng.random((count, len(empty))) * self._allowed_count[empty]).astype(np.int64)
+        boards[:, empty] = self._allowed_codes[empty, choice]
+        return float(np.mean(np.count_nonzero(
+            engine.polychrome_mask(boards, self.geom.triangles), axis=1
+        )))
+
+    def advance(self, colors, maximizer_to_move):
+        """Move the root to the given position, keeping the matching subtree if there is one"""
+        colors = np.asarray(colors, dtype=np.int8)
+        node = None
+        if self.root is not None and self.root_colors is not None:
+            played = np.flatnonzero(self.root_colors != colors)
+            consistent = np.all(self.root_colors[played] == engine.EMPTY)
+            node = self.root if consistent else None
+            pending = {(int(v), int(colors[v])) for v in played}
+            while node is not None and pending:
+                node = next((node.children[m] for m in pending if m in node.children), None)
+                if node is not None:
+                    pending.discard(node.move)
+            if node is not None and node.maximizer_to_move != maximizer_to_move:
+                node = None
+
+        if node is None:
+            node = Node(None, self.legal_moves(colors), maximizer_to_move)
+        self.root = node
+        self.root_colors = colors.copy()
+
+    def choose_move(self, colors, maximizer_to_move):
+        """Search from a position and return the most visited (vertex, color code) move"""
+        self.advance(colors, maximizer_to_move)
+        if not self.root.untried and not self.root.children:
+            return None
+
+        deadline = time.perf_counter() + self.time_budget if self.time_budget is not None else None
+        done = 0
+        while True:
+            self._iterate()
+            done += 1
+            if self.iterations is not None and done >= self.iterations:
+                break
+            if deadline is not None and time.perf_counter() >= deadline:
+                break
+            if self.iterations is None and deadline is None:
+                break
+
+        move, _ = max(self.root.children.items(), key=lambda item: item[1].visits)
+        return move
+
+    def _select_child(self, node):
+        log_visits = math.log(node.visits)
+        sign = 1.0 if node.maximizer_to_move else -1.0
+        best, best_score = None, -math.inf
+        for child in node.children.values():
+            mean = child.total / child.visits / self._scale
+            score = sign * mean + self.exploration * math.sqrt(log_visits / child.visits)
+            if score > best_score:
+                best, best_score = child, score
+        return best
+
+    def _iterate(self):
+        node = self.root
+        colors = self.root_colors.copy()
+        path = [node]
+
+        # Selection
+        while not node.untried and node.children:
+            node = self._select_child(node)
+            colors[node.move[0]] = node.move[1]
+            path.append(node)
+
+        # Expansion
+        if node.untried:
+            move = node.untried.pop(int(self.rng.integers(len(node.untried))))
+            colors[move[0]] = move[1]
+            child = Node(move, self.legal_moves(colors), not node.maximizer_to_move)
+            node.children[move] = child
+            path.append(child)
+
+        # Simulation, then backpropagation
+        value = self.rollout(colors)
+        for visited in path:
+            visited.visits += 1
+            visited.total += value
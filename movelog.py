@@ -0,0 +1,223 @@
+import mmap
+import os
+import struct
+import threading
+import time
+from collections import namedtuple
+
+import numpy as np
+
+import board
+
+'''
+Movelog = append-only binary archive of games, memory-mapped for replay
+
+Layout of an archive directory:
+    games.bin   one region per game: a fixed header, then room for every
+                ply of the game as fixed-size move records
+    games.idx   little-endian uint64 region offset per game id
+
+A game's maximum length is known when it starts (one ply per uncolored
+vertex), so its whole region is reserved up front and every game stays
+contiguous no matter how games interleave. Seeking to a game is one index
+lookup, and the board at any ply is a single vectorized scatter of the
+record prefix, so no snapshots are needed. Undo moves the cursor back;
+redo moves it forward again until a new move overwrites the redo tail.
+The header also keeps the session token holding each seat, so a game
+reloaded after eviction or a server restart hands every player back their
+own seat.
+'''
+
+
+DATA_FILE = "games.bin"
+INDEX_FILE = "games.idx"
+MAGIC = b"SPG2"
+
+# magic, n, player 1 role, computer seat, length, cursor, start time, last move time,
+# then the session token holding each seat (all zero bytes = free)
+HEADER = struct.Struct("<4sHBBIIdd16s16s")
+TOKEN_BYTES = 16
+# vertex, color code | player << 2, milliseconds since the previous move
+RECORD = struct.Struct("<IBI")
+RECORD_DTYPE = np.dtype([("vertex", "<u4"), ("flags", "u1"), ("delta_ms", "<u4")])
+OFFSET = struct.Struct("<Q")
+MAX_DELTA_MS = 2 ** 32 - 1
+
+ROLE_CODES = {None: 0, "Maximizer": 1, "Minimizer": 2}
+SEAT_CODES = {None: 0, "Player 1": 1, "Player 2": 2}
+SEATS = ("Player 1", "Player 2")
+
+GameHeader = namedtuple("GameHeader", [
+    "n", "player1_role", "computer_seat", "length", "cursor", "started", "last_move",
+    "seats",  # seat -> hex token of the session holding it, for the seats that are taken
+])
+
+
+def _decode(codes, value):
+    return next(key for key, code in codes.items() if code == value)
+
+
+def _pack_tokens(seats):
+    return [bytes.fromhex(seats[seat]) if seat in seats else bytes(TOKEN_BYTES) for seat in SEATS]
+
+
+def _unpack_tokens(tokens):
+    return {seat: token.hex() for seat, token in zip(SEATS, tokens) if any(token)}
+
+
+def game_capacity(n):
+    """Plies in a full game: every vertex but the three corners"""
+    return (n + 1) * (n + 2) // 2 - 3
+
+
+class MoveArchive:
+    """Thread-safe archive of every game played, shared by all sessions of a process"""
+
+    def __init__(self, path):
+        self.path = path
+        os.makedirs(path, exist_ok=True)
+        self._lock = threading.RLock()
+        self._files = {}
+        self._maps = {}
+        for name in (DATA_FILE, INDEX_FILE):
+            full = os.path.join(path, name)
+            if not os.path.exists(full):
+                open(full, "wb").close()
+            self._files[name] = open(full, "r+b")
+            self._remap(name)
+
+    def _remap(self, name):
+        if self._maps.get(name) is not None:
+            self._maps[name].close()
+        size = os.fstat(self._files[name].fileno()).st_size
+        self._maps[name] = mmap.mmap(self._files[name].fileno(), size) if size else None
+
+    def _append(self, name, payload):
+        f = self._files[name]
+        f.seek(0, os.SEEK_END)
+        offset = f.tell()
+        f.write(payload)
+        f.flush()
+        self._remap(name)
+        return offset
+
+    def __len__(self):
+        index = self._maps[INDEX_FILE]
+        return len(index) // OFFSET.size if index is not None else 0
+
+    def close(self):
+        with self._lock:
+            for name, mapped in self._maps.items():
+                if mapped is not None:
+                    mapped.close()
+                self._files[name].close()
+
+    # Game headers
+
+    def new_game(self, n, player1_role=None, computer_seat=None):
+        """Reserve a region for a new game; returns its id"""
+        now = time.time()
+        header = HEADER.pack(
+            MAGIC, n, ROLE_CODES[player1_role], SEAT_CODES[computer_seat], 0, 0, now, now, *_pack_tokens({})
+        )
+        with self._lock:
+            offset = self._append(DATA_FILE, header + bytes(game_capacity(n) * RECORD.size))
+            self._append(INDEX_FILE, OFFSET.pack(offset))
+            return len(self) - 1
+
+    def _offset(self, game_id):
+        if not 0 <= game_id < len(self):
+            raise KeyError(f"No game {game_id} in {self.path}")
+        return OFFSET.unpack_from(self._maps[INDEX_FILE], game_id * OFFSET.size)[0]
+
+    def header(self, game_id):
+        with self._lock:
+            magic, n, role, seat, length, cursor, started, last, *tokens = HEADER.unpack_from(
+                self._maps[DATA_FILE], self._offset(game_id)
+            )
+        if magic != MAGIC:
+            raise ValueError(f"Game {game_id} in {self.path} is corrupt or from an older archive format")
+        return GameHeader(
+            n, _decode(ROLE_CODES, role), _decode(SEAT_CODES, seat), length, cursor, started, last,
+            _unpack_tokens(tokens),
+        )
+
+    def _write_header(self, game_id, header):
+        HEADER.pack_into(
+            self._maps[DATA_FILE], self._offset(game_id), MAGIC, header.n,
+            ROLE_CODES[header.player1_role], SEAT_CODES[header.computer_seat],
+            header.length, header.cursor, header.started, header.last_move, *_pack_tokens(header.seats),
+        )
+
+    def set_roles(self, game_id, player1_role, computer_seat=None):
+        with self._lock:
+            header = self.header(game_id)
+            self._write_header(game_id, header._replace(player1_role=player1_role, computer_seat=computer_seat))
+
+    def set_seats(self, game_id, seats):
+        """Record which session token (32 hex digits) holds each seat, so seats survive a reload"""
+        with self._lock:
+            header = self.header(game_id)
+            self._write_header(game_id, header._replace(seats=dict(seats)))
+
+    # Moves
+
+    def append(self, game_id, vertex, code, now=None):
+        """Record a move at the cursor, discarding any undone moves after it"""
+        now = time.time() if now is None else now
+        with self._lock:
+            header = self.header(game_id)
+            if header.cursor >= game_capacity(header.n):
+                raise ValueError(f"Game {game_id} is already complete")
+            delta_ms = min(MAX_DELTA_MS, max(0, int((now - header.last_move) * 1000)))
+            player = header.cursor % 2
+            RECORD.pack_into(
+                self._maps[DATA_FILE], self._record_offset(game_id, header.cursor),
+                vertex, code | player << 2, delta_ms,
+            )
+            self._write_header(game_id, header._replace(
+                length=header.cursor + 1, cursor=header.cursor + 1, last_move=now
+            ))
+
+    def undo(self, game_id):
+        """Step the cursor back; returns the undone (vertex, color code) or None"""
+        with self._lock:
+            header = self.header(game_id)
+            if header.cursor == 0:
+                return None
+            self._write_header(game_id, header._replace(cursor=header.cursor - 1))
+            return self._move(game_id, header.cursor - 1)
+
+    def redo(self, game_id):
+        """Step the cursor forward over an undone move; returns it or None"""
+        with self._lock:
+            header = self.header(game_id)
+            if header.cursor >= header.length:
+                return None
+            self._write_header(game_id, header._replace(cursor=header.cursor + 1))
+            return self._move(game_id, header.cursor)
+
+    def _record_offset(self, game_id, ply):
+        return self._offset(game_id) + HEADER.size + ply * RECORD.size
+
+    def _move(self, game_id, ply):
+        vertex, flags, _ = RECORD.unpack_from(self._maps[DATA_FILE], self._record_offset(game_id, ply))
+        return vertex, flags & 3
+
+    def records(self, game_id, stop=None):
+        """Structured array of the game's move records up to `stop` (default: the cursor)"""
+        with self._lock:
+            header = self.header(game_id)
+            stop = header.cursor if stop is None else min(stop, header.length)
+            return np.frombuffer(
+                self._maps[DATA_FILE], dtype=RECORD_DTYPE, count=stop,
+                offset=self._record_offset(game_id, 0),
+            ).copy()
+
+    def board_at(self, game_id, ply=None):
+        """SpernerBoard after `ply` moves (default: at the cursor)"""
+        header = self.header(game_id)
+        records = self.records(game_id, ply)
+        return board.SpernerBoard.replay(
+            header.n, records["vertex"], records["flags"] & 3, header.player1_role
+        )
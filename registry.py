@@ -0,0 +1,114 @@
+import threading
+import time
+
+'''
+Registry = process-wide table of live games shared between sessions
+
+Every game in play is held once per server process, keyed by its archive
+game id (see movelog). A browser session keeps only the id and a reference
+to the shared SharedGame, so two players on different devices, and any
+number of spectators, look at the same board. Moves are made under the
+game's own lock and bump its version number; other sessions poll that
+number and redraw only when it changes. Games nobody has touched for the
+TTL are dropped; the archive still has every move, so a later visit just
+replays it.
+'''
+
+
+DEFAULT_TTL = 30 * 60  # seconds a game may sit untouched before it is evicted
+SEATS = ("Player 1", "Player 2")
+
+
+class SharedGame:
+    """One live game: the board, its lock, a version number and who holds each seat"""
+    __slots__ = ("game_id", "board", "lock", "version", "seats", "computer_seat", "touched")
+
+    def __init__(self, game_id, board, computer_seat=None, seats=None):
+        self.game_id = game_id
+        self.board = board
+        self.lock = threading.RLock()
+        self.version = 0
+        # Seat -> token of the session playing it; the computer's seat is never claimed
+        self.seats = dict(seats or {})
+        self.computer_seat = computer_seat
+        self.touched = time.monotonic()
+
+    def claim(self, token, seats=SEATS):
+        """Give a session the free human seats among `seats`; returns the seats it holds
+
+        A session that already holds a seat is returning and keeps just that;
+        only a newcomer takes free seats.
+        """
+        with self.lock:
+            if self.seats_of(token):
+                return self.seats_of(token)
+            for seat in seats:
+                if seat != self.computer_seat and seat not in self.seats:
+                    self.seats[seat] = token
+            return self.seats_of(token)
+
+    def seats_of(self, token):
+        return tuple(seat for seat in SEATS if self.seats.get(seat) == token)
+
+    def controls(self, token, seat):
+        """Whether the session may move for this seat"""
+        return self.seats.get(seat) == token
+
+    def moved(self):
+        """Mark the board as changed; call with the lock held"""
+        self.version += 1
+
+
+class GameRegistry:
+    """Thread-safe map of game id -> SharedGame with idle eviction"""
+
+    def __init__(self, ttl=DEFAULT_TTL):
+        self.ttl = ttl
+        self._games = {}
+        self._lock = threading.Lock()
+        self._next_sweep = time.monotonic() + ttl / 10
+
+    def __len__(self):
+        return len(self._games)
+
+    def __contains__(self, game_id):
+        return game_id in self._games
+
+    def get(self, game_id):
+        """The live game, or None; counts as a visit"""
+        game = self._games.get(game_id)
+        if game is not None:
+            game.touched = time.monotonic()
+        return game
+
+    def open(self, game_id, load):
+        """The live game with this id, loading it with load() -> (board, computer seat[, seats]) if needed"""
+        game = self.get(game_id)
+        if game is not None:
+            return game
+        with self._lock:
+            self._sweep()
+            game = self._games.get(game_id)
+            if game is None:
+                # Loading replays the archive, which is quick, so it is done under the lock
+                # rather than risk two sessions creating two copies of one game
+                game = self._games[game_id] = SharedGame(game_id, *load())
+            return game
+
+    def evict_idle(self, now=None):
+        """Drop every game untouched for the TTL; returns how many were dropped"""
+        with self._lock:
+            return self._drop_idle(time.monotonic() if now is None else now)
+
+    def _sweep(self):
+        # Called with the lock held; eviction runs at most every tenth of the TTL
+        now = time.monotonic()
+        if now >= self._next_sweep:
+            self._next_sweep = now + self.ttl / 10
+            self._drop_idle(now)
+
+    def _drop_idle(self, now):
+        idle = [game_id for game_id, game in self._games.items() if now - game.touched > self.ttl]
+        for game_id in idle:
+            del self._games[game_id]
+        return len(idle)
@@ -0,0 +1,141 @@
+import numpy as np
+import plotly.graph_objects as go
+
+'''
+Render = Plotly figure construction for the Sperner board
+
+The whole board is drawn with a fixed, small number of traces (edges,
+highlighted triangles, vertices and the optional move-impact heat map)
+regardless of n, switching to WebGL for large boards.
+'''
+
+
+# Boards with more vertices than this (n >= 24, up to the app's largest) are drawn with Scattergl
+WEBGL_VERTEX_THRESHOLD = 300
+
+# Vertex hover: the label is added here so per-vertex texts can be shared strings
+HOVER_TEMPLATE = '<b>Vertex %{pointNumber}</b>%{text}<extra></extra>'
+
+# Heat map points show their own label and the delta of the picked color
+HEAT_HOVER_TEMPLATE = ('<b>Vertex %{customdata[0]}</b><br>With the picked color: +%{customdata[1]}'
+                       '%{text}<extra></extra>')
+
+# Fixed trace order: clicks are only resolved on the vertex trace (and the
+# heat map drawn over it, when present)
+EDGE_TRACE = 0
+HIGHLIGHT_TRACE = 1
+VERTEX_TRACE = 2
+HEAT_TRACE = 3
+CLICKABLE_TRACES = (VERTEX_TRACE, HEAT_TRACE)
+
+# Vertex order of upward and downward triangles sorted by angle around the
+# centroid, and the closing index of an outline
+UP_ORDER = [0, 2, 1]
+DOWN_ORDER = [1, 2, 0]
+CLOSED = [0, 1, 2, 0]
+
+
+def segments_to_xy(points, segments):
+    """Flatten polylines of vertex indices into x, y arrays separated by gaps (NaN)"""
+    segments = np.asarray(segments).reshape(len(segments), -1)
+    xy = np.full((len(segments), segments.shape[1] + 1, 2), np.nan)
+    xy[:, :-1] = points[segments]
+    xy = xy.reshape(-1, 2)
+    return xy[:, 0], xy[:, 1]
+
+
+def get_highlight_xy(points, triangles):
+    """Closed outlines of the given triangles as gap-separated x, y arrays
+
+    Triangles come in the lattice's two layouts, upward (apex, bottom-left,
+    bottom-right) and downward (bottom, top-left, top-right), so each one's
+    vertex order around its centroid is known from which way it points.
+    """
+    triangles = np.asarray(triangles, dtype=np.int64).reshape(-1, 3)
+    if not len(triangles):
+        return np.empty(0), np.empty(0)
+    # An upward triangle's first vertex is above its second (smaller y)
+    up = points[triangles[:, 0], 1] < points[triangles[:, 1], 1]
+    ordered = np.where(up[:, None], triangles[:, UP_ORDER], triangles[:, DOWN_ORDER])
+    return segments_to_xy(points, ordered[:, CLOSED])
+
+
+def build_board_figure(geom, plot_colors, hover_data, highlight_triangles=(), title=None, heat=None,
+                       highlight_xy=None):
+    """Build the board figure: one edge trace, one highlight trace and one vertex trace
+
+    hover_data is the per-vertex text shown after the "Vertex i" label.
+    highlight_xy, if given, is the precomputed get_highlight_xy outline and
+    replaces highlight_triangles.
+    heat, if given, is (vertices, deltas, hover texts) for the heat map trace
+    (see impact.ImpactCache.overlay).
+    """
+    points = geom.coords
+    scatter = go.Scattergl if geom.num_vertices > WEBGL_VERTEX_THRESHOLD else go.Scatter
+    # Shrink markers as the lattice gets denser so neighbours don't overlap
+    marker_size = min(16, max(4, 320 // geom.n))
+
+    fig = go.Figure()
+
+    edge_x, edge_y = segments_to_xy(points, geom.edges)
+    fig.add_trace(scatter(
+        x=edge_x, y=edge_y,
+        mode='lines',
+        line=dict(color='grey', width=1),
+        hoverinfo='skip',
+        showlegend=False,
+        name='edges'
+    ))
+
+    highlight_x, highlight_y = highlight_xy if highlight_xy is not None else get_highlight_xy(points, highlight_triangles)
+    fig.add_trace(scatter(
+        x=highlight_x,
+        y=highlight_y,
+        fill='toself',
+        fillcolor='rgba(255,255,0, 1)',
+        mode='lines',
+        line=dict(width=1, color='black'),
+        hoverinfo='skip',
+        showlegend=False,
+        name='polychrome'
+    ))
+
+    fig.add_trace(scatter(
+        x=points[:, 0], y=points[:, 1],
+        mode='markers',
+        marker=dict(size=marker_size, color=plot_colors, line=dict(color='black', width=1)),
+        text=hover_data,
+        hovertemplate=HOVER_TEMPLATE,
+        showlegend=False,
+        name='vertices'
+    ))
+
+    if heat is not None:
+        vertices, deltas, texts = heat
+        fig.add_trace(scatter(
+            x=points[vertices, 0], y=points[vertices, 1],
+            mode='markers',
+            marker=dict(
+                size=marker_size * 1.8, symbol='circle-open', line=dict(width=3),
+                color=deltas, colorscale='YlOrRd', cmin=0, cmax=max(1, int(deltas.max(initial=0))),
+                colorbar=dict(title='+count', thickness=12),
+            ),
+            customdata=np.column_stack([vertices, deltas]),
+            text=texts,
+            hovertemplate=HEAT_HOVER_TEMPLATE,
+            showlegend=False,
+            name='impact'
+        ))
+
+    fig.update_layout(
+        height=600,
+        margin=dict(t=20, b=20, l=20, r=20),
+        xaxis=dict(visible=False, scaleanchor='y', scaleratio=1, constrain='domain'),
+        yaxis=dict(visible=False, constrain='domain', autorange='reversed'),
+        plot_bgcolor='rgb(40,40,40)',
+        hovermode='closest'
+    )
+    if title:
+        fig.update_layout(title=dict(text=title, x=0.5, font=dict(color='white')))
+
+    return fig
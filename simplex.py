@@ -0,0 +1,277 @@
+import argparse
+import array
+import itertools
+import math
+import time
+
+import numpy as np
+
+import board
+
+'''
+Simplex = Sperner boards on the standard subdivision of a d-simplex
+
+The m-th subdivision has a vertex for every integer point y with
+m >= y_1 >= y_2 >= ... >= y_d >= 0. Its barycentric coordinates are
+a_0 = m - y_1, a_i = y_i - y_(i+1), a_d = y_d, and a vertex may take color
+i + 1 only where a_i > 0 (Sperner's rule, one bit per corner). Vertices
+are ranked by the combinatorial number system on z_i = y_i + d - i; for
+d = 2 this is the r * (r + 1) // 2 + c indexing of geometry.py (y = (r, c)),
+with colors relabeled so that codes 1, 2, 3 belong to corners 0, 1, 2.
+
+The sub-simplices are the Kuhn/Freudenthal ones: every cell base b (a
+point of the (m - 1)-th lattice) and every ordering of the d axes that
+keeps the vertices ordered give the simplex b, b + e_p1, ..., b + 1, for
+m ** d in all. They are produced from ranges of base ranks one chunk at a
+time, so counting fully colored simplices never holds the whole mesh.
+'''
+
+
+CHUNK_ELEMENTS = 1 << 21  # candidate vertex coordinates generated per enumeration chunk
+MAX_DIMENSION = 14  # color bits of a simplex must fit in uint16
+
+
+class SimplexLattice:
+    """Vertex ranking, Sperner masks and sub-simplex enumeration for one (d, m)"""
+
+    def __init__(self, d, m):
+        if not 1 <= d <= MAX_DIMENSION or m < 1:
+            raise ValueError(f"Need 1 <= d <= {MAX_DIMENSION} and m >= 1")
+        if math.comb(m + d, d) >= 2 ** 62:
+            raise ValueError(f"A {d}-simplex subdivided {m} times has too many vertices to index")
+        self.d = d
+        self.m = m
+        self.num_vertices = math.comb(m + d, d)
+        self.num_simplices = m ** d
+        self.full = (1 << (d + 1)) - 1
+        # comb[k, z] = C(z, k), for ranking and unranking
+        self.comb = np.array(
+            [[math.comb(z, k) for z in range(m + d + 2)] for k in range(d + 2)], dtype=np.int64
+        )
+        self._shift = np.arange(d - 1, -1, -1)  # d - i for i = 1..d
+        perms = np.array(list(itertools.permutations(range(d))), dtype=np.int64)
+        self._positions = np.argsort(perms, axis=1)
+        # Offsets of the d + 1 vertices of each Kuhn simplex from its cell base
+        steps = np.zeros((len(perms), d + 1, d), dtype=np.int64)
+        for k in range(1, d + 1):
+            steps[:, k] = steps[:, k - 1]
+            steps[np.arange(len(perms)), k, perms[:, k - 1]] = 1
+        self._steps = steps
+        self.chunk = max(1, CHUNK_ELEMENTS // steps.size)
+
+    def rank(self, y):
+        """Vertex index of (..., d) lattice coordinates"""
+        z = np.asarray(y, dtype=np.int64) + self._shift
+        return self.comb[np.arange(self.d, 0, -1), z].sum(axis=-1)
+
+    def unrank(self, index):
+        """(..., d) lattice coordinates of vertex indices"""
+        rest = np.array(index, dtype=np.int64)
+        y = np.empty(rest.shape + (self.d,), dtype=np.int64)
+        for i, k in enumerate(range(self.d, 0, -1)):
+            z = np.searchsorted(self.comb[k], rest, side="right") - 1
+            rest = rest - self.comb[k, z]
+            y[..., i] = z - self._shift[i]
+        return y
+
+    def barycentric(self, index):
+        """(..., d + 1) integer barycentric coordinates (summing to m)"""
+        y = self.unrank(index)
+        padded = np.concatenate([np.full(y.shape[:-1] + (1,), self.m), y, np.zeros(y.shape[:-1] + (1,), int)], axis=-1)
+        return padded[..., :-1] - padded[..., 1:]
+
+    def allowed_masks(self):
+        """(V,) Sperner masks: bit i is set where barycentric coordinate i is nonzero"""
+        a = self.barycentric(np.arange(self.num_vertices))
+        return ((a > 0) << np.arange(self.d + 1)).sum(axis=-1).astype(np.uint16)
+
+    def corners(self):
+        """Vertex index of corner i (a_i = m), for i = 0..d"""
+        y = np.array([[self.m] * i + [0] * (self.d - i) for i in range(self.d + 1)])
+        return self.rank(y)
+
+    def iter_simplices(self, chunk=None):
+        """Yield (k, d + 1) arrays of sub-simplex vertex indices, chunk cell bases at a time"""
+        chunk = chunk or self.chunk
+        num_bases = math.comb(self.m - 1 + self.d, self.d)
+        for start in range(0, num_bases, chunk):
+            bases = self.unrank(np.arange(start, min(start + chunk, num_bases)))
+            # Along a run of equal base coordinates the axes must be stepped in order
+            ties = bases[:, :-1] == bases[:, 1:]
+            out_of_order = self._positions[:, :-1] > self._positions[:, 1:]
+            valid = ~(ties[:, None, :] & out_of_order[None, :, :]).any(axis=-1)
+            cell, perm = np.nonzero(valid)
+            yield self.rank(bases[cell, None, :] + self._steps[perm])
+
+    def simplices(self):
+        """All sub-simplices as one (m ** d, d + 1) array (for meshes that fit in memory)"""
+        return np.concatenate(list(self.iter_simplices()))
+
+    def random_colorings(self, count, rng, masks=None):
+        """(count, V) legal final colorings with a uniform allowed color per vertex"""
+        masks = self.allowed_masks() if masks is None else masks
+        bits = (masks[:, None] >> np.arange(self.d + 1)) & 1
+        options = bits.sum(axis=1)
+        pick = (rng.random((count, self.num_vertices)) * options).astype(np.int64)
+        # Code of the pick-th allowed color: first color whose running count exceeds pick
+        running = np.cumsum(bits, axis=1)
+        return (running[None, :, :] <= pick[..., None]).sum(axis=-1).astype(np.int8) + 1
+
+    def count_fully_colored(self, colors, chunk=None):
+        """Fully colored sub-simplices of a (V,) coloring or a (B, V) batch, streamed over the mesh"""
+        colors = np.asarray(colors)
+        bits = np.where(colors > 0, np.left_shift(1, np.maximum(colors, 1).astype(np.int64) - 1), 0)
+        total = np.zeros(colors.shape[:-1], dtype=np.int64)
+        for simplices in self.iter_simplices(chunk):
+            present = np.bitwise_or.reduce(bits[..., simplices], axis=-1)
+            total += np.count_nonzero(present == self.full, axis=-1)
+        return total
+
+
+class SimplexBoard:
+    """A Sperner game on a d-simplex: same move and turn conventions as board.SpernerBoard
+
+    Corner i starts with color i + 1; players alternately color the other
+    vertices, and the count is the number of fully colored sub-simplices.
+    """
+
+    def __init__(self, d, m, player1_role=None):
+        self.lattice = SimplexLattice(d, m)
+        self.allowed = self.lattice.allowed_masks()
+        self.simplices = self.lattice.simplices()
+        # Vertex -> incident simplices, as CSR
+        order = np.argsort(self.simplices.ravel(), kind="stable")
+        self._incident = (order // (d + 1)).astype(np.int64)
+        self._starts = np.searchsorted(self.simplices.ravel()[order], np.arange(self.lattice.num_vertices + 1))
+        self.colors = np.zeros(self.lattice.num_vertices, dtype=np.int8)
+        self.present = np.zeros(len(self.simplices), dtype=np.uint16)
+        self.filled = np.zeros(len(self.simplices), dtype=np.int8)
+        self.log = array.array("I")
+        self.polychrome_count = 0
+        self.player1_role = player1_role
+        for i, corner in enumerate(self.lattice.corners().tolist()):
+            self._color(corner, i + 1)
+
+    @property
+    def d(self):
+        return self.lattice.d
+
+    @property
+    def current_player(self):
+        return board.PLAYERS[len(self.log) % 2]
+
+    @property
+    def maximizer_to_move(self):
+        return (self.current_player == board.PLAYERS[0]) == (self.player1_role == "Maximizer")
+
+    def incident(self, vertex):
+        return self._incident[self._starts[vertex]:self._starts[vertex + 1]]
+
+    def legal_mask(self):
+        """(V, d + 1) boolean mask of legal moves; column k is color code k + 1"""
+        return (self.colors == 0)[:, None] & ((self.allowed[:, None] >> np.arange(self.d + 1)) & 1).astype(bool)
+
+    def legal_moves(self):
+        vertices, columns = np.nonzero(self.legal_mask())
+        return list(zip(vertices.tolist(), (columns + 1).tolist()))
+
+    def is_over(self):
+        return bool(np.all(self.colors != 0))
+
+    def moves(self):
+        return [(entry >> 4, entry & 15) for entry in self.log]
+
+    def move_gains(self):
+        """(V, d + 1) fully colored simplices each move would complete
+
+        A simplex is completed by its one empty vertex when its d colored
+        vertices already carry d distinct colors; the missing color is the
+        only one that completes it.
+        """
+        gains = np.zeros((self.lattice.num_vertices, self.d + 1), dtype=np.int64)
+        ready = np.flatnonzero((self.filled == self.d) & (np.bitwise_count(self.present) == self.d))
+        if len(ready):
+            corners = self.simplices[ready]
+            missing = corners[np.arange(len(ready)), np.argmin(self.colors[corners] != 0, axis=1)]
+            # Index of the single missing color bit
+            color = np.bitwise_count((self.lattice.full ^ self.present[ready]) - 1).astype(np.int64)
+            np.add.at(gains, (missing, color), 1)
+        return gains
+
+    def apply(self, move):
+        vertex, code = move
+        if self.colors[vertex] != 0 or not self.allowed[vertex] >> (code - 1) & 1:
+            raise board.IllegalMove(f"Illegal move {(vertex, code)}")
+        self._color(vertex, code)
+        self.log.append(vertex << 4 | code)
+
+    def undo(self):
+        if not self.log:
+            return None
+        entry = self.log.pop()
+        vertex, code = entry >> 4, entry & 15
+        ids = self.incident(vertex)
+        self.polychrome_count -= int(np.count_nonzero(self.present[ids] == self.lattice.full))
+        self.colors[vertex] = 0
+        corner_colors = self.colors[self.simplices[ids]]
+        bits = np.where(corner_colors > 0, np.left_shift(1, np.maximum(corner_colors, 1).astype(np.int64) - 1), 0)
+        self.present[ids] = np.bitwise_or.reduce(bits, axis=1)
+        self.filled[ids] -= 1
+        return vertex, code
+
+    def _color(self, vertex, code):
+        ids = self.incident(vertex)
+        self.colors[vertex] = code
+        self.present[ids] |= 1 << (code - 1)
+        self.filled[ids] += 1
+        self.polychrome_count += int(np.count_nonzero(self.present[ids] == self.lattice.full))
+
+
+def play_game(d, m, policies=("random", "random"), player1_role="Maximizer", seed=None):
+    """Self-play one game with 'random' or 'greedy' players; returns (moves, final count)"""
+    rng = np.random.default_rng(seed)
+    game = SimplexBoard(d, m, player1_role)
+    while not game.is_over():
+        legal = game.legal_mask()
+        if policies[len(game.log) % 2] == "greedy":
+            gains = game.move_gains()
+            scores = np.where(legal, gains if game.maximizer_to_move else -gains, np.iinfo(np.int64).min)
+            legal = scores == scores.max()
+        vertices, columns = np.nonzero(legal)
+        i = int(rng.integers(len(vertices)))
+        game.apply((int(vertices[i]), int(columns[i]) + 1))
+    return game.moves(), game.polychrome_count
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Sperner boards on a subdivided d-simplex")
+    parser.add_argument("--d", type=int, default=3)
+    parser.add_argument("--m", type=int, default=100, help="subdivisions per edge")
+    parser.add_argument("--boards", type=int, default=1, help="random colorings to count (streamed)")
+    parser.add_argument("--games", type=int, default=0, help="self-play games to run")
+    parser.add_argument("--game-m", type=int, default=6, help="subdivisions for self-play games")
+    parser.add_argument("--policy", choices=("random", "greedy"), nargs=2, default=("greedy", "random"))
+    parser.add_argument("--seed", type=int, default=None)
+    args = parser.parse_args(argv)
+
+    rng = np.random.default_rng(args.seed)
+    lattice = SimplexLattice(args.d, args.m)
+    print(f"d={args.d} m={args.m}: {lattice.num_vertices} vertices, {lattice.num_simplices} sub-simplices")
+    if args.boards:
+        colors = lattice.random_colorings(args.boards, rng)
+        start = time.perf_counter()
+        counts = lattice.count_fully_colored(colors)
+        elapsed = time.perf_counter() - start
+        print(f"fully colored counts {counts.tolist()[:10]}{' ...' if len(counts) > 10 else ''} "
+              f"(all odd: {bool(np.all(counts % 2 == 1))}), "
+              f"{args.boards * lattice.num_simplices / elapsed:,.0f} simplices/s")
+
+    counts = [play_game(args.d, args.game_m, args.policy, seed=rng.integers(2 ** 32))[1] for _ in range(args.games)]
+    if counts:
+        print(f"{args.games} games at d={args.d} m={args.game_m} ({' vs '.join(args.policy)}): "
+              f"mean {np.mean(counts):.2f}, min {min(counts)}, max {max(counts)}, "
+              f"all odd: {all(c % 2 == 1 for c in counts)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,291 @@
+import argparse
+import time
+
+import numpy as np
+
+import engine
+import geometry
+import solver
+
+'''
+Simulate = vectorized batch playouts of Sperner's Game
+
+BatchSimulator advances B independent games in lockstep: colors live in a
+(B, V) matrix, the color bits present in every triangle in a (B, T) matrix,
+and each ply picks and applies one move per board as a single array step.
+One-ply gains are kept per (board, vertex); coloring a vertex only adds a
+color to its own triangles, so a move just adds the change in those
+triangles' gain counters to their empty corners. A policy rates each
+vertex by one table lookup on that state (best color and the colors tied
+with it), fresh random priorities break ties among the best vertices, and
+one argmax per board picks the move.
+'''
+
+
+POLICIES = ("random", "greedy")
+MAX_GAIN = 6  # a vertex touches at most six triangles
+DEFAULT_BATCH_SIZE = 8192  # boards per lockstep batch; small enough to stay in cache
+
+
+def random_completions(geom, colors, count, rng, table=None):
+    """(count, V) boards completing `colors` with an independent uniform allowed color per empty vertex
+
+    This is also the exact distribution of final boards when both players move
+    uniformly at random, since every vertex is colored exactly once.
+    """
+    codes, counts = table if table is not None else engine.allowed_code_table(geom.allowed)
+    boards = np.broadcast_to(np.asarray(colors, dtype=np.int8), (count, geom.num_vertices)).copy()
+    empty = np.flatnonzero(boards[0] == engine.EMPTY)
+    if len(empty):
+        choice = (rng.random((count, len(empty))) * counts[empty]).astype(np.int64)
+        boards[:, empty] = codes[empty, choice]
+    return boards
+
+
+def _score_tables():
+    """Vertex score lookup tables indexed by a vertex's 15-bit move state
+
+    The state packs the vertex's one-ply gain for each color (4 bits each) with
+    the colors still open to it (3 bits, zero once the vertex is colored). The
+    score holds the policy's preference for the vertex's best open color in
+    the top three bits and, in the low three, the open colors that share that
+    preference. Closed vertices score 0.
+    """
+    state = np.arange(1 << 15, dtype=np.int64)[:, None]
+    gains = (state >> np.array([0, 4, 8])) & 0xF
+    open_colors = ((state >> 12) & engine.COLOR_BITS[1:]) != 0
+
+    def table(preference):
+        rated = np.where(open_colors, preference + 1, 0)
+        best = rated.max(axis=1, keepdims=True)
+        ties = ((rated == best) & open_colors) @ engine.COLOR_BITS[1:]
+        return np.where(best[:, 0] > 0, best[:, 0] << 13 | ties, 0).astype(np.uint16)
+
+    return {
+        ("greedy", True): table(gains),
+        ("greedy", False): table(MAX_GAIN - gains),
+        ("random", True): table(np.zeros_like(gains)),
+        ("random", False): table(np.zeros_like(gains)),
+    }
+
+
+def _priority_table():
+    """Random vertex priorities in 13 bits, indexed by (tie mask, 13 random bits)
+
+    A vertex with k tied best colors gets the largest of k uniform draws
+    (u ** (1 / k)), so each tied move, not each vertex, is equally likely to
+    come out on top; the color is then drawn among the vertex's tied ones.
+    """
+    draws = (np.arange(1 << 13) + 0.5) / (1 << 13)
+    # Eight masks of 8192 entries: the (mask << 13 | bits) index fits in 16 bits
+    table = np.zeros((8, 1 << 13), dtype=np.uint16)
+    for mask in range(1, 8):
+        k = bin(mask).count("1")
+        table[mask] = np.minimum(draws ** (1 / k) * (1 << 13), (1 << 13) - 1)
+    return table.ravel()
+
+
+# Tie mask -> its colors' columns, repeated to fill three slots, for drawing one of them
+TIE_COLUMNS = np.array([
+    [columns[j % len(columns)] for j in range(3)] if columns else [0, 0, 0]
+    for columns in ([c for c in range(3) if mask >> c & 1] for mask in range(8))
+], dtype=np.int8)
+TIE_COUNTS = np.array([bin(mask).count("1") for mask in range(8)])
+
+
+def _link_corners(geom):
+    """(V + 1, 6, 2) the two other corners of each incident triangle, counterclockwise around the vertex
+
+    Taken counterclockwise, every neighbour is the first corner of at most one
+    triangle and the second corner of at most one, so each of the two columns
+    can be scattered into without repeated indices. Padding (and the extra
+    padding vertex) points at vertex V.
+    """
+    num_vertices = geom.num_vertices
+    corners = np.full((num_vertices + 1, 6, 2), num_vertices, dtype=np.intp)
+    incident = geom.vertex_triangles
+    valid = incident >= 0
+    triangles = geom.triangles[np.where(valid, incident, 0)]
+    center = np.arange(num_vertices)[:, None, None]
+    others = np.sort(np.where(triangles == center, num_vertices, triangles), axis=-1)[..., :2]
+    a, b = geom.coords[others[..., 0]], geom.coords[others[..., 1]]
+    origin = geom.coords[:, None, :]
+    cross = (a[..., 0] - origin[..., 0]) * (b[..., 1] - origin[..., 1]) \
+        - (a[..., 1] - origin[..., 1]) * (b[..., 0] - origin[..., 0])
+    others = np.where((cross < 0)[..., None], others[..., ::-1], others)
+    corners[:-1] = np.where(valid[..., None], others, num_vertices)
+    return corners
+
+
+class BatchSimulator:
+    """B games played in lockstep from the same starting position"""
+
+    _tables = None
+    _priorities = None
+
+    def __init__(self, n, batch_size, seed=None, start_colors=None):
+        self.geom = geometry.get_geometry(n)
+        self.rng = np.random.default_rng(seed)
+        start = solver.initial_colors(n) if start_colors is None else np.asarray(start_colors, dtype=np.int8)
+        if BatchSimulator._tables is None:
+            BatchSimulator._tables = _score_tables()
+            BatchSimulator._priorities = _priority_table()
+        num_vertices, num_triangles = self.geom.num_vertices, len(self.geom.triangles)
+        self._rows = np.arange(batch_size)
+
+        # Colors with a padding vertex at the end, which stays uncolored and allows nothing
+        self._colors = np.zeros((batch_size, num_vertices + 1), dtype=np.int8)
+        self._colors[:, :-1] = start
+        self._color_rows = self._rows[:, None] * (num_vertices + 1)
+
+        # Color bits present in each triangle, with a zero padding column; it is
+        # indexed through flat offsets, so -1 entries are spelled out as padding
+        bits = engine.COLOR_BITS[self.colors[:, self.geom.triangles]]
+        self.present = np.zeros((batch_size, num_triangles + 1), dtype=np.uint8)
+        self.present[:, :-1] = bits[..., 0] | bits[..., 1] | bits[..., 2]
+        self._present_rows = self._rows[:, None] * (num_triangles + 1)
+        self._vertex_triangles = np.full((num_vertices + 1, 6), num_triangles, dtype=np.intp)
+        self._vertex_triangles[:-1] = np.where(self.geom.vertex_triangles < 0, num_triangles,
+                                               self.geom.vertex_triangles)
+        self._link = _link_corners(self.geom)
+
+        # A triangle holding exactly two distinct colors is completed by the
+        # third; pack that as a 4-bit counter per color (at most 6 per vertex)
+        gain_table = np.zeros(8, dtype=np.uint16)
+        for code in (1, 2, 3):
+            gain_table[engine.ALL_COLORS ^ engine.COLOR_BITS[code]] = 1 << (4 * (code - 1))
+        self._gain_table = gain_table
+        self._allowed = np.append(self.geom.allowed, 0).astype(np.uint16)
+
+        # Per (board, vertex) move state (see _score_tables), built once here
+        # and then updated only by the gains the last move added
+        self.move_state = self._full_state()
+
+    def _full_state(self):
+        """(B, V + 1) move state computed from scratch"""
+        present = self.present.ravel()[self._present_rows[..., None] + self._vertex_triangles]
+        gains = self._gain_table[present]
+        packed = gains[..., 0] + gains[..., 1] + gains[..., 2] + gains[..., 3] + gains[..., 4] + gains[..., 5]
+        open_colors = np.where(self._colors == engine.EMPTY, self._allowed, 0)
+        return packed | (open_colors << 12)
+
+    @property
+    def colors(self):
+        """(B, V) color codes of every board"""
+        return self._colors[:, :-1]
+
+    @property
+    def batch_size(self):
+        return len(self._colors)
+
+    def remaining_moves(self):
+        """Plies left; every board has the same number since they started together"""
+        return int(np.count_nonzero(self.colors[0] == engine.EMPTY))
+
+    def legal_mask(self):
+        """(B, V, 3) legal (vertex, color) moves on every board"""
+        open_colors = self.move_state[:, :-1, None] >> 12
+        return (open_colors & engine.COLOR_BITS[1:].astype(np.uint16)) != 0
+
+    def gains(self):
+        """(B, V, 3) immediate polychrome gain of every move on every board (0 where the vertex is colored)"""
+        packed = self.move_state[:, :-1, None]
+        gains = ((packed >> np.array([0, 4, 8], dtype=np.uint16)) & 0xF).astype(np.int8)
+        return np.where(self.colors[..., None] == engine.EMPTY, gains, 0).astype(np.int8)
+
+    def choose(self, policy, maximizing):
+        """Pick one move per board; returns (vertices, color codes) arrays"""
+        if policy not in POLICIES:
+            raise ValueError(f"Unknown policy {policy!r}; choose from {', '.join(POLICIES)}")
+        rated = self._tables[policy, maximizing][self.move_state]
+        # Ties are broken by fresh random bits every ply, 16 per vertex from the raw bit stream
+        size = self.move_state.size
+        bits = self.rng.bit_generator.random_raw(-(-size // 4)).view(np.uint16)[:size].reshape(rated.shape)
+        scores = (rated & 0xE000) | self._priorities[(rated & 7) << 13 | (bits & 0x1FFF)]
+        vertices = np.argmax(scores, axis=1)
+
+        ties = rated[self._rows, vertices] & 7
+        pick = (self.rng.random(len(ties)) * TIE_COUNTS[ties]).astype(np.intp)
+        return vertices, (TIE_COLUMNS[ties, pick] + 1).astype(np.int8)
+
+    def apply(self, vertices, codes):
+        """Color one vertex on every board, adding the gains it opens up to its empty neighbours"""
+        self._colors[self._rows, vertices] = codes
+        present = self.present.ravel()
+        incident = self._present_rows + self._vertex_triangles[vertices]
+        old = present[incident]
+        new = old | engine.COLOR_BITS[codes][:, None]
+        present[incident] = new
+        self.present[:, -1] = 0
+
+        # Coloring v only adds colors to v's triangles, so the gains of each
+        # empty corner of them go up by the change in those triangles' counters
+        delta = self._gain_table[new] - self._gain_table[old]
+        state = self.move_state.ravel()
+        colors = self._colors.ravel()
+        link = self._link[vertices]
+        for side in (0, 1):
+            targets = self._color_rows + link[..., side]
+            state[targets] += np.where(colors[targets] == engine.EMPTY, delta, 0).astype(np.uint16)
+        self.move_state[self._rows, vertices] = 0
+        self.move_state[:, -1] = 0
+
+    def run(self, maximizer_policy, minimizer_policy, maximizer_first=True):
+        """Play every board to the end; returns the final polychrome counts"""
+        maximizing = maximizer_first
+        for _ in range(self.remaining_moves()):
+            policy = maximizer_policy if maximizing else minimizer_policy
+            self.apply(*self.choose(policy, maximizing))
+            maximizing = not maximizing
+        return self.final_counts()
+
+    def final_counts(self):
+        """(B,) polychrome count of every board"""
+        return np.count_nonzero(engine.polychrome_mask(self.colors, self.geom.triangles), axis=1)
+
+
+def simulate(n, games, maximizer_policy="random", minimizer_policy="random",
+             player1_role="Maximizer", seed=None, batch_size=DEFAULT_BATCH_SIZE):
+    """Final polychrome counts of `games` playouts, run in lockstep batches"""
+    rng = np.random.default_rng(seed)
+    geom = geometry.get_geometry(n)
+    counts = np.empty(games, dtype=np.int64)
+    maximizer_first = player1_role == "Maximizer"
+
+    for start in range(0, games, batch_size):
+        size = min(batch_size, games - start)
+        if maximizer_policy == minimizer_policy == "random":
+            # Move order doesn't matter for random play, so sample final boards directly
+            boards = random_completions(geom, solver.initial_colors(n), size, rng)
+            counts[start:start + size] = np.count_nonzero(engine.polychrome_mask(boards, geom.triangles), axis=1)
+        else:
+            sim = BatchSimulator(n, size, seed=rng)
+            counts[start:start + size] = sim.run(maximizer_policy, minimizer_policy, maximizer_first)
+    return counts
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Simulate many Sperner games with simple policies")
+    parser.add_argument("--n", type=int, default=8)
+    parser.add_argument("--games", type=int, default=100000)
+    parser.add_argument("--maximizer", choices=POLICIES, default="random")
+    parser.add_argument("--minimizer", choices=POLICIES, default="random")
+    parser.add_argument("--player1-role", choices=("Maximizer", "Minimizer"), default="Maximizer")
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE)
+    parser.add_argument("--seed", type=int, default=None)
+    args = parser.parse_args(argv)
+
+    start = time.perf_counter()
+    counts = simulate(args.n, args.games, args.maximizer, args.minimizer,
+                      args.player1_role, args.seed, args.batch_size)
+    elapsed = time.perf_counter() - start
+
+    print(f"{args.games} games at n={args.n} in {elapsed:.2f}s ({args.games / elapsed:,.0f} games/s)")
+    print(f"mean {counts.mean():.3f}  std {counts.std():.3f}  min {counts.min()}  max {counts.max()}")
+    for value, freq in enumerate(np.bincount(counts)):
+        if freq:
+            print(f"{value:4d}  {freq / args.games:8.4%}")
+
+
+if __name__ == "__main__":
+    main()
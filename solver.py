@@ -0,0 +1,355 @@
+import itertools
+import random
+import time
+from collections import namedtuple
+
+import numpy as np
+
+import engine
+import geometry
+import symmetry
+
+'''
+Solver = exact minimax search for Sperner's Game
+
+Finds the final polychrome count under perfect play from a given board,
+using alpha-beta pruning with move ordering, a Zobrist-hashed transposition
+table with a memory cap, and iterative deepening under a time budget.
+Positions are keyed on their canonical form under the board's reflection
+(see symmetry.py), so mirrored positions share one table entry.
+'''
+
+
+# Rough cost of one transposition table entry (dict slot + tuple + ints)
+TT_ENTRY_BYTES = 200
+DEFAULT_TABLE_BYTES = 256 * 2 ** 20
+
+EXACT, LOWER, UPPER = 0, 1, 2
+
+# Number of colors present in a 3-bit color mask
+POPCOUNT = (0, 1, 1, 2, 1, 2, 2, 3)
+
+SolveResult = namedtuple("SolveResult", [
+    "value",      # final polychrome count under best play found
+    "best_move",  # (vertex, color code) for the side to move, or None if the board is full
+    "depth",      # plies searched in the last completed iteration
+    "exact",      # True if the search reached the end of the game
+    "nodes",      # positions visited
+    "elapsed",    # seconds spent
+])
+
+
+class SearchTimeout(Exception):
+    """Raised inside the search when the time budget runs out"""
+
+
+def maximizer_to_move(current_player, player1_role):
+    """Whether the player about to move is the Maximizer"""
+    return (current_player == "Player 1") == (player1_role == "Maximizer")
+
+
+class Solver:
+    """Alpha-beta solver for one triangulation level, reusable across positions"""
+
+    def __init__(self, n, max_table_bytes=DEFAULT_TABLE_BYTES, seed=0, tablebase=None):
+        geom = geometry.get_geometry(n)
+        self.n = n
+        # Optional endgame table (see tablebase.py); positions it covers are not searched
+        self.tablebase = tablebase
+        self.num_vertices = geom.num_vertices
+        self.max_entries = max(1, max_table_bytes // TT_ENTRY_BYTES)
+        self.table = {}
+
+        self._triangles = [tuple(tri) for tri in geom.triangles.tolist()]
+        self._incident = [tuple(t for t in incident if t >= 0) for incident in geom.vertex_triangles.tolist()]
+        self._allowed = [
+            tuple(code for code in (1, 2, 3) if mask & engine.COLOR_BITS[code])
+            for mask in geom.allowed.tolist()
+        ]
+
+        rng = random.Random(seed)
+        self._zobrist = [[rng.getrandbits(64) for _ in range(4)] for _ in range(self.num_vertices)]
+        self._side_key = rng.getrandbits(64)
+
+        # Hash of the reflected position is kept alongside the plain one
+        self._mirror_vertex = geom.mirror.tolist()
+        self._swap = symmetry.COLOR_SWAP.tolist()
+        self._mirror_zobrist = [
+            [self._zobrist[self._mirror_vertex[v]][self._swap[c]] for c in range(4)]
+            for v in range(self.num_vertices)
+        ]
+
+        # Per-triangle search state, updated on every make/unmake: OR of the
+        # color bits present and number of colored vertices. A triangle is
+        # live while it is incomplete and has no repeated color.
+        self._bits = engine.COLOR_BITS.tolist()
+        self._tri_bits = [0] * len(self._triangles)
+        self._tri_filled = [0] * len(self._triangles)
+        self._colors = None
+        self._empties = 0
+        self._live = 0
+        self._count = 0
+        self._hash = 0
+        self._mirror_hash = 0
+        self._nodes = 0
+        self._deadline = None
+
+    def clear(self):
+        """Forget all transposition table entries"""
+        self.table.clear()
+
+    def solve(self, vertex_colors, maximizer_to_move, time_budget=None, max_depth=None):
+        """Search a position by iterative deepening; returns the last completed iteration"""
+        start = time.perf_counter()
+        self._load(vertex_colors)
+        self._nodes = 0
+        self._deadline = start + time_budget if time_budget is not None else None
+
+        base = self._count
+        empties = self._empties
+        max_depth = empties if max_depth is None else min(max_depth, empties)
+        result = SolveResult(base, None, 0, empties == 0, 0, 0.0)
+        if self.tablebase is not None and 0 < empties <= self.tablebase.k and max_depth == empties:
+            gain, move = self.tablebase.best_move(vertex_colors, maximizer_to_move)
+            return result._replace(value=base + gain, best_move=move, depth=empties, exact=True,
+                                   elapsed=time.perf_counter() - start)
+
+        # Deepen one ply at a time only when there is a budget to respect;
+        # otherwise go straight to the full depth
+        first_depth = 1 if time_budget is not None else max_depth
+        for depth in range(first_depth, max_depth + 1):
+            try:
+                gain, move = self._search_root(depth, maximizer_to_move)
+            except SearchTimeout:
+                break
+            result = SolveResult(
+                base + gain, move, depth, depth == empties,
+                self._nodes, time.perf_counter() - start
+            )
+        return result._replace(nodes=self._nodes, elapsed=time.perf_counter() - start)
+
+    def _load(self, vertex_colors):
+        self._colors = [0] * self.num_vertices
+        self._tri_bits = [0] * len(self._triangles)
+        self._tri_filled = [0] * len(self._triangles)
+        self._empties = self.num_vertices
+        self._live = len(self._triangles)
+        self._count = 0
+        self._hash = 0
+        self._mirror_hash = 0
+        for v, code in enumerate(vertex_colors):
+            if code:
+                self._make(v, int(code))
+
+    def _make(self, v, code):
+        """Color v; returns the polychrome triangles completed and the state to undo it"""
+        bit = self._bits[code]
+        tri_bits, tri_filled = self._tri_bits, self._tri_filled
+        incident = self._incident[v]
+        undo = (tuple(tri_bits[t] for t in incident), self._live)
+        gained = 0
+        for t in incident:
+            bits, filled = tri_bits[t], tri_filled[t]
+            was_live = filled < 3 and POPCOUNT[bits] == filled
+            bits |= bit
+            filled += 1
+            tri_bits[t], tri_filled[t] = bits, filled
+            if was_live and not (filled < 3 and POPCOUNT[bits] == filled):
+                self._live -= 1
+                if bits == engine.ALL_COLORS and filled == 3:
+                    gained += 1
+        self._colors[v] = code
+        self._empties -= 1
+        self._count += gained
+        self._hash ^= self._zobrist[v][0] ^ self._zobrist[v][code]
+        self._mirror_hash ^= self._mirror_zobrist[v][0] ^ self._mirror_zobrist[v][code]
+        return gained, undo
+
+    def _unmake(self, v, code, gained, undo):
+        old_bits, self._live = undo
+        tri_bits, tri_filled = self._tri_bits, self._tri_filled
+        for t, bits in zip(self._incident[v], old_bits):
+            tri_bits[t] = bits
+            tri_filled[t] -= 1
+        self._colors[v] = engine.EMPTY
+        self._empties += 1
+        self._count -= gained
+        self._hash ^= self._zobrist[v][0] ^ self._zobrist[v][code]
+        self._mirror_hash ^= self._mirror_zobrist[v][0] ^ self._mirror_zobrist[v][code]
+
+    def _ordered_moves(self, maximizing, tt_move, symmetric):
+        colors, bits = self._colors, self._bits
+        tri_bits, tri_filled = self._tri_bits, self._tri_filled
+        moves = []
+        passed = False
+        for v, c in enumerate(colors):
+            if c != engine.EMPTY:
+                continue
+            incident = self._incident[v]
+            if not any(tri_filled[t] < 3 and POPCOUNT[tri_bits[t]] == tri_filled[t] for t in incident):
+                # Every triangle at v is already settled, so coloring any such
+                # vertex with any color is the same move (it only passes the turn)
+                if not passed:
+                    moves.append((0, v, self._allowed[v][0]))
+                    passed = True
+                continue
+            for code in self._allowed[v]:
+                if symmetric and (self._mirror_vertex[v], self._swap[code]) < (v, code):
+                    # The reflected move leads to an equivalent position
+                    continue
+                target = engine.ALL_COLORS ^ bits[code]
+                gained = sum(1 for t in incident if tri_filled[t] == 2 and tri_bits[t] == target)
+                moves.append((gained, v, code))
+        moves.sort(reverse=maximizing)
+        if tt_move is not None:
+            for i, move in enumerate(moves):
+                if (move[1], move[2]) == tt_move:
+                    moves.insert(0, moves.pop(i))
+                    break
+        return moves
+
+    def _store(self, key, depth, value, flag, move):
+        table = self.table
+        if key not in table and len(table) >= self.max_entries:
+            # Age out the oldest half of the table
+            for old in list(itertools.islice(table, len(table) // 2)):
+                del table[old]
+        table[key] = (depth, value, flag, move)
+
+    def _key(self, maximizing):
+        """Canonical table key, and whether this position is the mirrored one"""
+        side = self._side_key if maximizing else 0
+        if self._mirror_hash < self._hash:
+            return self._mirror_hash ^ side, True
+        return self._hash ^ side, False
+
+    def _to_frame(self, move, mirrored):
+        """Map a move between the canonical frame and the current position"""
+        if move is None or not mirrored:
+            return move
+        v, code = move
+        return self._mirror_vertex[v], self._swap[code]
+
+    def _search_root(self, depth, maximizing):
+        """(gain, best move) of the position; every root move is searched, so a move is always returned
+
+        The bound, table and tablebase cutoffs of _search return values without
+        a move, so the root keeps track of its own best move instead.
+        """
+        self._nodes += 1
+        depth = min(depth, self._empties)
+        if depth == 0:
+            return 0, None
+        key, mirrored = self._key(maximizing)
+        entry = self.table.get(key)
+        tt_move = self._to_frame(entry[3], mirrored) if entry is not None else None
+
+        alpha, beta = -np.inf, np.inf
+        best = -np.inf if maximizing else np.inf
+        best_move = None
+        symmetric = self._hash == self._mirror_hash
+        for _, v, code in self._ordered_moves(maximizing, tt_move, symmetric):
+            gained, undo = self._make(v, code)
+            try:
+                value = gained + self._search(depth - 1, alpha - gained, beta - gained, not maximizing)
+            finally:
+                self._unmake(v, code, gained, undo)
+            if maximizing and value > best or not maximizing and value < best:
+                best, best_move = value, (v, code)
+                if maximizing:
+                    alpha = value
+                else:
+                    beta = value
+        self._store(key, depth, best, EXACT, self._to_frame(best_move, mirrored))
+        return int(best), best_move
+
+    def _search(self, depth, alpha, beta, maximizing):
+        self._nodes += 1
+        if self._deadline is not None and self._nodes & 1023 == 0 and time.perf_counter() > self._deadline:
+            raise SearchTimeout
+
+        empties = self._empties
+        if empties == 0 or depth == 0:
+            # Colors never change once set, so completed triangles are final;
+            # at the horizon the remaining gain is estimated as zero.
+            return 0
+        depth = min(depth, empties)
+        if self.tablebase is not None and depth == empties <= self.tablebase.k:
+            empty = tuple(v for v, c in enumerate(self._colors) if c == engine.EMPTY)
+            return self.tablebase.lookup(empty, self._colors, maximizing)
+
+        # The remaining gain is at most the number of live triangles, and at
+        # the end of the game the total is odd (Sperner's lemma)
+        low, high = 0, self._live
+        if depth == empties:
+            parity = (self._count + 1) % 2
+            low = parity
+            high -= (high - parity) % 2
+        if high <= alpha:
+            return high
+        if low >= beta or low == high:
+            return low
+
+        key, mirrored = self._key(maximizing)
+        entry = self.table.get(key)
+        tt_move = None
+        if entry is not None:
+            e_depth, e_value, e_flag, tt_move = entry
+            tt_move = self._to_frame(tt_move, mirrored)
+            if e_depth >= depth:
+                if e_flag == EXACT:
+                    return e_value
+                if e_flag == LOWER:
+                    alpha = max(alpha, e_value)
+                else:
+                    beta = min(beta, e_value)
+                if alpha >= beta:
+                    return e_value
+
+        alpha0, beta0 = alpha, beta
+        best = -np.inf if maximizing else np.inf
+        best_move = None
+        symmetric = self._hash == self._mirror_hash
+        for _, v, code in self._ordered_moves(maximizing, tt_move, symmetric):
+            gained, undo = self._make(v, code)
+            try:
+                value = gained + self._search(depth - 1, alpha - gained, beta - gained, not maximizing)
+            finally:
+                self._unmake(v, code, gained, undo)
+
+            if maximizing:
+                if value > best:
+                    best, best_move = value, (v, code)
+                alpha = max(alpha, value)
+            else:
+                if value < best:
+                    best, best_move = value, (v, code)
+                beta = min(beta, value)
+            if alpha >= beta:
+                break
+
+        if best <= alpha0:
+            flag = UPPER
+        elif best >= beta0:
+            flag = LOWER
+        else:
+            flag = EXACT
+        self._store(key, depth, best, flag, self._to_frame(best_move, mirrored))
+        return best
+
+
+def solve_position(n, vertex_colors, current_player="Player 1", player1_role="Maximizer",
+                   time_budget=None, max_table_bytes=DEFAULT_TABLE_BYTES, tablebase=None):
+    """Optimal final polychrome count for a board, given whose turn it is and the roles"""
+    solver = Solver(n, max_table_bytes=max_table_bytes, tablebase=tablebase)
+    return solver.solve(
+        vertex_colors, maximizer_to_move(current_player, player1_role), time_budget=time_budget
+    )
+
+
+def initial_colors(n):
+    """Starting board: only the three corners are colored"""
+    geom = geometry.get_geometry(n)
+    colors = np.zeros(geom.num_vertices, dtype=np.int8)
+    colors[geom.corners] = [engine.COLOR_CODES["red"], engine.COLOR_CODES["blue"], engine.COLOR_CODES["green"]]
+    return colors
@@ -0,0 +1,29 @@
+import numpy as np
+
+import engine
+
+'''
+Symmetry = the board's reflection and how it acts on positions
+
+Reflecting the triangle through the apex swaps the red-blue and red-green
+sides and exchanges blue with green, mapping legal positions to legal
+positions with the same polychrome count. Anything that memoizes positions
+keys on a canonical representative so each pair is stored once: the
+solver's transposition table hashes both orientations incrementally, and
+the tablebase stores one of each pair of mirrored empty sets.
+'''
+
+
+# Color code under the reflection: red stays, green <-> blue
+COLOR_SWAP = np.array([
+    engine.EMPTY,
+    engine.COLOR_CODES["red"],
+    engine.COLOR_CODES["blue"],
+    engine.COLOR_CODES["green"],
+], dtype=np.int8)
+
+
+def mirror_colors(colors, geom):
+    """Reflect a color array (or a (B, V) batch) through the apex"""
+    colors = np.asarray(colors)
+    return COLOR_SWAP[colors[..., geom.mirror]]
@@ -0,0 +1,330 @@
+import argparse
+import math
+import mmap
+import os
+import struct
+import time
+
+import numpy as np
+
+import engine
+import geometry
+import symmetry
+
+'''
+Tablebase = retrograde endgame table for Sperner's Game
+
+For every position with at most k uncolored vertices the table stores the
+polychrome triangles still to be gained under perfect play, for either
+side to move. Only the triangles touching an uncolored vertex are still
+open, so that value depends on just the set of uncolored vertices and the
+colors of their neighbours; the rest of the board is irrelevant and the
+table stays small. The board's reflection (see symmetry.py) maps a
+position to one with the same value, so only the canonical one of each
+pair of mirrored empty sets, the one of lower rank, is stored; a lookup
+on the other reads its reflection. Values are built one layer at a time
+from 1 empty vertex up, each layer reading the finished layer below.
+
+The key is a perfect hash: the combinadic rank of the empty set (among
+the non-corner vertices) picks a per-set offset (an empty range for sets
+stored as their reflection), and the neighbours' colors, as indices into
+their allowed colors, form a mixed-radix number added to it. The file is
+a header, the per-set offsets and the int8 values, and is read through
+mmap, so opening it does no work and a lookup is a handful of arithmetic
+steps and two reads.
+'''
+
+
+MAGIC = b"SPT2"
+# magic, n, k, number of empty sets, number of entries
+HEADER = struct.Struct("<4sHHQQ")
+DEFAULT_DIRECTORY = os.environ.get("SPERNER_TABLEBASES", "tablebases")
+DEFAULT_MAX_ENTRIES = 2 ** 27  # two bytes per entry
+SIDES = 2  # value column 0: minimizer to move, 1: maximizer to move
+
+
+def tablebase_path(n, directory=DEFAULT_DIRECTORY):
+    return os.path.join(directory, f"sperner_n{n}.tb")
+
+
+def _options(geom):
+    """Color codes allowed at each vertex"""
+    return [
+        [code for code in (1, 2, 3) if mask & engine.COLOR_BITS[code]]
+        for mask in geom.allowed.tolist()
+    ]
+
+
+class _Layout:
+    """Everything about the key layout that follows from n alone"""
+
+    def __init__(self, n):
+        geom = geometry.get_geometry(n)
+        self.geom = geom
+        self.options = _options(geom)
+        # Option index of each color code per vertex (-1 where not allowed)
+        self.digit = np.full((geom.num_vertices, 4), -1, dtype=np.int64)
+        for v, codes in enumerate(self.options):
+            for i, code in enumerate(codes):
+                self.digit[v, code] = i
+        # Reflection of each vertex, and the option digit its reflected color has there
+        self.mirror = geom.mirror.tolist()
+        self.swap = symmetry.COLOR_SWAP.tolist()
+        self.mirror_digit = [
+            np.array([self.digit[self.mirror[v], self.swap[code]] for code in codes], dtype=np.int64)
+            for v, codes in enumerate(self.options)
+        ]
+        corners = set(geom.corners.tolist())
+        self.playable = [v for v in range(geom.num_vertices) if v not in corners]
+        self.position = {v: p for p, v in enumerate(self.playable)}
+        self.neighbors = [
+            [u for u in row if u >= 0] for row in geom.vertex_neighbors.tolist()
+        ]
+        self.incident = [
+            [t for t in row if t >= 0] for row in geom.vertex_triangles.tolist()
+        ]
+        # Index of the first empty set of each size
+        self.level_base = [0, 0]
+        for size in range(1, len(self.playable)):
+            self.level_base.append(self.level_base[-1] + math.comb(len(self.playable), size))
+
+    def set_index(self, empty):
+        """Perfect hash of a sorted tuple of empty vertices: level base plus combinadic rank"""
+        rank = sum(math.comb(self.position[v], i + 1) for i, v in enumerate(empty))
+        return self.level_base[len(empty)] + rank
+
+    def canonical(self, empty):
+        """(stored empty set, whether it is the reflection of `empty`): the lower-ranked of the two"""
+        mirrored = tuple(sorted(self.mirror[v] for v in empty))
+        if self.set_index(mirrored) < self.set_index(empty):
+            return mirrored, True
+        return empty, False
+
+    def frontier(self, empty):
+        """Colored vertices sharing a triangle with an empty one, in index order"""
+        empty_set = set(empty)
+        return sorted({u for v in empty for u in self.neighbors[v] if u not in empty_set})
+
+    def radix(self, frontier):
+        return [len(self.options[u]) for u in frontier]
+
+
+def _strides(radix):
+    strides = [1] * len(radix)
+    for i in range(len(radix) - 2, -1, -1):
+        strides[i] = strides[i + 1] * radix[i + 1]
+    return strides
+
+
+def table_size(n, k):
+    """(number of empty sets, number of entries) of the table for n and k"""
+    layout = _Layout(n)
+    num_sets = entries = 0
+    for size in range(1, k + 1):
+        for empty in _colex_sets(layout, size):
+            num_sets += 1
+            if not layout.canonical(empty)[1]:
+                entries += math.prod(layout.radix(layout.frontier(empty)))
+    return num_sets, entries
+
+
+def _colex_sets(layout, size):
+    """Empty sets of one size in combinadic rank order"""
+    playable = layout.playable
+    for combo in _colex_combinations(len(playable), size):
+        yield tuple(playable[p] for p in combo)
+
+
+def _colex_combinations(total, size):
+    """Increasing tuples of `size` indices below `total`, in colexicographic order"""
+    if size == 0:
+        yield ()
+        return
+    for last in range(size - 1, total):
+        for head in _colex_combinations(last, size - 1):
+            yield head + (last,)
+
+
+def build(n, k, path=None, max_entries=DEFAULT_MAX_ENTRIES, log=None):
+    """Compute the table for n with up to k empty vertices and write it to path"""
+    path = tablebase_path(n) if path is None else path
+    layout = _Layout(n)
+    geom = layout.geom
+    k = min(k, len(layout.playable))
+    num_sets, num_entries = table_size(n, k)
+    if num_entries > max_entries:
+        raise ValueError(
+            f"A tablebase for n={n}, k={k} needs {num_entries} entries (limit {max_entries}); use a smaller k"
+        )
+
+    offsets = np.zeros(num_sets + 1, dtype=np.uint64)
+    values = np.zeros((num_entries, SIDES), dtype=np.int8)
+    bits = engine.COLOR_BITS
+    triangles = geom.triangles.tolist()
+    index = 0
+    for size in range(1, k + 1):
+        start = time.perf_counter()
+        for empty in _colex_sets(layout, size):
+            set_index = layout.set_index(empty)
+            offsets[set_index] = offsets[set_index + 1] = index
+            if layout.canonical(empty)[1]:
+                continue
+            frontier = layout.frontier(empty)
+            radix = layout.radix(frontier)
+            count = math.prod(radix)
+            offsets[set_index + 1] = index + count
+
+            # Every coloring of the frontier at once: option digits and color codes per vertex
+            digits = dict(zip(frontier, np.unravel_index(np.arange(count), radix) if radix else ()))
+            codes = {u: np.asarray(layout.options[u])[digits[u]] for u in frontier}
+            empty_set = set(empty)
+
+            best = np.full((count, SIDES), [np.iinfo(np.int8).max, np.iinfo(np.int8).min], dtype=np.int64)
+            for v in empty:
+                rest = tuple(u for u in empty if u != v)
+                if rest:
+                    stored, mirrored = layout.canonical(rest)
+                    child_frontier = layout.frontier(stored)
+                    child_strides = _strides(layout.radix(child_frontier))
+                    base = int(offsets[layout.set_index(stored)])
+                    # Frontier vertex of the stored set -> the vertex of this position it reflects
+                    sources = [layout.mirror[u] if mirrored else u for u in child_frontier]
+                closed = [
+                    [u for u in triangles[t] if u != v]
+                    for t in layout.incident[v]
+                    if not empty_set.intersection(triangles[t]) - {v}
+                ]
+                for i, code in enumerate(layout.options[v]):
+                    gain = np.zeros(count, dtype=np.int64)
+                    for a, b in closed:
+                        gain += (bits[codes[a]] | bits[codes[b]] | bits[code]) == engine.ALL_COLORS
+                    if rest:
+                        child = np.full(count, base, dtype=np.int64)
+                        for u, source, stride in zip(child_frontier, sources, child_strides):
+                            digit = i if source == v else digits[source]
+                            if mirrored:
+                                digit = layout.mirror_digit[source][digit]
+                            child += digit * stride
+                        after = values[child].astype(np.int64)
+                    else:
+                        after = np.zeros((count, SIDES), dtype=np.int64)
+                    # The side to move picks; the other side moves next
+                    np.minimum(best[:, 0], gain + after[:, 1], out=best[:, 0])
+                    np.maximum(best[:, 1], gain + after[:, 0], out=best[:, 1])
+            values[index:index + count] = best
+            index += count
+        if log:
+            log(f"n={n}: layer {size} done ({time.perf_counter() - start:.2f}s)")
+
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(path, "wb") as f:
+        f.write(HEADER.pack(MAGIC, n, k, num_sets, num_entries))
+        f.write(offsets.tobytes())
+        f.write(values.tobytes())
+    return path
+
+
+class Tablebase:
+    """Read-only, memory-mapped endgame table for one n"""
+
+    def __init__(self, path):
+        self.path = path
+        with open(path, "rb") as f:
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, self.n, self.k, num_sets, num_entries = HEADER.unpack_from(self._map, 0)
+        if magic != MAGIC:
+            raise ValueError(f"{path} is not a Sperner tablebase")
+        self._offsets = np.frombuffer(self._map, dtype=np.uint64, count=num_sets + 1, offset=HEADER.size)
+        self._values = np.frombuffer(
+            self._map, dtype=np.int8, count=num_entries * SIDES,
+            offset=HEADER.size + self._offsets.nbytes,
+        )
+        self._layout = _Layout(self.n)
+
+    def close(self):
+        self._offsets = self._values = None
+        self._map.close()
+
+    def covers(self, colors):
+        """Whether the position has few enough empty vertices to be in the table"""
+        return int(np.count_nonzero(np.asarray(colors) == engine.EMPTY)) <= self.k
+
+    def lookup(self, empty, colors, maximizer_to_move):
+        """Polychrome triangles still to come under perfect play
+
+        empty is the sorted tuple of uncolored vertices (at most k of them);
+        colors is any indexable per-vertex color code sequence.
+        """
+        if not empty:
+            return 0
+        layout = self._layout
+        stored, mirrored = layout.canonical(empty)
+        entry = int(self._offsets[layout.set_index(stored)])
+        frontier = layout.frontier(stored)
+        for u, stride in zip(frontier, _strides(layout.radix(frontier))):
+            code = layout.swap[colors[layout.mirror[u]]] if mirrored else colors[u]
+            entry += int(layout.digit[u, code]) * stride
+        return int(self._values[entry * SIDES + bool(maximizer_to_move)])
+
+    def remaining(self, colors, maximizer_to_move):
+        """Polychrome triangles still to come, or None if the position is not in the table"""
+        empty = tuple(np.flatnonzero(np.asarray(colors) == engine.EMPTY).tolist())
+        if len(empty) > self.k:
+            return None
+        return self.lookup(empty, colors, maximizer_to_move)
+
+    def value(self, colors, maximizer_to_move, count=None):
+        """Final polychrome count under perfect play, or None if not in the table"""
+        remaining = self.remaining(colors, maximizer_to_move)
+        if remaining is None:
+            return None
+        if count is None:
+            count = engine.count_polychrome(np.asarray(colors), self._layout.geom.triangles)
+        return count + remaining
+
+    def best_move(self, colors, maximizer_to_move):
+        """(remaining gain, best (vertex, color code)) for the side to move, or None if not in the table"""
+        colors = np.array(colors, dtype=np.int8)
+        empty = tuple(np.flatnonzero(colors == engine.EMPTY).tolist())
+        if not empty or len(empty) > self.k:
+            return None
+        layout = self._layout
+        triangles = layout.geom.triangles
+        best = None
+        for v in empty:
+            rest = tuple(u for u in empty if u != v)
+            for code in layout.options[v]:
+                colors[v] = code
+                incident = triangles[layout.incident[v]]
+                gain = engine.count_polychrome(colors, incident)
+                total = gain + self.lookup(rest, colors, not maximizer_to_move)
+                if best is None or (total > best[0] if maximizer_to_move else total < best[0]):
+                    best = (total, (v, code))
+            colors[v] = engine.EMPTY
+        return best
+
+
+def open_tablebase(n, directory=DEFAULT_DIRECTORY):
+    """The table for n from the directory, or None if it has not been built"""
+    path = tablebase_path(n, directory)
+    if not os.path.exists(path):
+        return None
+    return Tablebase(path)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Build endgame tablebases for Sperner's Game")
+    parser.add_argument("--n", type=int, nargs="+", default=[3, 4, 5])
+    parser.add_argument("--k", type=int, default=3, help="largest number of empty vertices covered")
+    parser.add_argument("--directory", default=DEFAULT_DIRECTORY)
+    parser.add_argument("--max-entries", type=int, default=DEFAULT_MAX_ENTRIES)
+    args = parser.parse_args(argv)
+
+    for n in args.n:
+        start = time.perf_counter()
+        path = build(n, args.k, tablebase_path(n, args.directory), args.max_entries, log=print)
+        print(f"n={n}: wrote {path} ({os.path.getsize(path)} bytes, {time.perf_counter() - start:.2f}s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,11 @@
+import os
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+# Keep the app's archive, metrics log and warm-up out of the working tree during tests
+os.environ["SPERNER_ARCHIVE"] = tempfile.mkdtemp(prefix="sperner_games_")
+os.environ["SPERNER_METRICS_LOG"] = ""
+os.environ["SPERNER_WARM_N"] = ""
@@ -0,0 +1,53 @@
+import functools
+
+import numpy as np
+
+import engine
+import geometry
+
+
+def random_position(n, empties, rng):
+    """A legal board of size n with `empties` uncolored vertices (corners always colored)"""
+    geom = geometry.get_geometry(n)
+    colors = np.zeros(geom.num_vertices, dtype=np.int8)
+    for v, mask in enumerate(geom.allowed.tolist()):
+        colors[v] = rng.choice([code for code in (1, 2, 3) if mask & engine.COLOR_BITS[code]])
+    inner = np.setdiff1d(np.arange(geom.num_vertices), geom.corners)
+    colors[rng.choice(inner, empties, replace=False)] = engine.EMPTY
+    return colors
+
+
+def legal_moves(n, colors):
+    geom = geometry.get_geometry(n)
+    return [
+        (v, code)
+        for v in np.flatnonzero(colors == engine.EMPTY).tolist()
+        for code in (1, 2, 3)
+        if geom.allowed[v] & engine.COLOR_BITS[code]
+    ]
+
+
+def brute_force(n, colors, maximizing):
+    """Final polychrome count under perfect play, by plain minimax over every move"""
+    geom = geometry.get_geometry(n)
+
+    @functools.lru_cache(maxsize=None)
+    def value(key, maximizing):
+        board = np.frombuffer(key, dtype=np.int8)
+        moves = legal_moves(n, board)
+        if not moves:
+            return int(np.count_nonzero(engine.polychrome_mask(board, geom.triangles)))
+        results = []
+        for v, code in moves:
+            child = board.copy()
+            child[v] = code
+            results.append(value(child.tobytes(), not maximizing))
+        return max(results) if maximizing else min(results)
+
+    return value(np.asarray(colors, dtype=np.int8).tobytes(), maximizing)
+
+
+def after(colors, move):
+    child = np.array(colors, dtype=np.int8)
+    child[move[0]] = move[1]
+    return child
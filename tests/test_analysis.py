@@ -0,0 +1,58 @@
+import itertools
+from collections import Counter
+from fractions import Fraction
+
+import numpy as np
+import pytest
+
+import analysis
+import engine
+import geometry
+import solver
+
+
+def brute_force_counts(n, start_colors=None):
+    """{polychrome count: colorings} by enumerating every legal coloring"""
+    geom = geometry.get_geometry(n)
+    options = [
+        [int(start_colors[v])] if start_colors is not None and start_colors[v] != engine.EMPTY
+        else [c for c in (1, 2, 3) if geom.allowed[v] & engine.COLOR_BITS[c]]
+        for v in range(geom.num_vertices)
+    ]
+    boards = np.array(list(itertools.product(*options)), dtype=np.int8)
+    return Counter(np.count_nonzero(engine.polychrome_mask(boards, geom.triangles), axis=1).tolist())
+
+
+@pytest.mark.parametrize("n", [2, 3, 4])
+def test_matches_brute_force(n):
+    dist = analysis.polychrome_distribution(n)
+    expected = brute_force_counts(n)
+    assert dist.counts == dict(expected)
+    assert dist.total == sum(expected.values())
+    assert (dist.minimum, dist.maximum) == (min(expected), max(expected))
+    assert dist.mean == Fraction(sum(k * w for k, w in expected.items()), dist.total)
+    # Sperner's lemma: every legal coloring has an odd count
+    assert all(count % 2 == 1 for count in dist.counts)
+
+
+def test_partial_position_matches_brute_force():
+    colors = solver.initial_colors(4)
+    colors[[4, 7, 12]] = [1, 3, 2]
+    assert analysis.polychrome_distribution(4, colors).counts == dict(brute_force_counts(4, colors))
+
+
+def test_totals_beyond_64_bits_are_exact():
+    n = 10
+    # Boundary vertices other than the corners have two colors, interior ones three
+    expected = 2 ** (3 * (n - 1)) * 3 ** ((n - 1) * (n - 2) // 2)
+    dist = analysis.polychrome_distribution(n)
+    assert expected > 2 ** 64
+    assert dist.total == expected
+    assert all(count % 2 == 1 for count in dist.counts)
+
+
+def test_median():
+    dist = analysis.Distribution(2, {1: 3, 3: 2, 5: 1}, 6, 1, 5, Fraction(2))
+    assert analysis.median(dist) == 1
+    dist = dist._replace(counts={1: 2, 3: 2, 5: 2})
+    assert analysis.median(dist) == 3
@@ -0,0 +1,153 @@
+import json
+import os
+
+import pytest
+
+from streamlit.testing.v1 import AppTest
+
+import engine
+import geometry
+
+APP = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "app.py")
+N = 5
+
+
+@pytest.fixture
+def app():
+    """A same-device Human vs Human game of size N, Player 1 maximizing"""
+    at = AppTest.from_file(APP, default_timeout=60)
+    at.run()
+    at.radio(key="opponent_mode").set_value("Human vs Human").run()
+    at.button(key="maximizer_btn").click().run()
+    assert not at.exception
+    return at
+
+
+def click(at, vertex, n=N):
+    """Send the click component the event a click on this vertex produces"""
+    x, y = geometry.get_geometry(n).coords[vertex]
+    nonce = at.session_state["plot_nonce"] if "plot_nonce" in at.session_state else 0
+    at.session_state[f"plot-{nonce}"] = json.dumps(
+        [{"curveNumber": 2, "x": float(x), "y": float(y), "pointNumber": vertex, "pointIndex": vertex}]
+    )
+    at.run()
+    assert not at.exception
+
+
+def moves(at):
+    return at.session_state["board"].moves()
+
+
+def test_click_colors_vertex(app):
+    click(app, 4)
+    assert moves(app) == [(4, engine.COLOR_CODES["red"])]
+
+
+def test_retry_same_vertex_after_invalid_color(app):
+    # Vertex 1 is on the red-blue edge, so green is refused there
+    app.button(key="green_btn").click().run()
+    click(app, 1)
+    assert any("Invalid move" in w.value for w in app.warning)
+    assert moves(app) == []
+
+    app.button(key="blue_btn").click().run()
+    click(app, 1)
+    assert moves(app) == [(1, engine.COLOR_CODES["blue"])]
+
+
+def test_reclick_after_undo(app):
+    click(app, 4)
+    app.button(key="undo_btn").click().run()
+    assert moves(app) == []
+    click(app, 4)
+    assert moves(app) == [(4, engine.COLOR_CODES["red"])]
+
+
+def test_stale_click_is_not_replayed(app):
+    click(app, 4)
+    app.button(key="green_btn").click().run()
+    app.run()
+    assert moves(app) == [(4, engine.COLOR_CODES["red"])]
+
+
+def test_two_device_seats_survive_eviction():
+    import utils
+
+    host = AppTest.from_file(APP, default_timeout=60)
+    host.run()
+    host.radio(key="opponent_mode").set_value("Human vs Human (two devices)").run()
+    host.button(key="maximizer_btn").click().run()
+    game_id = host.session_state["game_id"]
+
+    guest = AppTest.from_file(APP, default_timeout=60)
+    guest.query_params["game"] = str(game_id)
+    guest.run()
+    assert not guest.exception
+    assert any(m.value == "You are **Player 2**." for m in guest.markdown)
+
+    utils.get_registry().evict_idle(now=float("inf"))
+    host.run()
+    guest.run()
+    assert any(m.value == "You are **Player 1**." for m in host.markdown)
+    assert any(m.value == "You are **Player 2**." for m in guest.markdown)
+
+
+def test_undo_only_takes_back_own_moves():
+    host = AppTest.from_file(APP, default_timeout=60)
+    host.run()
+    host.radio(key="opponent_mode").set_value("Human vs Human (two devices)").run()
+    host.button(key="maximizer_btn").click().run()
+    guest = AppTest.from_file(APP, default_timeout=60)
+    guest.query_params["game"] = str(host.session_state["game_id"])
+    guest.run()
+
+    click(host, 4)
+    guest.run()
+    assert moves(guest) == [(4, engine.COLOR_CODES["red"])]
+    # Player 2 may not roll back Player 1's move
+    assert guest.button(key="undo_btn").disabled
+    host.run()
+    assert not host.button(key="undo_btn").disabled
+
+    click(guest, 7)
+    host.run()
+    assert host.button(key="undo_btn").disabled
+    guest.button(key="undo_btn").click().run()
+    assert moves(guest) == [(4, engine.COLOR_CODES["red"])]
+    # Replaying the undone move is up to its owner too
+    host.run()
+    assert host.button(key="redo_btn").disabled
+    assert not guest.button(key="redo_btn").disabled
+
+
+def test_undo_against_computer_takes_back_its_reply():
+    at = AppTest.from_file(APP, default_timeout=60)
+    at.run()
+    at.radio(key="opponent_mode").set_value("Human vs Computer").run()
+    at.button(key="maximizer_btn").click().run()
+    click(at, 4)
+    assert len(moves(at)) == 2
+    at.button(key="undo_btn").click().run()
+    assert moves(at) == []
+    at.button(key="redo_btn").click().run()
+    assert len(moves(at)) == 2
+
+
+def test_session_memory_is_measured_only_in_debug_mode(app):
+    click(app, 4)
+    assert "session_bytes" not in app.session_state["perf"]["history"][-1]["counters"]
+    app.sidebar.toggle(key="debug_sidebar").set_value(True).run()
+    click(app, 7)
+    assert app.session_state["perf"]["history"][-1]["counters"]["session_bytes"] > 0
+
+
+def test_largest_board_takes_clicks():
+    # Drawn with Scattergl (see test_render); clicks still resolve to vertices
+    at = AppTest.from_file(APP, default_timeout=60)
+    at.run()
+    at.slider[0].set_value(30).run()
+    at.radio(key="opponent_mode").set_value("Human vs Human").run()
+    at.button(key="maximizer_btn").click().run()
+    assert not at.exception
+    click(at, 40, n=30)
+    assert moves(at) == [(40, engine.COLOR_CODES["red"])]
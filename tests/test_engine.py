@@ -0,0 +1,20 @@
+import numpy as np
+
+import engine
+import geometry
+
+
+def test_allowed_code_table_lists_each_allowed_color_once():
+    masks = np.arange(8, dtype=np.uint8)
+    codes, counts = engine.allowed_code_table(masks)
+    for mask, row, count in zip(masks.tolist(), codes.tolist(), counts.tolist()):
+        expected = [code for code in (1, 2, 3) if mask & engine.COLOR_BITS[code]]
+        assert row == expected + [0] * (3 - len(expected))
+        assert count == len(expected)
+
+
+def test_allowed_code_table_matches_legal_moves():
+    geom = geometry.get_geometry(6)
+    codes, counts = engine.allowed_code_table(geom.allowed)
+    legal = engine.legal_moves_mask(np.zeros(geom.num_vertices, dtype=np.int8), geom.allowed)
+    assert np.array_equal(counts, legal.sum(axis=1))
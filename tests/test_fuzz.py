@@ -0,0 +1,28 @@
+import numpy as np
+
+import fuzz
+
+
+def test_engines_pass():
+    for name in fuzz.ENGINES:
+        report = fuzz.fuzz(5, boards=2000, engine_name=name, seed=0)
+        assert report.parity_failures == 0
+        assert report.reference_failures == 0
+
+
+def test_reference_catches_parity_preserving_error(monkeypatch):
+    # Off by two keeps every count odd, so only the reference can notice
+    def off_by_two(boards, triangles):
+        return fuzz.count_mask(boards, triangles) + 2
+
+    monkeypatch.setitem(fuzz.ENGINES, "off_by_two", off_by_two)
+    report = fuzz.fuzz(4, boards=200, engine_name="off_by_two", seed=0)
+    assert report.parity_failures == 0
+    assert report.reference_failures == report.reference_checked > 0
+    assert report.counterexample is not None
+
+
+def test_parity_catches_even_counts(monkeypatch):
+    monkeypatch.setitem(fuzz.ENGINES, "zero", lambda boards, triangles: np.zeros(len(boards), dtype=np.int64))
+    report = fuzz.fuzz(3, boards=50, engine_name="zero", seed=0)
+    assert report.parity_failures == 50
@@ -0,0 +1,40 @@
+import json
+import logging
+
+import pytest
+
+import instrument
+
+
+@pytest.fixture
+def fresh_logging(monkeypatch):
+    """configure_logging as if no earlier call had happened in this process"""
+    monkeypatch.setattr(instrument.logger, "_configured", False, raising=False)
+    handlers = list(instrument.metrics_logger.handlers)
+    yield
+    for handler in instrument.metrics_logger.handlers[len(handlers):]:
+        handler.close()
+    instrument.metrics_logger.handlers[:] = handlers
+
+
+def file_handlers():
+    return [h for h in instrument.metrics_logger.handlers if isinstance(h, logging.FileHandler)]
+
+
+def test_metrics_file_is_off_by_default(fresh_logging, monkeypatch, tmp_path):
+    monkeypatch.delenv("SPERNER_METRICS_LOG", raising=False)
+    monkeypatch.chdir(tmp_path)
+    before = file_handlers()
+    instrument.configure_logging()
+    assert file_handlers() == before
+    assert not list(tmp_path.iterdir())
+
+
+def test_metrics_file_on_request(fresh_logging, monkeypatch, tmp_path):
+    path = tmp_path / "metrics.jsonl"
+    monkeypatch.setenv("SPERNER_METRICS_LOG", str(path))
+    instrument.configure_logging()
+    instrument.metrics_logger.info({"run": 1})
+    for handler in file_handlers():
+        handler.flush()
+    assert json.loads(path.read_text()) == {"run": 1}
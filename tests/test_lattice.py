@@ -0,0 +1,49 @@
+import numpy as np
+import pytest
+
+import engine
+import geometry
+import lattice
+
+
+def original_hover(points, vertex_colors, allowed_colors, current_color):
+    """The hover builder as first written, one string at a time"""
+    texts = []
+    for i, _ in enumerate(points):
+        allowed = allowed_colors.get(i, {"red", "green", "blue"})
+        color = vertex_colors[i]
+        text = f'<b>Vertex {i}</b>'
+        if color is None:
+            if current_color not in allowed:
+                text += (f'<br><span style="color:red;font-weight:bold;">❌ Cannot use {current_color}!</span>'
+                         f'<br><span style="color:black;">Allowed: {", ".join(sorted(allowed))}</span>')
+            else:
+                text += (f'<br><span style="color:green;font-weight:bold">✓ Can use {current_color}</span>'
+                         f'<br><span style="color:black;">Allowed: {", ".join(sorted(allowed))}</span>')
+        else:
+            text += f'<span style="color:{color};">Current: {color}</span>'
+        texts.append(text)
+    return texts
+
+
+@pytest.mark.parametrize("n", [2, 5, 9])
+@pytest.mark.parametrize("picker", ["red", "green", "blue"])
+def test_hover_accepts_original_inputs(n, picker):
+    rng = np.random.default_rng(n)
+    points = lattice.generate_triangle_coords(n)
+    allowed = lattice.assign_allowed_colors(n)
+    names = [rng.choice(sorted(allowed[v]) + [None]) for v in range(len(points))]
+    expected = original_hover(points, names, allowed, picker)
+    assert lattice.create_hover_data_with_warnings(points, names, allowed, picker) == expected
+
+    geom = geometry.get_geometry(n)
+    codes = engine.encode_colors(names)
+    assert lattice.create_hover_data_with_warnings(geom.coords, codes, geom.allowed, picker) == expected
+
+
+@pytest.mark.parametrize("n", [1, 2, 6])
+def test_list_helpers_match_geometry(n):
+    geom = geometry.get_geometry(n)
+    assert np.allclose(lattice.generate_triangle_coords(n), geom.coords)
+    assert lattice.get_all_triangles(n) == [tuple(t) for t in geom.triangles.tolist()]
+    assert np.array_equal(engine.encode_allowed(lattice.assign_allowed_colors(n), geom.num_vertices), geom.allowed)
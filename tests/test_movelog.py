@@ -0,0 +1,97 @@
+import numpy as np
+import pytest
+
+import board
+import movelog
+
+
+@pytest.fixture
+def archive(tmp_path):
+    opened = movelog.MoveArchive(str(tmp_path))
+    yield opened
+    opened.close()
+
+
+def play(archive, game_id, moves):
+    for vertex, code in moves:
+        archive.append(game_id, vertex, code)
+
+
+def some_moves(n, count, seed=0):
+    game = board.SpernerBoard(n)
+    rng = np.random.default_rng(seed)
+    for _ in range(count):
+        moves = game.legal_moves()
+        game.apply(moves[int(rng.integers(len(moves)))])
+    return game.moves()
+
+
+def test_board_at_replays_every_prefix(archive):
+    moves = some_moves(4, 8)
+    game_id = archive.new_game(4, "Minimizer")
+    play(archive, game_id, moves)
+    for ply in range(len(moves) + 1):
+        expected = board.SpernerBoard.replay(4, [v for v, _ in moves[:ply]], [c for _, c in moves[:ply]])
+        replayed = archive.board_at(game_id, ply)
+        assert np.array_equal(replayed.colors, expected.colors)
+        assert replayed.polychrome_count == expected.polychrome_count
+    assert archive.board_at(game_id).player1_role == "Minimizer"
+
+
+def test_records_alternate_players(archive):
+    game_id = archive.new_game(3)
+    play(archive, game_id, some_moves(3, 4))
+    records = archive.records(game_id)
+    assert (records["flags"] >> 2).tolist() == [0, 1, 0, 1]
+
+
+def test_undo_redo_and_overwrite(archive):
+    moves = some_moves(4, 4)
+    game_id = archive.new_game(4)
+    play(archive, game_id, moves)
+    assert archive.undo(game_id) == moves[3]
+    assert archive.undo(game_id) == moves[2]
+    assert archive.header(game_id).cursor == 2
+    assert archive.redo(game_id) == moves[2]
+    assert archive.board_at(game_id).moves() == moves[:3]
+
+    # A new move discards the redo tail
+    other = some_moves(4, 4, seed=1)
+    archive.append(game_id, *other[0])
+    header = archive.header(game_id)
+    assert header.length == header.cursor == 4
+    assert archive.redo(game_id) is None
+
+    for _ in range(4):
+        archive.undo(game_id)
+    assert archive.undo(game_id) is None
+
+
+def test_games_interleave_and_survive_reopening(tmp_path):
+    archive = movelog.MoveArchive(str(tmp_path))
+    first, second = archive.new_game(3), archive.new_game(5, "Maximizer", "Player 2")
+    moves_a, moves_b = some_moves(3, 3), some_moves(5, 3)
+    for a, b in zip(moves_a, moves_b):
+        archive.append(first, *a)
+        archive.append(second, *b)
+    archive.close()
+
+    reopened = movelog.MoveArchive(str(tmp_path))
+    assert len(reopened) == 2
+    assert reopened.board_at(first).moves() == moves_a
+    assert reopened.board_at(second).moves() == moves_b
+    assert reopened.header(second).computer_seat == "Player 2"
+    with pytest.raises(KeyError):
+        reopened.header(2)
+    reopened.close()
+
+
+def test_full_game_is_complete(archive):
+    game = board.SpernerBoard(2)
+    game_id = archive.new_game(2)
+    while not game.is_over():
+        move = game.legal_moves()[0]
+        game.apply(move)
+        archive.append(game_id, *move)
+    with pytest.raises(ValueError):
+        archive.append(game_id, 0, 1)
@@ -0,0 +1,91 @@
+import threading
+import uuid
+
+import board
+import movelog
+import registry
+
+TOKEN_A = uuid.uuid4().hex
+TOKEN_B = uuid.uuid4().hex
+
+
+def archived_game(path, computer_seat=None):
+    archive = movelog.MoveArchive(str(path))
+    game_id = archive.new_game(3, "Maximizer", computer_seat)
+
+    def load():
+        header = archive.header(game_id)
+        return archive.board_at(game_id), header.computer_seat, header.seats
+    return archive, game_id, load
+
+
+def test_claim_leaves_other_seats_free():
+    game = registry.SharedGame(0, board.SpernerBoard(3))
+    assert game.claim(TOKEN_A, ("Player 1",)) == ("Player 1",)
+    assert game.claim(TOKEN_B) == ("Player 2",)
+    assert game.claim(uuid.uuid4().hex) == ()
+
+
+def test_returning_session_keeps_only_its_seat():
+    game = registry.SharedGame(0, board.SpernerBoard(3))
+    game.claim(TOKEN_A, ("Player 1",))
+    assert game.claim(TOKEN_A) == ("Player 1",)
+    assert game.claim(TOKEN_B) == ("Player 2",)
+
+
+def test_computer_seat_is_never_claimed():
+    game = registry.SharedGame(0, board.SpernerBoard(3), computer_seat="Player 2")
+    assert game.claim(TOKEN_A) == ("Player 1",)
+    assert game.claim(TOKEN_B) == ()
+
+
+def test_eviction_drops_idle_games():
+    games = registry.GameRegistry(ttl=10)
+    games.open(1, lambda: (board.SpernerBoard(3), None))
+    assert 1 in games
+    assert games.evict_idle(now=games.get(1).touched + 5) == 0
+    assert games.evict_idle(now=games.get(1).touched + 11) == 1
+    assert 1 not in games
+
+
+def test_seats_survive_eviction_and_reload(tmp_path):
+    archive, game_id, load = archived_game(tmp_path)
+    games = registry.GameRegistry(ttl=10)
+    game = games.open(game_id, load)
+    game.claim(TOKEN_A, ("Player 1",))
+    game.claim(TOKEN_B)
+    archive.set_seats(game_id, game.seats)
+    game.board.apply((4, 1))
+    archive.append(game_id, 4, 1)
+
+    assert games.evict_idle(now=game.touched + 11) == 1
+    reloaded = games.open(game_id, load)
+    assert reloaded is not game
+    assert reloaded.seats_of(TOKEN_A) == ("Player 1",)
+    assert reloaded.seats_of(TOKEN_B) == ("Player 2",)
+    assert reloaded.board.moves() == [(4, 1)]
+    # A third device coming in after the reload only watches
+    assert reloaded.claim(uuid.uuid4().hex) == ()
+
+
+def test_seats_survive_a_new_archive_handle(tmp_path):
+    archive, game_id, _ = archived_game(tmp_path, computer_seat="Player 2")
+    archive.set_seats(game_id, {"Player 1": TOKEN_A})
+    archive.close()
+    header = movelog.MoveArchive(str(tmp_path)).header(game_id)
+    assert header.seats == {"Player 1": TOKEN_A}
+    assert header.computer_seat == "Player 2"
+
+
+def test_one_copy_per_game_under_concurrent_open():
+    games = registry.GameRegistry()
+    seen = []
+    threads = [
+        threading.Thread(target=lambda: seen.append(games.open(7, lambda: (board.SpernerBoard(3), None))))
+        for _ in range(8)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len({id(game) for game in seen}) == 1
@@ -0,0 +1,31 @@
+import numpy as np
+import pytest
+
+import engine
+import geometry
+import impact
+import render
+
+
+def figure(n):
+    geom = geometry.get_geometry(n)
+    colors = np.zeros(geom.num_vertices, dtype=np.int8)
+    colors[geom.corners] = [1, 3, 2]
+    heat = impact.ImpactCache(geom)
+    heat.update(colors)
+    return geom, render.build_board_figure(
+        geom, ["white"] * geom.num_vertices, [""] * geom.num_vertices,
+        highlight_triangles=geom.triangles[:2], heat=heat.overlay(engine.COLOR_CODES["red"], True),
+    )
+
+
+@pytest.mark.parametrize("n, trace_type", [(5, "scatter"), (23, "scatter"), (24, "scattergl"), (30, "scattergl")])
+def test_trace_type_follows_board_size(n, trace_type):
+    geom, fig = figure(n)
+    assert (geom.num_vertices > render.WEBGL_VERTEX_THRESHOLD) == (trace_type == "scattergl")
+    assert [trace.type for trace in fig.data] == [trace_type] * 4
+    vertices = fig.data[render.VERTEX_TRACE]
+    assert np.allclose(vertices.x, geom.coords[:, 0]) and np.allclose(vertices.y, geom.coords[:, 1])
+    # Two highlighted triangles: four closed-outline points plus a gap each
+    assert len(fig.data[render.HIGHLIGHT_TRACE].x) == 10
+    fig.to_json()
@@ -0,0 +1,70 @@
+import numpy as np
+import pytest
+
+import simplex
+
+
+def reference_count(lattice, colors):
+    """Fully colored sub-simplices counted one simplex at a time"""
+    return sum(
+        len(set(colors[s].tolist())) == lattice.d + 1 and 0 not in colors[s]
+        for s in lattice.simplices()
+    )
+
+
+@pytest.mark.parametrize("d, m", [(1, 5), (2, 4), (3, 3), (4, 2)])
+def test_mesh_is_a_kuhn_triangulation(d, m):
+    lattice = simplex.SimplexLattice(d, m)
+    assert np.array_equal(lattice.rank(lattice.unrank(np.arange(lattice.num_vertices))),
+                          np.arange(lattice.num_vertices))
+    simplices = lattice.simplices()
+    assert len(simplices) == m ** d
+    assert len({tuple(sorted(s)) for s in simplices.tolist()}) == m ** d
+    # Ordered by coordinate sum, the corners of a sub-simplex step one unit along one axis at a time
+    y = lattice.unrank(simplices)
+    order = np.argsort(y.sum(axis=-1), axis=-1)
+    chain = np.take_along_axis(y, order[..., None], axis=1)
+    steps = np.diff(chain, axis=1)
+    assert (steps >= 0).all() and (steps.sum(axis=-1) == 1).all()
+    assert (steps.sum(axis=1) == 1).all()
+
+
+@pytest.mark.parametrize("d, m", [(2, 4), (3, 3), (4, 2)])
+def test_counts_match_reference_and_sperner(d, m):
+    lattice = simplex.SimplexLattice(d, m)
+    colorings = lattice.random_colorings(20, np.random.default_rng(d))
+    codes = np.arange(1, d + 2)
+    assert ((lattice.allowed_masks() >> (colorings - 1)) & 1).all()
+    assert np.array_equal(colorings[:, lattice.corners()], np.broadcast_to(codes, (20, d + 1)))
+    counts = lattice.count_fully_colored(colorings, chunk=2)
+    assert counts.tolist() == [reference_count(lattice, colors) for colors in colorings]
+    # Sperner's lemma: a legal coloring has an odd number of fully colored simplices
+    assert (counts % 2 == 1).all()
+
+
+def test_board_apply_undo_and_gains():
+    game = simplex.SimplexBoard(3, 3, "Maximizer")
+    rng = np.random.default_rng(2)
+    start = game.colors.copy()
+    while not game.is_over():
+        gains = game.move_gains()
+        moves = game.legal_moves()
+        vertex, code = moves[int(rng.integers(len(moves)))]
+        before = game.polychrome_count
+        game.apply((vertex, code))
+        assert game.polychrome_count - before == gains[vertex, code - 1]
+        assert game.polychrome_count == reference_count(game.lattice, game.colors)
+    assert game.polychrome_count % 2 == 1
+    with pytest.raises(simplex.board.IllegalMove):
+        game.apply((0, 1))
+    while game.undo():
+        assert game.polychrome_count == reference_count(game.lattice, game.colors)
+    assert np.array_equal(game.colors, start)
+
+
+def test_play_game_reports_the_final_count():
+    moves, count = simplex.play_game(3, 3, ("greedy", "random"), seed=4)
+    game = simplex.SimplexBoard(3, 3)
+    for move in moves:
+        game.apply(move)
+    assert game.is_over() and game.polychrome_count == count
@@ -0,0 +1,70 @@
+import numpy as np
+import pytest
+
+import engine
+import simulate
+
+
+def reference_gains(sim):
+    """(B, V, 3) one-ply gains recounted from the colors alone"""
+    geom = sim.geom
+    gains = np.zeros(sim.legal_mask().shape, dtype=np.int64)
+    base = np.count_nonzero(engine.polychrome_mask(sim.colors, geom.triangles), axis=1)
+    for v in range(geom.num_vertices):
+        for code in (1, 2, 3):
+            colors = sim.colors.copy()
+            colors[:, v] = code
+            count = np.count_nonzero(engine.polychrome_mask(colors, geom.triangles), axis=1)
+            gains[:, v, code - 1] = count - base
+    return np.where(sim.legal_mask(), gains, 0)
+
+
+@pytest.mark.parametrize("n", [2, 3, 5])
+def test_incremental_state_matches_full_state(n):
+    sim = simulate.BatchSimulator(n, 64, seed=n)
+    maximizing = True
+    while sim.remaining_moves():
+        assert np.array_equal(np.where(sim.legal_mask(), sim.gains(), 0), reference_gains(sim))
+        empty = np.append(sim.colors == engine.EMPTY, np.zeros((64, 1), dtype=bool), axis=1)
+        assert np.array_equal(sim.move_state[empty], sim._full_state()[empty])
+        assert not sim.move_state[~empty].any()
+        sim.apply(*sim.choose("random", maximizing))
+        maximizing = not maximizing
+
+
+@pytest.mark.parametrize("policy", simulate.POLICIES)
+def test_moves_are_legal_and_greedy_is_greedy(policy):
+    sim = simulate.BatchSimulator(5, 128, seed=7)
+    maximizing = True
+    while sim.remaining_moves():
+        legal, gains = sim.legal_mask(), sim.gains()
+        vertices, codes = sim.choose(policy, maximizing)
+        rows = np.arange(sim.batch_size)
+        assert legal[rows, vertices, codes - 1].all()
+        if policy == "greedy":
+            chosen = gains[rows, vertices, codes - 1]
+            best = np.where(legal, gains, -1 if maximizing else 99)
+            best = best.max(axis=(1, 2)) if maximizing else best.min(axis=(1, 2))
+            assert np.array_equal(chosen, best)
+        sim.apply(vertices, codes)
+        maximizing = not maximizing
+    # Sperner's lemma: every finished board has an odd number of polychrome triangles
+    assert (sim.final_counts() % 2 == 1).all()
+
+
+def test_first_move_is_uniform_over_tied_moves():
+    sim = simulate.BatchSimulator(3, 1, seed=0)
+    legal = np.argwhere(sim.legal_mask()[0])
+    sim = simulate.BatchSimulator(3, 100000, seed=1)
+    vertices, codes = sim.choose("random", True)
+    counts = np.zeros(sim.legal_mask().shape[1:], dtype=np.int64)
+    np.add.at(counts, (vertices, codes - 1), 1)
+    assert counts.sum() == counts[tuple(legal.T)].sum()
+    expected = len(vertices) / len(legal)
+    assert np.abs(counts[tuple(legal.T)] - expected).max() < 5 * np.sqrt(expected)
+
+
+def test_random_playouts_match_sampled_final_boards():
+    played = simulate.BatchSimulator(4, 20000, seed=3).run("random", "random")
+    sampled = simulate.simulate(4, 20000, seed=4)
+    assert abs(played.mean() - sampled.mean()) < 0.1
@@ -0,0 +1,46 @@
+import numpy as np
+import pytest
+
+import solver
+
+from helpers import after, brute_force, random_position
+
+
+def test_root_best_move_after_bound_cutoff():
+    # Every remaining move is worth the same, so the bounds settle the root at once
+    colors = np.array([1, 1, 1, 3, 1, 1, 1, 3, 3, 1, 3, 3, 0, 3, 2], dtype=np.int8)
+    result = solver.Solver(4).solve(colors, True)
+    assert result.exact
+    assert result.best_move is not None
+    assert result.value == brute_force(4, colors, True)
+
+
+@pytest.mark.parametrize("n, empties", [(3, 4), (4, 3), (4, 5), (5, 4)])
+def test_matches_brute_force(n, empties):
+    rng = np.random.default_rng(n * 100 + empties)
+    search = solver.Solver(n)
+    for _ in range(25):
+        colors = random_position(n, empties, rng)
+        maximizing = bool(rng.integers(2))
+        expected = brute_force(n, colors, maximizing)
+        result = search.solve(colors, maximizing)
+        assert result.exact and result.value == expected
+        # The move returned must achieve the value, and exist whenever the board is not full
+        assert result.best_move is not None
+        assert brute_force(n, after(colors, result.best_move), not maximizing) == expected
+
+
+def test_full_board_has_no_move():
+    colors = random_position(3, 0, np.random.default_rng(0))
+    result = solver.Solver(3).solve(colors, True)
+    assert result.exact and result.best_move is None
+    assert result.value == brute_force(3, colors, True)
+
+
+def test_iterative_deepening_agrees():
+    rng = np.random.default_rng(1)
+    colors = random_position(4, 6, rng)
+    result = solver.Solver(4).solve(colors, False, time_budget=30)
+    assert result.exact
+    assert result.value == brute_force(4, colors, False)
+    assert brute_force(4, after(colors, result.best_move), True) == result.value
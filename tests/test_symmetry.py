@@ -0,0 +1,44 @@
+import numpy as np
+import pytest
+
+import engine
+import geometry
+import solver
+import symmetry
+
+from helpers import brute_force, legal_moves, random_position
+
+
+@pytest.mark.parametrize("n", [2, 3, 5, 8])
+def test_mirror_preserves_legality_and_count(n):
+    geom = geometry.get_geometry(n)
+    rng = np.random.default_rng(n)
+    for empties in (0, n):
+        colors = random_position(n, empties, rng)
+        mirrored = symmetry.mirror_colors(colors, geom)
+        assert np.array_equal(symmetry.mirror_colors(mirrored, geom), colors)
+        assert (mirrored == engine.EMPTY).sum() == empties
+        assert ((geom.allowed & engine.COLOR_BITS[mirrored]) != 0)[mirrored != engine.EMPTY].all()
+        assert engine.count_polychrome(mirrored, geom.triangles) == engine.count_polychrome(colors, geom.triangles)
+        assert len(legal_moves(n, mirrored)) == len(legal_moves(n, colors))
+
+
+def test_batch_matches_single_positions():
+    geom = geometry.get_geometry(5)
+    rng = np.random.default_rng(0)
+    batch = np.stack([random_position(5, 4, rng) for _ in range(8)])
+    mirrored = symmetry.mirror_colors(batch, geom)
+    for colors, expected in zip(batch, mirrored):
+        assert np.array_equal(symmetry.mirror_colors(colors, geom), expected)
+
+
+def test_mirrored_positions_have_the_same_value():
+    geom = geometry.get_geometry(4)
+    rng = np.random.default_rng(1)
+    search = solver.Solver(4)
+    for _ in range(10):
+        colors = random_position(4, 5, rng)
+        mirrored = symmetry.mirror_colors(colors, geom)
+        expected = brute_force(4, colors, True)
+        assert brute_force(4, mirrored, True) == expected
+        assert search.solve(mirrored, True).value == expected
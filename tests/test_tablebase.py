@@ -0,0 +1,94 @@
+import math
+
+import numpy as np
+import pytest
+
+import engine
+import geometry
+import solver
+import symmetry
+import tablebase
+
+from helpers import after, brute_force, random_position
+
+
+@pytest.fixture(scope="module")
+def tables(tmp_path_factory):
+    directory = tmp_path_factory.mktemp("tablebases")
+    opened = {
+        n: tablebase.Tablebase(tablebase.build(n, k, str(directory / f"n{n}.tb")))
+        for n, k in [(3, 7), (4, 4)]
+    }
+    yield opened
+    for table in opened.values():
+        table.close()
+
+
+@pytest.mark.parametrize("n, empties", [(3, 3), (3, 7), (4, 2), (4, 4)])
+def test_values_match_brute_force(tables, n, empties):
+    table = tables[n]
+    rng = np.random.default_rng(n * 10 + empties)
+    for _ in range(20):
+        colors = random_position(n, empties, rng)
+        maximizing = bool(rng.integers(2))
+        expected = brute_force(n, colors, maximizing)
+        assert table.value(colors, maximizing) == expected
+
+        remaining, move = table.best_move(colors, maximizing)
+        count = engine.count_polychrome(colors, geometry.get_geometry(n).triangles)
+        assert count + remaining == expected
+        assert brute_force(n, after(colors, move), not maximizing) == expected
+
+
+def test_positions_outside_the_table(tables):
+    table = tables[4]
+    colors = random_position(4, 5, np.random.default_rng(0))
+    assert not table.covers(colors)
+    assert table.value(colors, True) is None
+    assert table.best_move(colors, True) is None
+    full = random_position(4, 0, np.random.default_rng(0))
+    assert table.best_move(full, True) is None
+    assert table.value(full, True) == engine.count_polychrome(full, geometry.get_geometry(4).triangles)
+
+
+def test_solver_with_tablebase_matches_brute_force(tables):
+    rng = np.random.default_rng(5)
+    search = solver.Solver(4, tablebase=tables[4])
+    for empties in (3, 4, 6):
+        for _ in range(10):
+            colors = random_position(4, empties, rng)
+            maximizing = bool(rng.integers(2))
+            expected = brute_force(4, colors, maximizing)
+            result = search.solve(colors, maximizing)
+            assert result.exact and result.value == expected
+            assert brute_force(4, after(colors, result.best_move), not maximizing) == expected
+
+
+def test_rejects_a_table_too_large(tmp_path):
+    with pytest.raises(ValueError):
+        tablebase.build(4, 4, str(tmp_path / "big.tb"), max_entries=10)
+
+
+def test_rejects_a_file_that_is_not_a_table(tmp_path):
+    path = tmp_path / "junk.tb"
+    path.write_bytes(b"\0" * 64)
+    with pytest.raises(ValueError):
+        tablebase.Tablebase(str(path))
+
+
+def test_mirrored_positions_share_entries(tables):
+    table = tables[4]
+    geom = geometry.get_geometry(4)
+    rng = np.random.default_rng(9)
+    for _ in range(20):
+        colors = random_position(4, 4, rng)
+        mirrored = symmetry.mirror_colors(colors, geom)
+        for maximizing in (True, False):
+            assert table.remaining(colors, maximizing) == table.remaining(mirrored, maximizing)
+    # Only one of each pair of mirrored empty sets is stored, about half of them
+    layout = tablebase._Layout(4)
+    unmirrored = sum(
+        math.prod(layout.radix(layout.frontier(empty)))
+        for size in range(1, 5) for empty in tablebase._colex_sets(layout, size)
+    )
+    assert tablebase.table_size(4, 4)[1] < 0.6 * unmirrored
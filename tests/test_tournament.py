@@ -0,0 +1,101 @@
+import os
+import subprocess
+import sys
+import textwrap
+
+import pyarrow.parquet as pq
+
+import tournament
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+AGENTS = ["random", "greedy"]
+
+
+def recorded_ids(out_dir):
+    ids = []
+    for path in tournament.part_files(str(out_dir)):
+        ids += pq.read_table(path).column("game_id").to_pylist()
+    return ids
+
+
+def scheduled_ids(*args, **kwargs):
+    return sorted(task[0] for task in tournament.schedule(*args, **kwargs))
+
+
+def test_rerun_skips_recorded_games(tmp_path):
+    total = len(tournament.schedule([3], AGENTS, 2))
+    assert tournament.run_tournament([3], AGENTS, 2, str(tmp_path), workers=2, rows_per_part=3) == total
+    assert tournament.run_tournament([3], AGENTS, 2, str(tmp_path), workers=2) == 0
+    assert sorted(recorded_ids(tmp_path)) == scheduled_ids([3], AGENTS, 2)
+
+
+def test_ids_depend_on_the_matchup_not_the_schedule():
+    assert set(scheduled_ids([3], AGENTS, 1)) < set(scheduled_ids([4, 3], AGENTS[::-1], 2))
+    assert not set(scheduled_ids([3], AGENTS, 1)) & set(scheduled_ids([3], AGENTS, 1, base_seed=1))
+
+
+def test_resume_with_a_changed_schedule_plays_the_new_games(tmp_path):
+    tournament.run_tournament([3, 4], AGENTS, 1, str(tmp_path), workers=1)
+    # Dropping n=4 and adding n=5 plays exactly the n=5 games
+    assert tournament.run_tournament([3, 5], AGENTS, 1, str(tmp_path), workers=1) == len(
+        tournament.schedule([5], AGENTS, 1))
+    table = pq.read_table(tournament.part_files(str(tmp_path))[-1])
+    assert set(table.column("n").to_pylist()) == {5}
+    assert sorted(set(recorded_ids(tmp_path))) == sorted(set(scheduled_ids([3, 4, 5], AGENTS, 1)))
+
+    # Changing an agent's options replays every game that agent plays in; random vs random is already recorded
+    agent_names = ["random", "mcts"]
+    replayed = len(tournament.schedule([3], agent_names, 1)) - 2
+    for iterations in (5, 6):
+        options = {"mcts": {"iterations": iterations, "time_budget": None}}
+        assert tournament.run_tournament([3], agent_names, 1, str(tmp_path), workers=1, options=options) == replayed
+    table = pq.read_table(tournament.part_files(str(tmp_path))[-1])
+    assert '{"iterations": 6, "time_budget": null}' in table.column("player1_options").to_pylist()
+
+
+def test_resume_after_crash_mid_part(tmp_path):
+    # Finish one part, then die with the next one half written
+    crash = textwrap.dedent(f"""
+        import os, sys
+        sys.path.insert(0, {ROOT!r})
+        import tournament
+        writer = tournament.PartWriter({str(tmp_path)!r}, rows_per_part=4, batch_rows=2)
+        for task in tournament.schedule([3], {AGENTS!r}, 1)[:6]:
+            writer.write(tournament.run_game(task))
+        os._exit(1)
+    """)
+    assert subprocess.run([sys.executable, "-c", crash]).returncode == 1
+    assert len(tournament.part_files(str(tmp_path))) == 1
+    assert sorted(recorded_ids(tmp_path)) == sorted(task[0] for task in tournament.schedule([3], AGENTS, 1)[:4])
+
+    total = len(tournament.schedule([3], AGENTS, 1))
+    assert tournament.run_tournament([3], AGENTS, 1, str(tmp_path), workers=2) == total - 4
+    assert sorted(recorded_ids(tmp_path)) == scheduled_ids([3], AGENTS, 1)
+    assert not [name for name in os.listdir(tmp_path) if name.endswith(tournament.PARTIAL_SUFFIX)]
+
+
+def test_unreadable_part_is_replayed(tmp_path):
+    total = len(tournament.schedule([3], AGENTS, 1))
+    tournament.run_tournament([3], AGENTS, 1, str(tmp_path), workers=1)
+    (part,) = tournament.part_files(str(tmp_path))
+    with open(part, "r+b") as f:
+        f.truncate(100)
+    assert tournament.run_tournament([3], AGENTS, 1, str(tmp_path), workers=1) == total
+    assert sorted(recorded_ids(tmp_path)) == scheduled_ids([3], AGENTS, 1)
+
+
+def test_new_parts_number_past_gaps(tmp_path):
+    writer = tournament.PartWriter(str(tmp_path), rows_per_part=2, batch_rows=2)
+    for task in tournament.schedule([3], AGENTS, 1)[:6]:
+        writer.write(tournament.run_game(task))
+    writer.close()
+    parts = tournament.part_files(str(tmp_path))
+    assert [os.path.basename(p) for p in parts] == [f"part-{i:05d}.parquet" for i in range(3)]
+    os.remove(parts[1])
+    before = open(parts[2], "rb").read()
+
+    tournament.run_tournament([3], AGENTS, 1, str(tmp_path), workers=1)
+    assert open(parts[2], "rb").read() == before
+    assert os.path.basename(tournament.part_files(str(tmp_path))[-1]) == "part-00003.parquet"
+    ids = recorded_ids(tmp_path)
+    assert sorted(ids) == scheduled_ids([3], AGENTS, 1)
@@ -0,0 +1,28 @@
+import tablebase
+import utils
+
+
+def test_missing_tablebase_is_not_cached(tmp_path, monkeypatch):
+    monkeypatch.setattr(tablebase, "tablebase_path", lambda n: str(tmp_path / f"sperner_n{n}.tb"))
+    assert utils.get_tablebase(3) is None
+    tablebase.build(3, 2, tablebase.tablebase_path(3))
+    table = utils.get_tablebase(3)
+    assert table is not None and table.k == 2
+    assert utils.get_tablebase(3) is table
+
+
+def test_unreadable_tablebase_is_skipped(tmp_path, monkeypatch):
+    monkeypatch.setattr(tablebase, "tablebase_path", lambda n: str(tmp_path / f"sperner_n{n}.tb"))
+    (tmp_path / "sperner_n4.tb").write_bytes(b"\0" * 64)
+    assert utils.get_tablebase(4) is None
+
+
+def test_warm_sizes_skip_bad_entries(monkeypatch):
+    assert utils.warm_sizes("5, 10,") == (5, 10)
+    assert utils.warm_sizes("5,x") == (5,)
+    assert utils.warm_sizes("x") == utils.DEFAULT_WARM_SIZES
+    assert utils.warm_sizes("") == ()
+    monkeypatch.delenv("SPERNER_WARM_N")
+    assert utils.warm_sizes() == utils.DEFAULT_WARM_SIZES
+    monkeypatch.setenv("SPERNER_WARM_N", "5,x")
+    assert utils.warm_sizes() == (5,)
@@ -0,0 +1,246 @@
+import argparse
+import functools
+import hashlib
+import itertools
+import json
+import multiprocessing
+import os
+import re
+import time
+
+import numpy as np
+
+import agents
+
+'''
+Tournament = parallel agent-vs-agent self-play with Parquet results
+
+Usage:
+    python tournament.py --n 3 4 5 --agents random greedy mcts --games 200 --out results
+
+Every game's id is a hash of its matchup: the base --seed, the round, n,
+both agents with their options, and player 1's role. Its seed is derived
+from that id, so results depend neither on how games are spread over
+workers nor on what else is scheduled. Records are streamed to part files
+in the --out directory; a rerun skips exactly the games already recorded
+there, so changing --n, --agents or an agent option plays the new matchups
+and never counts an old game toward a different one. A part is written under a temporary name
+and renamed only once it is closed, so a run that is killed leaves whole
+parts plus at most one temporary file, which the next run discards and
+whose games it plays again.
+'''
+
+
+ROLES = ("Maximizer", "Minimizer")
+PART_PATTERN = re.compile(r"part-(\d+)\.parquet$")
+PARTIAL_SUFFIX = ".partial"
+
+
+@functools.lru_cache(maxsize=None)
+def result_schema():
+    """Schema of the result files; pyarrow is imported here so pool workers never load it"""
+    import pyarrow as pa
+    return pa.schema([
+        ("game_id", pa.int64()),
+        ("round", pa.int32()),
+        ("n", pa.int16()),
+        ("player1_agent", pa.string()),
+        ("player2_agent", pa.string()),
+        ("player1_options", pa.string()),
+        ("player2_options", pa.string()),
+        ("player1_role", pa.string()),
+        ("seed", pa.int64()),
+        ("move_vertices", pa.list_(pa.int32())),
+        ("move_colors", pa.list_(pa.int8())),
+        ("polychrome_count", pa.int32()),
+        ("wall_time", pa.float64()),
+    ])
+
+
+def agent_options(options, name):
+    """An agent's constructor options as canonical JSON, for ids and records"""
+    return json.dumps(options.get(name, {}), sort_keys=True)
+
+
+def matchup_id(base_seed, round_, n, name1, name2, player1_role, options):
+    """Stable 63-bit id of one matchup, agent options included"""
+    key = json.dumps([base_seed, round_, n, name1, name2, player1_role,
+                      agent_options(options, name1), agent_options(options, name2)])
+    return int.from_bytes(hashlib.blake2b(key.encode(), digest_size=8).digest(), "little") >> 1
+
+
+def schedule(ns, agent_names, games, base_seed=0, options=None):
+    """Tasks for every (n, player 1 agent, player 2 agent, player 1 role) pairing, `games` rounds each"""
+    options = options or {}
+    return [
+        (matchup_id(base_seed, round_, n, name1, name2, role, options), round_, n, name1, name2, role, options)
+        for round_, n, name1, name2, role in itertools.product(range(games), ns, agent_names, agent_names, ROLES)
+    ]
+
+
+def game_seed(game_id):
+    """Deterministic per-game seed"""
+    return int(np.random.SeedSequence(game_id).generate_state(1, dtype=np.uint32)[0])
+
+
+def run_game(task):
+    """Worker entry point: play one scheduled game and return its record"""
+    game_id, round_, n, name1, name2, player1_role, options = task
+    seed = game_seed(game_id)
+    player1 = agents.make_agent(name1, n, seed=seed, **options.get(name1, {}))
+    player2 = agents.make_agent(name2, n, seed=seed + 1, **options.get(name2, {}))
+
+    start = time.perf_counter()
+    moves, count = agents.play_game(n, player1, player2, player1_role)
+    return {
+        "game_id": game_id,
+        "round": round_,
+        "n": n,
+        "player1_agent": name1,
+        "player2_agent": name2,
+        "player1_options": agent_options(options, name1),
+        "player2_options": agent_options(options, name2),
+        "player1_role": player1_role,
+        "seed": seed,
+        "move_vertices": [v for v, _ in moves],
+        "move_colors": [c for _, c in moves],
+        "polychrome_count": count,
+        "wall_time": time.perf_counter() - start,
+    }
+
+
+def part_files(out_dir):
+    """Finished part files of the output directory, in part order"""
+    if not os.path.isdir(out_dir):
+        return []
+    parts = []
+    for name in os.listdir(out_dir):
+        match = PART_PATTERN.match(name)
+        if match:
+            parts.append((int(match.group(1)), name))
+    return [os.path.join(out_dir, name) for _, name in sorted(parts)]
+
+
+def completed_game_ids(out_dir):
+    """Game ids already recorded in the output directory
+
+    A part that cannot be read (one cut off mid-write by an older version)
+    holds no usable rows; it is deleted so its games are played again.
+    """
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    done = set()
+    for path in part_files(out_dir):
+        try:
+            table = pq.read_table(path, columns=["game_id"])
+        except (pa.ArrowInvalid, OSError) as error:
+            print(f"Discarding unreadable part {path}: {error}")
+            os.remove(path)
+            continue
+        done.update(table.column("game_id").to_pylist())
+    return done
+
+
+class PartWriter:
+    """Streams records into numbered Parquet part files, closing one every `rows_per_part` rows
+
+    Each part is written as <name>.partial and renamed to <name> when closed.
+    """
+
+    def __init__(self, out_dir, rows_per_part, batch_rows=256):
+        self.out_dir = out_dir
+        self.rows_per_part = rows_per_part
+        self.batch_rows = batch_rows
+        self.writer = None
+        self.rows_in_part = 0
+        self.buffer = []
+        self.path = None
+        os.makedirs(out_dir, exist_ok=True)
+        # Leftovers of a killed run; their games are not in completed_game_ids, so they are replayed
+        for name in os.listdir(out_dir):
+            if name.endswith(PARTIAL_SUFFIX):
+                os.remove(os.path.join(out_dir, name))
+        # Number after the highest existing part, so a gap never leads to overwriting one
+        parts = part_files(out_dir)
+        self.part = int(PART_PATTERN.search(parts[-1]).group(1)) + 1 if parts else 0
+
+    def write(self, record):
+        self.buffer.append(record)
+        if len(self.buffer) >= self.batch_rows:
+            self.flush()
+
+    def flush(self):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+        if not self.buffer:
+            return
+        if self.writer is None:
+            self.path = os.path.join(self.out_dir, f"part-{self.part:05d}.parquet")
+            self.writer = pq.ParquetWriter(self.path + PARTIAL_SUFFIX, result_schema())
+            self.part += 1
+        self.writer.write_table(pa.Table.from_pylist(self.buffer, schema=result_schema()))
+        self.rows_in_part += len(self.buffer)
+        self.buffer = []
+        # Close finished parts so a crash only loses the part being written
+        if self.rows_in_part >= self.rows_per_part:
+            self.close_part()
+
+    def close_part(self):
+        if self.writer is not None:
+            self.writer.close()
+            os.replace(self.path + PARTIAL_SUFFIX, self.path)
+        self.writer = None
+        self.rows_in_part = 0
+
+    def close(self):
+        self.flush()
+        self.close_part()
+
+
+def run_tournament(ns, agent_names, games, out_dir, workers=None, seed=0, options=None,
+                   rows_per_part=5000):
+    """Play every scheduled game not already in out_dir; returns the number of games played"""
+    done = completed_game_ids(out_dir)
+    tasks = [task for task in schedule(ns, agent_names, games, seed, options) if task[0] not in done]
+    if not tasks:
+        return 0
+
+    writer = PartWriter(out_dir, rows_per_part)
+    workers = workers or os.cpu_count()
+    # Chunks are big enough to amortize IPC, small enough to balance load
+    chunksize = max(1, min(64, len(tasks) // (workers * 8)))
+    try:
+        with multiprocessing.Pool(workers) as pool:
+            for record in pool.imap_unordered(run_game, tasks, chunksize=chunksize):
+                writer.write(record)
+    finally:
+        writer.close()
+    return len(tasks)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run agent-vs-agent Sperner game tournaments")
+    parser.add_argument("--n", type=int, nargs="+", default=[4], help="triangulation levels")
+    parser.add_argument("--agents", nargs="+", default=["random", "greedy"], choices=list(agents.AGENTS))
+    parser.add_argument("--games", type=int, default=100, help="games per pairing and role")
+    parser.add_argument("--out", default="tournament_results", help="output directory of Parquet parts")
+    parser.add_argument("--workers", type=int, default=None, help="worker processes (default: all cores)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--mcts-iterations", type=int, default=200,
+                        help="MCTS iterations per move (iteration budgets keep runs reproducible)")
+    parser.add_argument("--exact-time", type=float, default=1.0, help="solver seconds per move")
+    args = parser.parse_args(argv)
+
+    options = {
+        "mcts": {"iterations": args.mcts_iterations, "time_budget": None},
+        "exact": {"time_budget": args.exact_time},
+    }
+    start = time.perf_counter()
+    played = run_tournament(args.n, args.agents, args.games, args.out, args.workers, args.seed, options)
+    elapsed = time.perf_counter() - start
+    rate = played / elapsed if elapsed > 0 else 0.0
+    print(f"Played {played} games in {elapsed:.1f}s ({rate:.1f} games/s) -> {args.out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,5 +1,32 @@
+import importlib
+import json
+import os
+import threading
+import time
+import uuid
+
 import streamlit as st
 import numpy as np
+import board
+import engine
+import geometry
+import hover
+import impact
+import instrument
+import mcts
+import movelog
+import registry
+import render
+import tablebase
+
+from lattice import (  # the list-based board helpers used to live here
+    assign_allowed_colors,
+    create_hover_data_with_warnings,
+    generate_edges,
+    generate_triangle_coords,
+    get_all_triangles,
+    get_polychrome_triangles,
+)
 
 '''
 Utils = helper functions for Sperner's Game
@@ -7,6 +34,29 @@ Utils = helper functions for Sperner's Game
 '''
 
 
+# Which seat the computer takes for each opponent mode
+COMPUTER_SEATS = {
+    "Human vs Human": None,
+    "Human vs Human (two devices)": None,
+    "Human vs Computer": "Player 2",
+    "Computer vs Human": "Player 1",
+}
+# Seats the session that starts the game plays; the rest are left for whoever joins
+CREATOR_SEATS = {"Human vs Human (two devices)": ("Player 1",)}
+COMPUTER_TIME_BUDGET = 1.0  # seconds of search per computer move
+# Directory of the shared game archive (see movelog)
+ARCHIVE_PATH = os.environ.get("SPERNER_ARCHIVE", "sperner_games")
+DEBUG_HISTORY_RUNS = 20  # run records kept per session for the debug sidebar
+# Idle live games are dropped from the shared registry after this many seconds
+GAME_TTL = float(os.environ.get("SPERNER_GAME_TTL", registry.DEFAULT_TTL))
+POLL_INTERVAL = 1.0  # seconds between checks for moves made by another session
+HIGHLIGHT_CACHE_SIZE = 32  # finished boards whose highlight outlines are kept
+# Board sizes prepared when the server starts; SPERNER_WARM_N (e.g. "5,10") overrides them, "" turns warm-up off
+DEFAULT_WARM_SIZES = (5, 10, 20, 30)
+
+logger = instrument.logger.getChild("utils")
+
+
 def get_css_styling():
     """Return all CSS styling for the app"""
     return """
@@ -76,14 +126,14 @@ def get_css_styling():
 def reset_game_state(current_n):
     """Reset all game-related session state while preserving n value"""
     game_keys = [
-        "vertex_colors", "vertex_color_n", "current_player", "color_picker", 
-        "allowed_colors", "last_selected_event", "force_reset", "player1_role", 
-        "player2_role", "game_started", "polychrome_count", "all_triangles"
+        "board", "vertex_color_n", "color_picker", "force_reset",
+        "game_started", "computer_player", "computer_agent", "hover_cache", "impact_cache", "game_id", "seen_version"
     ]
     
     for key in game_keys:
         if key in st.session_state:
             del st.session_state[key]
+    st.query_params.pop("game", None)
     
     st.session_state.n = current_n
     st.session_state.vertex_color_n = current_n
@@ -91,187 +141,569 @@ def reset_game_state(current_n):
 
 
 def initialize_session_state(n, points):
-    """Initialize all session state variables for a new game"""
-    st.session_state.vertex_colors = [None for _ in points]
+    """Initialize all session state variables for a new game, or resume the one in the URL"""
+    # The board holds all game logic; session state only keeps it and UI choices
+    st.session_state.board = board.SpernerBoard(n)
     st.session_state.vertex_color_n = n
-    st.session_state.current_player = "Player 1"
     st.session_state.color_picker = "red"
     st.session_state.game_started = False
-    
-    # Initialize allowed colors and triangles
-    allowed_colors = assign_allowed_colors(n)
-    st.session_state.allowed_colors = allowed_colors
-    st.session_state.all_triangles = get_all_triangles(n)
-    st.session_state.polychrome_count = 0
-    
-    # Pre-color 3 corners
-    apex = 0
-    left_corner = len(points) - n - 1
-    right_corner = len(points) - 1
-    st.session_state.vertex_colors[apex] = "red"
-    st.session_state.vertex_colors[left_corner] = "blue"
-    st.session_state.vertex_colors[right_corner] = "green"
-
-
-def update_player_turn():
-    """Switch to the other player"""
-    st.session_state.current_player = (
-        "Player 2" if st.session_state.current_player == "Player 1" else "Player 1"
-    )
+    resume_game(n)
+    st.session_state.pop("hover_cache", None)
+    st.session_state.pop("impact_cache", None)
+    # A click left over from a previous game must not be replayed on the new board
+    _renew_click_key("plot")
 
 
-def set_player_roles(player1_role):
-    """Set roles for both players based on player 1's choice"""
-    st.session_state.player1_role = player1_role
-    st.session_state.player2_role = "Minimizer" if player1_role == "Maximizer" else "Maximizer"
+def get_board():
+    """The SpernerBoard of the current session"""
+    return st.session_state.board
+
+
+def set_player_roles(player1_role, computer_player=None, seats=None):
+    """Set roles for both players based on player 1's choice, and which one (if any) the computer plays
+
+    The session plays the given seats (default: every seat but the computer's);
+    any seat left over is taken by the next session to open the game.
+    """
+    game = get_board()
+    game.set_roles(player1_role)
+    st.session_state.computer_player = computer_player
     st.session_state.game_started = True
 
+    # Moves are archived from here on; the id in the URL lets a dropped session
+    # resume and lets other devices join or watch
+    game_id = get_archive().new_game(game.n, player1_role, computer_player)
+    st.session_state.game_id = game_id
+    st.query_params["game"] = str(game_id)
+    shared = get_registry().open(game_id, lambda: (game, computer_player))
+    _claim_seats(shared, seats or registry.SEATS)
+    st.session_state.seen_version = shared.version
+
+
+@st.cache_resource
+def get_archive():
+    """The move archive shared by every session of this server"""
+    return movelog.MoveArchive(ARCHIVE_PATH)
+
+
+@st.cache_resource
+def get_registry():
+    """The live games shared by every session of this server"""
+    return registry.GameRegistry(GAME_TTL)
+
+
+def _valid_token(token):
+    try:
+        return len(bytes.fromhex(token)) == movelog.TOKEN_BYTES
+    except (TypeError, ValueError):
+        return False
+
+
+def session_token():
+    """Identifies this browser session's seats; kept in the URL so a reload keeps them"""
+    if "session_token" not in st.session_state:
+        token = st.query_params.get("player")
+        st.session_state.session_token = token if _valid_token(token) else uuid.uuid4().hex
+        st.query_params["player"] = st.session_state.session_token
+    return st.session_state.session_token
+
+
+def _claim_seats(shared, seats=registry.SEATS):
+    """Claim seats for this session and record the holders in the archive"""
+    with shared.lock:
+        held = shared.claim(session_token(), seats)
+        get_archive().set_seats(shared.game_id, shared.seats)
+    return held
+
+
+def _load_archived(game_id):
+    header = get_archive().header(game_id)
+    return get_archive().board_at(game_id), header.computer_seat, header.seats
+
+
+def get_shared_game():
+    """The registry entry of the session's game (None before roles are chosen)
+
+    The session's board is re-pointed at the shared one, which is replayed
+    from the archive if the game had been evicted in the meantime.
+    """
+    game_id = st.session_state.get("game_id")
+    if game_id is None:
+        return None
+    shared = get_registry().open(game_id, lambda: _load_archived(game_id))
+    st.session_state.board = shared.board
+    return shared
+
+
+def my_seats():
+    """Seats this session plays; empty for a spectator or before the game starts"""
+    shared = get_shared_game()
+    return shared.seats_of(session_token()) if shared is not None else ()
+
+
+def is_spectator():
+    return st.session_state.get("game_started", False) and not my_seats()
+
+
+def is_my_turn():
+    return get_board().current_player in my_seats()
+
+
+def needs_polling():
+    """Whether another session may change the board (a remote opponent, or this one is watching)"""
+    shared = get_shared_game()
+    if shared is None:
+        return False
+    human_seats = [seat for seat in registry.SEATS if seat != shared.computer_seat]
+    return any(not shared.controls(session_token(), seat) for seat in human_seats)
+
+
+def remote_changed():
+    """Whether the shared board moved on since this session last drew it (a cheap version check)"""
+    shared = get_shared_game()
+    return shared is not None and shared.version != st.session_state.get("seen_version")
+
+
+def mark_seen():
+    shared = get_shared_game()
+    if shared is not None:
+        st.session_state.seen_version = shared.version
+
+
+@st.cache_resource
+def _open_tablebase(path):
+    return tablebase.Tablebase(path)
+
+
+def get_tablebase(n):
+    """The memory-mapped endgame table for n, or None if none has been built
+
+    Only an opened table is cached, so one built while the server runs is
+    picked up by the next session that needs it.
+    """
+    path = tablebase.tablebase_path(n)
+    if not os.path.exists(path):
+        return None
+    try:
+        return _open_tablebase(path)
+    except ValueError as error:
+        logger.warning("ignoring endgame table %s: %s", path, error)
+        return None
+
+
+def _warm(sizes):
+    start = time.perf_counter()
+    # The click component is only needed once a game starts, so app.py imports it late
+    importlib.import_module("streamlit_plotly_events")
+    for n in sizes:
+        geom = geometry.get_geometry(n)
+        hover.vertex_labels(geom.num_vertices)
+    if sizes:
+        # Plotly validates lazily on its first figure; pay that here rather than on a first visit
+        geom = geometry.get_geometry(sizes[0])
+        render.build_board_figure(geom, ["white"] * geom.num_vertices, [""] * geom.num_vertices)
+    logger.info("warm-up of n=%s done in %.3fs", list(sizes), time.perf_counter() - start)
+
+
+def warm_sizes(spec=None):
+    """Board sizes to warm up from a SPERNER_WARM_N style list; bad entries are logged and skipped"""
+    spec = os.environ.get("SPERNER_WARM_N") if spec is None else spec
+    if spec is None:
+        return DEFAULT_WARM_SIZES
+    entries = [entry.strip() for entry in spec.split(",") if entry.strip()]
+    sizes = []
+    for entry in entries:
+        try:
+            sizes.append(int(entry))
+        except ValueError:
+            logger.warning("ignoring SPERNER_WARM_N entry %r: not a board size", entry)
+    if entries and not sizes:
+        return DEFAULT_WARM_SIZES
+    return tuple(sizes)
+
+
+@st.cache_resource
+def warm_up(sizes=None):
+    """Prepare geometry, hover labels and Plotly for common sizes in a background thread, once per process"""
+    sizes = warm_sizes() if sizes is None else sizes
+    sizes = tuple(n for n in sizes if n >= 2)[:geometry.GEOMETRY_CACHE_SIZE]
+    thread = threading.Thread(target=_warm, args=(sizes,), name="sperner-warm-up", daemon=True)
+    thread.start()
+    return thread
+
+
+def endgame_hint():
+    """(final count under perfect play, best move) once the endgame table covers the board, else None"""
+    game = get_board()
+    table = get_tablebase(game.n)
+    if table is None or game.player1_role is None:
+        return None
+    best = table.best_move(game.colors, game.maximizer_to_move)
+    if best is None:
+        return None
+    gain, move = best
+    return game.polychrome_count + gain, move
+
+
+def _url_game():
+    """Header of the archived game named in the URL, if there is a valid one"""
+    game_id = st.query_params.get("game")
+    if game_id is None or not game_id.isdigit():
+        return None, None
+    try:
+        return int(game_id), get_archive().header(int(game_id))
+    except (KeyError, ValueError):
+        return None, None
+
+
+def resumable_n():
+    """Triangulation level of the game named in the URL, if any"""
+    _, header = _url_game()
+    return header.n if header is not None else None
+
+
+def resume_game(n):
+    """Join the game named in the URL: live from the registry, else replayed from the archive
+
+    A session coming back gets the seats it held before (they are kept in
+    the archive); a new one takes any seat still free, and if none is, it watches.
+    """
+    game_id, header = _url_game()
+    if header is None or header.n != n or header.player1_role is None:
+        st.query_params.pop("game", None)
+        return False
+    st.session_state.game_id = game_id
+    st.session_state.computer_player = header.computer_seat
+    st.session_state.game_started = True
+    shared = get_shared_game()
+    _claim_seats(shared)
+    st.session_state.seen_version = shared.version
+    return True
+
+
+def record_move(move):
+    """Append a move to the session's archived game"""
+    if "game_id" in st.session_state:
+        get_archive().append(st.session_state.game_id, *move)
+
+
+def _undo_stops_here():
+    # Undo and redo skip over the computer's moves, landing on a human's turn
+    return st.session_state.get("computer_player") != get_board().current_player
+
+
+def _last_human_seat():
+    """Seat of the latest move that is not the computer's: the one an undo takes back"""
+    computer = st.session_state.get("computer_player")
+    for ply in range(len(get_board().log) - 1, -1, -1):
+        if board.PLAYERS[ply % 2] != computer:
+            return board.PLAYERS[ply % 2]
+    return None
+
+
+def can_undo():
+    """Whether this session may take back the last move: only its own, never the opponent's"""
+    return "game_id" in st.session_state and _last_human_seat() in my_seats()
+
+
+def can_redo():
+    """Whether there is an undone move to replay and the seat it belongs to is this session's"""
+    if "game_id" not in st.session_state or not is_my_turn():
+        return False
+    header = get_archive().header(st.session_state.game_id)
+    return header.cursor < header.length
+
+
+def undo_move():
+    """Button callback: take back the last move (and the computer's reply before it)"""
+    archive, shared = get_archive(), get_shared_game()
+    with shared.lock:
+        # The other device may have moved since the button was drawn
+        if not can_undo():
+            return
+        while archive.undo(st.session_state.game_id) is not None:
+            shared.board.undo()
+            shared.moved()
+            if _undo_stops_here():
+                break
+
+
+def redo_move():
+    """Button callback: replay the next undone move (and the computer's reply after it)"""
+    archive, shared = get_archive(), get_shared_game()
+    with shared.lock:
+        if not can_redo():
+            return
+        while True:
+            move = archive.redo(st.session_state.game_id)
+            if move is None:
+                break
+            shared.board.apply(move)
+            shared.moved()
+            if _undo_stops_here():
+                break
+
 
 def get_current_player_info():
     """Get current player's role and icon for display"""
-    current_player_role = (
-        st.session_state.player1_role if st.session_state.current_player == "Player 1" 
-        else st.session_state.player2_role
-    )
+    current_player_role = get_board().current_role
     role_icon = "🔺" if current_player_role == "Maximizer" else "🔻"
     return current_player_role, role_icon
 
 
-def update_polychrome_count():
-    """Update the polychrome triangle count in session state"""
-    poly_triangles = get_polychrome_triangles(
-        st.session_state.vertex_colors, 
-        st.session_state.all_triangles
-    )
-    st.session_state.polychrome_count = len(poly_triangles)
-    return poly_triangles
+@st.cache_resource(max_entries=HIGHLIGHT_CACHE_SIZE)
+def _final_highlight_xy(n, colors_bytes):
+    geom = geometry.get_geometry(n)
+    colors = np.frombuffer(colors_bytes, dtype=np.int8)
+    return render.get_highlight_xy(geom.coords, geom.triangles[engine.polychrome_mask(colors, geom.triangles)])
+
+
+def get_final_highlight_xy():
+    """Outline of the polychrome triangles of the finished board, built once per final coloring
+
+    Every rerun of a finished game (and every spectator of it) reuses the same arrays.
+    """
+    game = get_board()
+    return _final_highlight_xy(game.n, game.colors.tobytes())
 
 
 def handle_vertex_click(closest_vertex, click_x, click_y):
     """Handle clicking on a vertex, return success status and error message"""
-    if st.session_state.vertex_colors[closest_vertex] is not None:
-        return False, ""  # Return empty string instead of None for already-colored vertices
-    
-    allowed = st.session_state.allowed_colors.get(closest_vertex, {"red", "green", "blue"})
-    if st.session_state.color_picker not in allowed:
-        return False, f"Invalid move: You cannot color this vertex with {st.session_state.color_picker}."
-    
-    # Valid move - color the vertex and switch players
-    st.session_state.vertex_colors[closest_vertex] = st.session_state.color_picker
-    update_player_turn()
-    
-    # Clear saved clicks
-    if "last_selected_event" in st.session_state:
-        del st.session_state.last_selected_event
-    
+    shared = get_shared_game()
+    if is_spectator():
+        return False, "You are watching this game."
+
+    # The other device may have moved since this board was drawn, so check under the lock
+    with shared.lock:
+        game = shared.board
+        if not is_my_turn():
+            return False, "Wait for your opponent's move."
+        if not game.is_empty(closest_vertex):
+            return False, ""  # Return empty string instead of None for already-colored vertices
+
+        color_code = engine.COLOR_CODES[st.session_state.color_picker]
+        if not game.is_legal((closest_vertex, color_code)):
+            return False, f"Invalid move: You cannot color this vertex with {st.session_state.color_picker}."
+
+        # Valid move - color the vertex and switch players
+        game.apply((closest_vertex, color_code))
+        record_move((closest_vertex, color_code))
+        shared.moved()
+    count_move()
+
     return True, None
 
 
-def create_hover_data_with_warnings(points, vertex_colors, allowed_colors, current_color):
-    """Create hover data that includes warning info for invalid moves"""
-    
-    custom_hover_data = []
-    
-    for i, (px, py) in enumerate(points):
-        allowed = allowed_colors.get(i, {"red", "green", "blue"})
-        current_vertex_color = vertex_colors[i]
-        
-        # Base hover info
-        base_info = f'<b>Vertex {i}</b>'# xy label, can add back x={px:.2f}<br>y={py:.2f}'
-        
-        if current_vertex_color is None:  # Uncolored vertex
-            if current_color not in allowed:
-                # Show warning for invalid color
-                warning_text = f'<br><span style="color:red;font-weight:bold;">❌ Cannot use {current_color}!</span><br><span style="color:black;">Allowed: {", ".join(sorted(allowed))}</span>'
-                hover_text = base_info + warning_text
-            else:
-                # Show valid move info
-                hover_text = base_info + f'<br><span style="color:green;font-weight:bold">✓ Can use {current_color}</span><br><span style="color:black;">Allowed: {", ".join(sorted(allowed))}</span>'
+def pick_color(color):
+    """Button callback for the color picker"""
+    st.session_state.color_picker = color
+
+
+def click_key(key):
+    """Widget key of the click component named `key`; it changes after every handled click"""
+    return f"{key}-{st.session_state.get(key + '_nonce', 0)}"
+
+
+def _renew_click_key(key):
+    # A fresh key mounts a fresh component, whose value is empty until the next click
+    nonce = st.session_state.get(key + "_nonce", 0) + 1
+    while f"{key}-{nonce}" in st.session_state:
+        nonce += 1
+    st.session_state[key + "_nonce"] = nonce
+
+
+def take_new_click(key):
+    """The click events sent by the plotly_events component named `key`, if not handled yet
+
+    The component keeps returning its last value on every run, and a second
+    click on the same point sends that very value again, so values cannot be
+    compared. Instead, once a click is taken the component gets a new key.
+    """
+    raw = st.session_state.get(click_key(key))
+    events = json.loads(raw) if isinstance(raw, str) else raw
+    if not events:
+        return []
+    _renew_click_key(key)
+    return events
+
+
+def get_plot_colors():
+    """Vertex marker colors for the figure (white = uncolored)"""
+    return [color if color else "white" for color in engine.decode_colors(get_board().colors)]
+
+
+def is_computer_turn():
+    """Whether the computer opponent should move now (driven by the session playing against it)"""
+    return (
+        st.session_state.get("game_started", False)
+        and st.session_state.get("computer_player") == get_board().current_player
+        and not get_board().is_over()
+        and bool(my_seats())
+    )
+
+
+def play_computer_move():
+    """Let the MCTS agent pick and play a move for the current player (perfect play in tabled endgames)"""
+    shared = get_shared_game()
+    game = shared.board
+    # The agent lives in session state so its search tree carries over between moves
+    if "computer_agent" not in st.session_state:
+        st.session_state.computer_agent = mcts.MCTSAgent(game.n, time_budget=COMPUTER_TIME_BUDGET)
+    with shared.lock:
+        # Another session playing the same game may have just moved for the computer
+        if not is_computer_turn():
+            return None
+        hint = endgame_hint()
+        if hint is not None:
+            move = hint[1]
         else:
-            # Already colored vertex
-            hover_text = base_info + f'<span style="color:{current_vertex_color};">Current: {current_vertex_color}</span>'
-        
-        custom_hover_data.append(hover_text)
-    
-    return custom_hover_data
+            move = st.session_state.computer_agent.choose_move(game.colors, game.maximizer_to_move)
+        if move is not None:
+            game.apply(move)
+            record_move(move)
+            shared.moved()
+    if move is not None:
+        count_move()
+    return move
 
 
-def initialize_game(n, points):
-    '''Initilize game with session state'''
-    st.session_state.vertex_colors = [None for _ in points]
-    st.session_state.vertex_color_n = n
-    st.session_state.current_player = "Player 1"
-    st.session_state.color_picker = "red"
-    # roles are selected first before initialization 
-    st.session_state.game_started = False
+def start_run():
+    """Begin instrumenting this script run"""
+    instrument.configure_logging()
+    perf = st.session_state.setdefault("perf", {"runs": 0, "moves": 0, "reruns": 0, "history": []})
+    perf["runs"] += 1
+    st.session_state.run_metrics = instrument.RunMetrics(perf["runs"])
+    return st.session_state.run_metrics
+
+
+def ensure_run(fragment):
+    """Metrics for a fragment: the page run's while it is in progress, else a new run of its own
+
+    Returns (metrics, whether the caller started the run and so has to finish it).
+    """
+    metrics = st.session_state.get("run_metrics")
+    if metrics is not None and not metrics.finished:
+        return metrics, False
+    metrics = start_run()
+    metrics.set("fragment", fragment)
+    return metrics, True
+
 
-    # Pre-color 3 corners
-    apex = 0
-    left_corner = len(points) - n - 1
-    right_corner = len(points) - 1
-    st.session_state.vertex_colors[apex] = "red"
-    st.session_state.vertex_colors[left_corner] = "blue"
-    st.session_state.vertex_colors[right_corner] = "green"
-
-
-def generate_triangle_coords(n_rows):
-    '''Compute vertex positions '''
-    coords = []
-    x_spacing = 1.0
-    y_spacing = np.sqrt(3) / 2
-    for row in range(n_rows + 1):
-        for col in range(row + 1):
-            x = float(col * x_spacing + (n_rows - row) * x_spacing / 2)
-            y = float(row * y_spacing)
-            coords.append((x, y))
-    return coords
-
-
-def generate_edges(n_rows):
-    '''Generate triangle edges'''
-    edges = []
-    idx = lambda r, c: r * (r + 1) // 2 + c
-    for r in range(n_rows):
-        for c in range(r + 1):
-            i = idx(r, c)
-            edges.append((i, idx(r + 1, c)))
-            edges.append((i, idx(r + 1, c + 1)))
-            edges.append((idx(r + 1, c), idx(r + 1, c + 1)))
-    return edges
-
-def assign_allowed_colors(n):
-    '''Apply Sperner's Lemma rules'''
-    allowed = {}
-    total_vertices = (n + 1) * (n + 2) // 2
-
-    apex = 0  # red
-    left_corner = total_vertices - n - 1  # blue
-    right_corner = total_vertices - 1    # green
-
-    for i in range(total_vertices):
-        allowed[i] = {"red", "green", "blue"}  # internal default
-
-    # Red-Blue edge (top to bottom-left)
-    for i in range(1, n):
-        idx = i * (i + 1) // 2  # (row i, col 0)
-        allowed[idx] = {"red", "blue"}
-
-    # Red-Green edge (top to bottom-right)
-    for i in range(1, n):
-        idx = i * (i + 1) // 2 + i  # (row i, col i)
-        allowed[idx] = {"red", "green"}
-
-    # Blue-Green edge (bottom row)
-    base_start = n * (n + 1) // 2
-    for i in range(1, n):  # skip the two corners
-        allowed[base_start + i] = {"blue", "green"}
-
-    # Corners
-    allowed[apex] = {"red"}
-    allowed[left_corner] = {"blue"}
-    allowed[right_corner] = {"green"}
-
-    return allowed
+def get_metrics():
+    """The RunMetrics of the current script run"""
+    if "run_metrics" not in st.session_state:
+        return start_run()
+    return st.session_state.run_metrics
+
+
+def count_move():
+    get_metrics().count("moves")
+    st.session_state.perf["moves"] += 1
+
+
+def session_memory(include_agent=False):
+    """Approximate bytes held by this session's state, excluding the shared geometry cache and game registry
+
+    The computer's search tree is only measured on request, since walking it
+    costs time proportional to its size.
+    """
+    skip = {"perf", "run_metrics"} | (set() if include_agent else {"computer_agent"})
+    state = {key: st.session_state[key] for key in st.session_state if key not in skip}
+    # A started game's board belongs to the shared registry, not to this session
+    shared_board = [st.session_state.board] if "game_id" in st.session_state and "board" in st.session_state else []
+    return instrument.deep_size(state, shared=(geometry.Geometry,), skip=hover.TEMPLATES + shared_board)
+
+
+def finish_run():
+    """Log this run's metrics and keep them for the debug sidebar"""
+    metrics = get_metrics()
+    if metrics.finished:
+        return
+    perf = st.session_state.perf
+    # Measuring walks the whole session state, so it is only done for the debug sidebar
+    if debug_enabled():
+        metrics.set("session_bytes", session_memory())
+        if "computer_agent" in st.session_state:
+            metrics.set("session_bytes_with_agent", session_memory(include_agent=True))
+    metrics.set("session_moves", perf["moves"])
+    metrics.set("session_reruns", perf["reruns"])
+    history = perf["history"]
+    history.append(metrics.finish())
+    del history[:-DEBUG_HISTORY_RUNS]
+
+
+def rerun(reason):
+    """st.rerun(), counted and with this run's metrics written first"""
+    metrics = get_metrics()
+    metrics.count("reruns")
+    metrics.set("rerun_reason", reason)
+    st.session_state.perf["reruns"] += 1
+    finish_run()
+    st.rerun()
+
+
+def stop():
+    """st.stop(), with this run's metrics written first"""
+    finish_run()
+    st.stop()
+
+
+def record_figure_metrics(fig, hover_data):
+    """Count traces and hover text size; the serialized payload is only measured in debug mode"""
+    metrics = get_metrics()
+    metrics.set("traces", len(fig.data))
+    metrics.set("hover_chars", sum(len(text) for text in hover_data))
+    if debug_enabled():
+        with metrics.span("payload_size"):
+            metrics.set("payload_bytes", len(fig.to_json()))
+
+
+def debug_enabled():
+    return st.session_state.get("debug_sidebar", False)
+
+
+def render_debug_sidebar():
+    """Optional sidebar with phase timings of recent runs (the current run is still in progress)"""
+    if not st.sidebar.toggle("Performance debug", key="debug_sidebar"):
+        return
+    perf = st.session_state.perf
+    history = perf["history"]
+    st.sidebar.markdown(
+        f"**Session:** {perf['runs']} runs, {perf['moves']} moves, {perf['reruns']} reruns"
+        f" ({perf['reruns'] / max(perf['moves'], 1):.2f} reruns per move)"
+    )
+    if not history:
+        return
+    last = history[-1]
+    st.sidebar.markdown(f"**Last run** (#{last['run_id']}): {last['total'] * 1000:.1f} ms")
+    st.sidebar.table({
+        "phase": list(last["spans"]),
+        "ms": [f"{seconds * 1000:.1f}" for seconds in last["spans"].values()],
+    })
+    st.sidebar.json(last["counters"], expanded=False)
+    st.sidebar.line_chart({"total ms": [record["total"] * 1000 for record in history]})
+
+
+def get_hover_data():
+    """Hover texts for the session's board, updating only vertices whose text changed"""
+    game = get_board()
+    cache = st.session_state.get("hover_cache")
+    if cache is None or cache.allowed is not game.geom.allowed:
+        cache = st.session_state.hover_cache = hover.HoverCache(game.geom.allowed)
+    diff = cache.update(game.colors, engine.COLOR_CODES[st.session_state.color_picker])
+    get_metrics().set("hover_updates", len(diff))
+    return cache.texts, diff
+
+
+def get_impact_overlay():
+    """Heat map data for the picked color, refreshing gains only around vertices that changed"""
+    game = get_board()
+    cache = st.session_state.get("impact_cache")
+    if cache is None or cache.geom is not game.geom:
+        cache = st.session_state.impact_cache = impact.ImpactCache(game.geom)
+    updated = cache.update(game.colors)
+    get_metrics().set("impact_updates", len(updated))
+    return cache.overlay(engine.COLOR_CODES[st.session_state.color_picker], game.maximizer_to_move)
 
 
 def get_player_role_display(player, player1_role, player2_role):
@@ -280,49 +712,3 @@ def get_player_role_display(player, player1_role, player2_role):
         return f"Player 1 ({player1_role})"
     else:
         return f"Player 2 ({player2_role})"
-    
-
-def get_all_triangles(n):
-    """Generate all triangles in the triangulation"""
-    triangles = []
-    idx = lambda r, c: r * (r + 1) // 2 + c
-
-    # Generate triangles systematically
-    for r in range(n):
-        for c in range(r + 1):
-            # Upward-pointing triangle: vertex at (r,c) with two vertices below
-            v1 = idx(r, c)
-            v2 = idx(r + 1, c)
-            v3 = idx(r + 1, c + 1)
-            triangles.append((v1, v2, v3))
-            
-            # Downward-pointing triangle: vertex at (r+1, c+1) with two vertices above
-            # This triangle exists if c < r (not at the rightmost position of the row)
-            if c < r:
-                v1 = idx(r + 1, c + 1)  # bottom vertex
-                v2 = idx(r, c)          # top-left vertex  
-                v3 = idx(r, c + 1)      # top-right vertex
-                triangles.append((v1, v2, v3))
-
-    return triangles
-
-
-def get_polychrome_triangles(vertex_colors, triangles):
-    """Find triangles that have all three colors (red, green, blue)"""
-    polychrome = []
-    
-    for tri in triangles:
-        # Get the colors of the three vertices
-        tri_colors = [vertex_colors[v] for v in tri]
-        
-        # Skip if any vertex is uncolored
-        if None in tri_colors:
-            continue
-            
-        # Check if we have exactly the three different colors
-        color_set = set(tri_colors)
-        if color_set == {"red", "green", "blue"}:
-            print(f"Polychrome triangle: vertices {tri} -> colors {tri_colors}")
-            polychrome.append(tri)
-    
-    return polychrome
\ No newline at end of file